@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Provjera arhiviranja sezona: isti izračuni prije i nakon preseljenja
+zatvorenih sezona u arhive (hk_podravka/archive.py) moraju dati iste
+brojeve.
+
+Uspoređuje se:
+  zbrojevi     attendance_stats.summary po sezoni (kroz archive.history)
+  rezultati    reports.results_frame (svi rezultati, i arhiviranih sezona)
+  opterećenje  cijela tablica training_load nakon potpune obnove
+  odustajanje  dropout_scores (force) na --today; zadano je nekoliko tjedana
+               u sezonu pa osnovica seže u arhiviranu sezonu
+
+Izlazni kod je 1 ako se ijedan izračun razlikuje.
+
+    python bench/archive_check.py                   # generirana baza (small)
+    python bench/archive_check.py --scale medium --today 2025-10-01
+    python bench/archive_check.py --db /tmp/hk_big.db   # postojeća baza (kopira se)
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+from hk_podravka import analytics, archive, attendance_stats, db, reports, training_load  # noqa: E402
+from hk_podravka.seasons import season_bounds, season_label  # noqa: E402
+
+TODAY = date(2026, 6, 30)           # do kada generate.py upisuje podatke
+CHECK_DAY = date(2025, 9, 20)       # 3 tjedna u sezonu 2025/2026
+
+
+def snapshot(conn, today: date, seasons: List[str]) -> Dict[str, object]:
+    out: Dict[str, object] = {}
+    for season in seasons:
+        s0, s1 = season_bounds(season)
+        with archive.history(conn, s0, s1 + timedelta(days=1)) as src:
+            out[f"zbrojevi {season}"] = attendance_stats.summary(conn, s0, s1 + timedelta(days=1), src)
+    with archive.history(conn) as src:
+        out["rezultati"] = reports.results_frame(conn, src).to_dict("split")
+
+    training_load.refresh_training_load(conn, full=True)
+    analytics.refresh_dropout_scores(conn, today, force=True)
+    conn.commit()
+    out["opterećenje"] = conn.execute("""SELECT member_id, period_kind, period, sessions, session_minutes,
+                                                camp_trainings, camp_hours
+                                         FROM training_load ORDER BY 1, 2, 3""").fetchall()
+    out["odustajanje"] = conn.execute("""SELECT member_id, group_id, score, recent_rate, baseline_rate, missed_weeks
+                                         FROM dropout_scores ORDER BY 1, 2""").fetchall()
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", help="postojeća baza umjesto generirane (kopira se, original se ne mijenja)")
+    ap.add_argument("--scale", default="small", help="veličina generirane baze (small/medium/large)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--today", type=date.fromisoformat, default=CHECK_DAY,
+                    help="dan provjere: zatvorene sezone prije njega se arhiviraju")
+    args = ap.parse_args()
+
+    import generate
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "check.db")
+        if args.db:
+            shutil.copyfile(args.db, path)
+        else:
+            generate.generate(path, args.seed, TODAY, **generate.SCALES[args.scale])
+        conn = db.connect(path)
+        closed = archive.closed_seasons(conn, args.today)
+        if not closed:
+            print(f"nema zatvorenih sezona prije {args.today}")
+            return 1
+        seasons = closed + [season_label(args.today)]
+
+        before = snapshot(conn, args.today, seasons)
+        t = time.perf_counter()
+        for season in closed:
+            archive.archive_season(conn, season, os.path.join(workdir, "archive"), today=args.today)
+        print(f"arhivirano {', '.join(closed)} za {time.perf_counter() - t:.1f} s")
+        after = snapshot(conn, args.today, seasons)
+        conn.close()
+
+    bad = [key for key in before if before[key] != after[key]]
+    for key in before:
+        n = len(before[key]) if isinstance(before[key], list) else ""
+        print(f"{key:<24} {'razlika' if key in bad else 'isto'} {n}")
+    if bad:
+        print("GREŠKA: razlikuje se " + ", ".join(bad))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Generator sintetičkih podataka za mjerenja: puni shemu iz
+hk_podravka/db.py (isto što i init_db) članovima, trenerima, grupama,
+rasporedom, treninzima s prisustvom, pripremama, natjecanjima i
+rezultatima s borbama (protivnici u opponent_list).
+
+Isti --seed i ista veličina daju istu bazu, red po red.
+
+    python bench/generate.py /tmp/hk_bench.db                  # --scale medium
+    python bench/generate.py /tmp/hk_big.db --scale large
+    python bench/generate.py /tmp/x.db --members 5000 --years 8
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from hk_podravka import db  # noqa: E402
+
+# members, groups, coaches, competitions, results, years (treninga unatrag), camps
+SCALES = {
+    "small":  dict(members=300,  groups=8,  coaches=6,  competitions=40,  results=3000,   years=2, camps=6),
+    "medium": dict(members=2000, groups=20, coaches=15, competitions=300, results=30000,  years=5, camps=30),
+    "large":  dict(members=8000, groups=40, coaches=30, competitions=900, results=150000, years=8, camps=80),
+}
+SESSIONS_PER_WEEK = 3
+ATTENDANCE_RATE = 0.7
+BATCH = 50000
+
+FIRST = ["Ivan", "Marko", "Luka", "Petar", "Josip", "Ana", "Marija", "Ivana", "Lana", "Ema",
+         "Filip", "Karlo", "Matej", "Nikola", "Tin", "Sara", "Lucija", "Mia", "Dora", "Leon"]
+LAST = ["Horvat", "Kovačević", "Babić", "Marić", "Jurić", "Novak", "Kovačić", "Knežević", "Vuković",
+        "Marković", "Petrović", "Matić", "Tomić", "Pavlović", "Božić", "Blažević", "Grgić", "Perić"]
+CITIES = [("Koprivnica", "48000"), ("Đurđevac", "48350"), ("Križevci", "48260"), ("Varaždin", "42000")]
+COUNTRIES = [("Hrvatska", "HRV"), ("Slovenija", "SVN"), ("Mađarska", "HUN"), ("Srbija", "SRB"),
+             ("Austrija", "AUT"), ("Njemačka", "DEU"), ("Italija", "ITA"), ("Bosna i Hercegovina", "BIH")]
+KINDS = ["PRVENSTVO HRVATSKE", "MEĐUNARODNI TURNIR", "KUP", "REPREZENTATIVNI NASTUP", "HRVAČKA LIGA"]
+STYLES = ["GR", "FS", "WW"]
+AGE_GROUPS = ["U11", "U13", "U15", "U17", "U20", "U23", "SENIORI"]
+WEIGHTS = ["38", "42", "46", "50", "55", "60", "66", "74", "84", "96", "120"]
+CLUBS = ["HK Zagreb", "HK Lokomotiva", "HK Split", "HK Rijeka", "RK Maribor", "BVSC", "HSK Dubrava"]
+
+
+def _batches(conn, sql, rows):
+    buf = []
+    for r in rows:
+        buf.append(r)
+        if len(buf) >= BATCH:
+            conn.executemany(sql, buf)
+            buf.clear()
+    if buf:
+        conn.executemany(sql, buf)
+
+
+def generate(path: str, seed: int = 1, today: date = date(2026, 6, 30), **size) -> dict:
+    """Stvori novu bazu na `path`; vraća broj redaka po tablici."""
+    rnd = random.Random(seed)
+    if os.path.exists(path):
+        os.remove(path)
+    conn = db.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    db.init_schema(conn)
+    stamp = datetime.combine(today, datetime.min.time()).isoformat()
+
+    conn.execute("INSERT INTO club_info(id, name, created_at, updated_at) VALUES (1, 'Hrvački klub Podravka', ?, ?)",
+                 (stamp, stamp))
+    conn.executemany("INSERT INTO groups(id, name) VALUES (?, ?)",
+                     [(g, f"{AGE_GROUPS[(g - 1) % len(AGE_GROUPS)]} grupa {g}") for g in range(1, size["groups"] + 1)])
+
+    coaches = []
+    for c in range(1, size["coaches"] + 1):
+        fn, ln = rnd.choice(FIRST), rnd.choice(LAST)
+        coaches.append((c, f"{fn} {ln}", fn, ln, f"19{rnd.randint(60, 99)}-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)}",
+                        f"{rnd.randrange(10**10, 10**11)}", f"trener{c}@hk-podravka.com"))
+    conn.executemany("INSERT INTO coaches(id, full_name, first_name, last_name, dob, oib, email) VALUES (?,?,?,?,?,?,?)",
+                     coaches)
+    group_coach = {g: (g - 1) % size["coaches"] + 1 for g in range(1, size["groups"] + 1)}
+    conn.executemany("INSERT INTO coach_groups(coach_id, group_id, assigned_at) VALUES (?,?,?)",
+                     [(c, g, stamp) for g, c in group_coach.items()])
+
+    members, member_group = [], {}
+    for m in range(1, size["members"] + 1):
+        fn, ln = rnd.choice(FIRST), rnd.choice(LAST)
+        city, zipc = rnd.choice(CITIES)
+        gid = rnd.randint(1, size["groups"])
+        member_group[m] = gid
+        dob = date(today.year - rnd.randint(7, 40), rnd.randint(1, 12), rnd.randint(1, 28))
+        med = today + timedelta(days=rnd.randint(-60, 365))
+        members.append((m, f"{fn} {ln} {m}", fn, ln, dob.isoformat(), rnd.choice("MŽ"),
+                        f"{rnd.randrange(10**10, 10**11)}", f"Ulica {rnd.randint(1, 200)}", city, zipc,
+                        f"{fn.lower()}.{ln.lower()}{m}@example.com", f"+38591{rnd.randrange(10**6, 10**7)}",
+                        int(rnd.random() < 0.3), int(dob.year < today.year - 35), 30.0, gid, med.isoformat()))
+    conn.executemany("""INSERT INTO members(id, full_name, first_name, last_name, dob, gender, oib, street, city,
+                        postal_code, parent_email, parent_phone, active_competitor, veteran, membership_fee_eur,
+                        group_id, medical_valid_until) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)""", members)
+    by_group = {}
+    for m, g in member_group.items():
+        by_group.setdefault(g, []).append(m)
+
+    # raspored: SESSIONS_PER_WEEK termina po grupi (pon/sri/pet ili uto/čet/sub)
+    start = today - timedelta(days=365 * size["years"])
+    slots = []
+    for g in range(1, size["groups"] + 1):
+        days = [0, 2, 4] if g % 2 else [1, 3, 5]
+        hour = 16 + g % 4
+        for wd in days[:SESSIONS_PER_WEEK]:
+            slots.append((len(slots) + 1, g, group_coach[g], wd, f"{hour:02d}:00", f"{hour + 1:02d}:30",
+                          "Dvorana Podravka", start.isoformat()))
+    conn.executemany("""INSERT INTO timetable_slots(id, group_id, coach_id, weekday, start_time, end_time,
+                        location, valid_from) VALUES (?,?,?,?,?,?,?,?)""", slots)
+
+    # treninzi i prisustvo
+    def sessions():
+        sid = 0
+        d = start
+        while d < today:
+            for slot_id, g, c, wd, t0, t1, loc, _ in slots:
+                if d.weekday() == wd:
+                    sid += 1
+                    yield (sid, c, g, f"{d} {t0}", f"{d} {t1}", loc, slot_id, 90)
+            d += timedelta(days=1)
+    sess = list(sessions())
+    _batches(conn, """INSERT INTO sessions(id, coach_id, group_id, start_ts, end_ts, location, slot_id, duration_min)
+                      VALUES (?,?,?,?,?,?,?,?)""", sess)
+
+    def attendance():
+        for sid, _, g, *_ in sess:
+            for m in by_group.get(g, ()):
+                if rnd.random() < ATTENDANCE_RATE:
+                    yield (sid, m, 1, 0)
+    _batches(conn, "INSERT INTO attendance(session_id, member_id, present, minutes) VALUES (?,?,?,?)", attendance())
+
+    # pripreme
+    camps, camp_att = [], []
+    for k in range(1, size["camps"] + 1):
+        d0 = start + timedelta(days=rnd.randrange(max(1, (today - start).days - 10)))
+        camps.append((k, f"Pripreme {k}", rnd.choice(CITIES)[0], rnd.choice(coaches)[1], d0.isoformat(),
+                      (d0 + timedelta(days=rnd.randint(3, 10))).isoformat()))
+        for m in rnd.sample(range(1, size["members"] + 1), min(25, size["members"])):
+            camp_att.append((k, m, rnd.randint(5, 20), round(rnd.uniform(8, 30), 1)))
+    conn.executemany("INSERT INTO camps(id, title, place, coach, start_date, end_date) VALUES (?,?,?,?,?,?)", camps)
+    conn.executemany("INSERT INTO camp_attendance(camp_id, member_id, trainings, hours) VALUES (?,?,?,?)", camp_att)
+
+    # natjecanja i rezultati s borbama
+    comps = []
+    for k in range(1, size["competitions"] + 1):
+        d0 = start + timedelta(days=rnd.randrange(max(1, (today - start).days)))
+        country, code = rnd.choice(COUNTRIES)
+        comps.append((k, rnd.choice(KINDS), f"Turnir {k} – {country}", d0.isoformat(),
+                      (d0 + timedelta(days=rnd.randint(0, 2))).isoformat(), rnd.choice(CITIES)[0],
+                      rnd.choice(STYLES), rnd.choice(AGE_GROUPS), country, code,
+                      rnd.randint(1, 15), rnd.randint(50, 400), rnd.randint(5, 40), rnd.randint(1, 12)))
+    conn.executemany("""INSERT INTO competitions(id, kind, name, date_from, date_to, place, style, age_group,
+                        country, country_code, club_competitors, total_competitors, total_clubs, total_countries)
+                        VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)""", comps)
+
+    def results():
+        for _ in range(size["results"]):
+            bouts = rnd.randint(1, 5)
+            wins = rnd.randint(0, bouts)
+            opponents = [{"name": f"{rnd.choice(FIRST)} {rnd.choice(LAST)}", "club": rnd.choice(CLUBS),
+                          "result": "win" if b < wins else "lose"} for b in range(bouts)]
+            yield (rnd.randint(1, size["competitions"]), rnd.randint(1, size["members"]), rnd.choice(WEIGHTS),
+                   rnd.choice(STYLES), bouts, wins, bouts - wins, rnd.randint(1, 32),
+                   json.dumps(opponents, ensure_ascii=False), "")
+    _batches(conn, """INSERT INTO competition_results(competition_id, member_id, weight_category, style,
+                      bouts_total, wins, losses, placement, opponent_list, notes) VALUES (?,?,?,?,?,?,?,?,?,?)""",
+             results())
+    conn.commit()
+
+    counts = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+              for t in ("members", "groups", "coaches", "sessions", "attendance", "camps", "camp_attendance",
+                        "competitions", "competition_results")}
+    conn.execute("PRAGMA journal_mode = DELETE")
+    conn.close()
+    return counts
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("path", help="putanja nove baze (postojeća se briše)")
+    ap.add_argument("--scale", choices=sorted(SCALES), default="medium")
+    ap.add_argument("--seed", type=int, default=1)
+    for key in SCALES["medium"]:
+        ap.add_argument(f"--{key}", type=int, help=f"nadjačaj veličinu ({key})")
+    args = ap.parse_args()
+
+    size = dict(SCALES[args.scale])
+    size.update({k: getattr(args, k) for k in size if getattr(args, k) is not None})
+    t0 = time.perf_counter()
+    counts = generate(args.path, args.seed, **size)
+    print(", ".join(f"{t}: {n}" for t, n in counts.items()))
+    print(f"{args.path} ({os.path.getsize(args.path) / 1e6:.0f} MB) za {time.perf_counter() - t0:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Proračun vremena uvoza aplikacije (hladni start Streamlit procesa).
+
+Mjeri `import hk_podravka_app` u svježem interpreteru (medijan od N
+pokretanja) i provjerava da se teške ovisnosti ne uvoze pri startu.
+Izlazni kod 1 ako je proračun prekoračen – pogodno za CI/cron.
+
+    python bench/import_budget.py            # provjera
+    python bench/import_budget.py --update   # zapiši novi proračun (izmjereno × 1.5)
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_FILE = os.path.join(ROOT, "bench", "import_budget.json")
+
+PROBE = """
+import sys, time, json
+t = time.perf_counter()
+import hk_podravka_app
+dt = time.perf_counter() - t
+print(json.dumps({"seconds": dt, "loaded": sorted(m for m in %r if m in sys.modules)}))
+"""
+
+
+def measure(forbidden, runs: int) -> dict:
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    times, loaded = [], set()
+    with tempfile.TemporaryDirectory() as cwd:  # aplikacija pri uvozu stvara uploads/
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, "-c", PROBE % (list(forbidden),)], cwd=cwd, env=env,
+                                 capture_output=True, text=True, check=True).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            times.append(r["seconds"])
+            loaded.update(r["loaded"])
+    return {"seconds": statistics.median(times), "loaded": sorted(loaded)}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--update", action="store_true", help="zapiši izmjereno × 1.5 kao novi proračun")
+    args = ap.parse_args()
+
+    with open(BUDGET_FILE, encoding="utf-8") as f:
+        budget = json.load(f)
+    r = measure(budget["forbidden_modules"], args.runs)
+    print(f"import hk_podravka_app: {r['seconds'] * 1000:.0f} ms (proračun {budget['max_seconds'] * 1000:.0f} ms)")
+
+    if args.update:
+        budget["max_seconds"] = round(r["seconds"] * 1.5, 3)
+        with open(BUDGET_FILE, "w", encoding="utf-8") as f:
+            json.dump(budget, f, indent=2)
+            f.write("\n")
+        print(f"Novi proračun: {budget['max_seconds'] * 1000:.0f} ms")
+        return 0
+
+    ok = True
+    if r["loaded"]:
+        print(f"GREŠKA: pri startu uvezeno {', '.join(r['loaded'])} – uvezi unutar odjeljka koji ih treba.")
+        ok = False
+    if r["seconds"] > budget["max_seconds"]:
+        print("GREŠKA: proračun vremena uvoza prekoračen. Pogledaj `python -X importtime -c 'import hk_podravka_app'`.")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
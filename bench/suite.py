@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+Mjerenja od kraja do kraja nad sintetičkom bazom (bench/generate.py):
+
+- odjeljci aplikacije kroz Streamlit AppTest (prvo otvaranje i ponovno
+  izvođenje; cache se prazni prije svakog ponavljanja)
+- uvoz članova i rezultata, izvozi (Excel/CSV)
+- statistika prisustva, trenažno opterećenje, analitika, API stranica
+
+Rezultat (medijan ponavljanja, u sekundama) uspoređuje se s
+bench/baseline.json; slučaj sporiji od baseline × (1 + prag) i barem
+`min_delta_ms` je regresija i izlazni kod je 1. Baseline se prije
+usporedbe skalira omjerom kalibracijskog mjerenja (isti stalni posao
+sada i pri zapisu baseline), da opterećenje stroja ne izgleda kao regresija.
+
+    python bench/suite.py                      # usporedba s baseline
+    python bench/suite.py --update             # zapiši novi baseline
+    python bench/suite.py --only stats,export --repeat 5
+    python bench/suite.py --db /tmp/hk_big.db  # postojeća baza (kopira se)
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+from typing import Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+BASELINE_FILE = os.path.join(ROOT, "bench", "baseline.json")
+APP = os.path.join(ROOT, "hk_podravka_app.py")
+SECTIONS = ["Klub", "Članovi", "Treneri", "Natjecanja i rezultati", "Statistika", "Grupe", "Veterani", "Prisustvo"]
+GROUPS = ["sections", "stats", "export", "import"]
+TODAY = date(2026, 6, 30)   # isti "danas" kao u generate.py
+
+
+@contextlib.contextmanager
+def _cwd(path: str):
+    old = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(old)
+
+
+def calibrate(runs: int = 7) -> float:
+    """
+    Stalni posao (Python petlja + SQLite upit) kao mjera trenutne brzine
+    stroja; rezultati se uspoređuju u omjeru s njim, pa opterećen stroj ne
+    izgleda kao regresija.
+    """
+    import sqlite3
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (a INTEGER, b TEXT)")
+    conn.executemany("INSERT INTO t VALUES (?, ?)", ((i, str(i % 97)) for i in range(50000)))
+
+    def work():
+        sum(i * i for i in range(200000))
+        conn.execute("SELECT b, COUNT(*), SUM(a) FROM t GROUP BY b ORDER BY 3").fetchall()
+    return statistics.median(_timed(work) for _ in range(runs))
+
+
+def _timed(fn: Callable[[], object]) -> float:
+    t = time.perf_counter()
+    fn()
+    return time.perf_counter() - t
+
+
+# ==========================
+# Slučajevi
+# ==========================
+def bench_sections(workdir: str, repeat: int) -> Dict[str, List[float]]:
+    """Svaki odjeljak: otvaranje iz prethodnog odjeljka i ponovno izvođenje (rerun)."""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    out: Dict[str, List[float]] = {}
+    # bez Streamlit upozorenja (zastarjeli parametri, cache izvan runtimea) u ispisu
+    logging.disable(logging.WARNING)
+    with _cwd(workdir):
+        for _ in range(repeat):
+            st.cache_data.clear()
+            st.cache_resource.clear()
+            at = AppTest.from_file(APP, default_timeout=600)
+            out.setdefault("app:start", []).append(_timed(at.run))
+            for sec in SECTIONS:
+                radio = at.sidebar.radio[0]
+                out.setdefault(f"section:{sec}", []).append(_timed(lambda: radio.set_value(sec).run()))
+                out.setdefault(f"section:{sec}:rerun", []).append(_timed(at.run))
+                if at.exception:
+                    raise RuntimeError(f"{sec}: {at.exception[0].message}")
+    logging.disable(logging.NOTSET)
+    return out
+
+
+def bench_stats(conn, repeat: int) -> Dict[str, List[float]]:
+    from hk_podravka import analytics, api, attendance_stats, training_load
+    from hk_podravka.seasons import season_label
+
+    y0, y1 = attendance_stats.period_range("godina", TODAY)
+    m0, m1 = attendance_stats.period_range("mjesec", TODAY)
+    gid = conn.execute("SELECT MIN(id) FROM groups").fetchone()[0]
+    mid_att = str(conn.execute("SELECT MAX(id) / 2 FROM attendance").fetchone()[0])
+    cases = {
+        "stats:summary_year": lambda: attendance_stats.summary(conn, y0, y1),
+        "stats:member_rollup_year": lambda: attendance_stats.member_rollup(conn, y0, y1, "mjesec"),
+        "stats:group_rollup_year": lambda: attendance_stats.group_rollup(conn, y0, y1, "mjesec"),
+        "stats:coach_rollup_month": lambda: attendance_stats.coach_rollup(conn, m0, m1, "tjedan"),
+        "load:refresh_full": lambda: (training_load.refresh_training_load(conn, full=True), conn.commit()),
+        "load:category_report": lambda: training_load.category_report(conn, season_label(TODAY)),
+        "analytics:matrix_group_26w": lambda: analytics.attendance_matrix(conn, analytics.week_start(
+            analytics.week_index(TODAY) - 26), analytics.week_start(analytics.week_index(TODAY) + 1), [gid]),
+        "analytics:dropout_full": lambda: (analytics.refresh_dropout_scores(conn, TODAY, force=True), conn.commit()),
+        "api:attendance_page": lambda: api.fetch_page(conn, "attendance", {"limit": ["1000"], "after": [mid_att]}),
+        "api:results_member": lambda: api.fetch_page(conn, "results", {"member_id": ["7"]}),
+    }
+    return {name: [_timed(fn) for _ in range(repeat)] for name, fn in cases.items()}
+
+
+def bench_export(conn, workdir: str, repeat: int) -> Dict[str, List[float]]:
+    from hk_podravka import cli, reports
+
+    def attendance_csv():
+        args = cli.build_parser().parse_args(["-q", "--db", os.path.join(workdir, "hk_podravka.db"),
+                                              "export", "attendance", os.path.join(workdir, "a.csv")])
+        cli._export_attendance(conn, args)
+
+    cases = {
+        "export:members_xlsx": lambda: cli._write_table(reports.members_frame(conn, TODAY),
+                                                        os.path.join(workdir, "m.xlsx"), "Clanovi"),
+        "export:results_xlsx": lambda: cli._write_table(reports.results_frame(conn),
+                                                        os.path.join(workdir, "r.xlsx"), "Rezultati"),
+        "export:attendance_csv": attendance_csv,
+        "reports:expiring_30d": lambda: reports.expiring(conn, TODAY, 30),
+    }
+    return {name: [_timed(fn) for _ in range(repeat)] for name, fn in cases.items()}
+
+
+def _template_files(conn, workdir: str, n: int) -> Tuple[str, str]:
+    """Predlošci članova (.xlsx) i rezultata (.csv) s n redaka."""
+    import pandas as pd
+    groups = [g for (g,) in conn.execute("SELECT name FROM groups")]
+    names = [m for (m,) in conn.execute("SELECT full_name FROM members LIMIT 500")]
+    comps = [c for (c,) in conn.execute("SELECT id FROM competitions")]
+    members = pd.DataFrame([{"ime": f"Uvoz{i}", "prezime": "Test", "datum_rođenja": "2012-03-04",
+                             "spol(M/Ž)": "M", "oib": str(10**10 + i), "grupa": groups[i % len(groups)],
+                             "aktivni_natjecatelj(0/1)": i % 2, "članarina_EUR": 30} for i in range(n)])
+    results = pd.DataFrame([{"natjecanje_id": comps[i % len(comps)], "clan(ime_prezime)": names[i % len(names)],
+                             "kategorija": "55", "stil": "GR", "ukupno_borbi": 3, "pobjede": 2, "porazi": 1,
+                             "plasman(1-100)": 3} for i in range(n)])
+    mpath, rpath = os.path.join(workdir, "uvoz_clanovi.xlsx"), os.path.join(workdir, "uvoz_rezultati.csv")
+    members.to_excel(mpath, index=False)
+    results.to_csv(rpath, index=False)
+    return mpath, rpath
+
+
+def bench_import(conn, workdir: str, repeat: int, rows: int) -> Dict[str, List[float]]:
+    from hk_podravka import imports
+    mpath, rpath = _template_files(conn, workdir, rows)
+    cases = {
+        f"import:members_xlsx_{rows}": lambda: imports.import_members(conn, imports.read_rows(mpath)),
+        f"import:results_csv_{rows}": lambda: imports.import_results(conn, imports.read_rows(rpath)),
+    }
+    return {name: [_timed(fn) for _ in range(repeat)] for name, fn in cases.items()}
+
+
+# ==========================
+# Pokretanje i usporedba
+# ==========================
+def run(args) -> Dict[str, float]:
+    from hk_podravka import db
+    import generate
+
+    groups = args.only.split(",") if args.only else GROUPS
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "hk_podravka.db")
+        if args.db:
+            shutil.copyfile(args.db, path)
+        else:
+            t = time.perf_counter()
+            generate.generate(path, args.seed, TODAY, **generate.SCALES[args.scale])
+            print(f"baza ({args.scale}) generirana za {time.perf_counter() - t:.1f} s", file=sys.stderr)
+
+        samples: Dict[str, List[float]] = {}
+        if "sections" in groups:
+            samples.update(bench_sections(workdir, args.repeat))
+        conn = db.connect(path)
+        try:
+            if "stats" in groups:
+                samples.update(bench_stats(conn, args.repeat))
+            if "export" in groups:
+                samples.update(bench_export(conn, workdir, args.repeat))
+            if "import" in groups:   # zadnje: mijenja bazu
+                samples.update(bench_import(conn, workdir, args.repeat, args.import_rows))
+        finally:
+            conn.close()
+    return {name: statistics.median(ts) for name, ts in samples.items()}
+
+
+def compare(current: Dict[str, float], baseline: dict, speed: float = 1.0) -> List[str]:
+    """
+    Popis regresija (prazan = sve u redu); ispisuje usporedbu. `speed` je
+    omjer kalibracije sada/baseline – baseline se njime skalira.
+    """
+    base = baseline.get("results", {})
+    threshold = baseline.get("threshold", 0.25)
+    min_delta = baseline.get("min_delta_ms", 20) / 1000
+    bad = []
+    print(f"{'slučaj':44} {'sada ms':>10} {'baseline':>10} {'razlika':>9}")
+    for name, sec in current.items():
+        ref = base.get(name)
+        if ref is not None:
+            ref *= speed
+        if ref is None:
+            print(f"{name:44} {sec * 1000:10.1f} {'-':>10} {'novo':>9}")
+            continue
+        change = sec / ref - 1 if ref else 0.0
+        flag = ""
+        if sec > ref * (1 + threshold) and sec - ref >= min_delta:
+            flag = "  ← REGRESIJA"
+            bad.append(name)
+        print(f"{name:44} {sec * 1000:10.1f} {ref * 1000:10.1f} {change:+8.0%}{flag}")
+    return bad
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", help="postojeća baza umjesto generirane (kopira se, original se ne mijenja)")
+    ap.add_argument("--scale", default="small", help="veličina generirane baze (small/medium/large)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--import-rows", type=int, default=2000)
+    ap.add_argument("--only", help="zarezom odvojeno: " + ",".join(GROUPS))
+    ap.add_argument("--threshold", type=float, help="dopušteno usporenje (0.25 = 25 %%), zadano iz baseline")
+    ap.add_argument("--update", action="store_true", help="zapiši izmjereno kao novi baseline")
+    ap.add_argument("--output", help="spremi izmjereno u JSON datoteku")
+    ap.add_argument("--no-calibrate", action="store_true", help="usporedi apsolutna vremena (bez kalibracije stroja)")
+    args = ap.parse_args()
+
+    cal = calibrate()
+    current = run(args)
+    cal = (cal + calibrate()) / 2
+    meta = {"scale": "custom" if args.db else args.scale, "seed": args.seed, "repeat": args.repeat,
+            "import_rows": args.import_rows, "calibration": round(cal, 4)}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({**meta, "results": current}, f, indent=2, ensure_ascii=False)
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, encoding="utf-8") as f:
+            baseline = json.load(f)
+    if args.threshold is not None:
+        baseline["threshold"] = args.threshold
+
+    if args.update:
+        results = dict(baseline.get("results", {})) if args.only else {}
+        results.update({k: round(v, 4) for k, v in current.items()})
+        baseline.update(meta, results=dict(sorted(results.items())))
+        baseline.setdefault("threshold", 0.25)
+        baseline.setdefault("min_delta_ms", 20)
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        compare(current, {"results": {}})
+        print(f"Baseline zapisan: {BASELINE_FILE}")
+        return 0
+
+    if baseline.get("scale") not in (None, meta["scale"]):
+        print(f"UPOZORENJE: baseline je za veličinu {baseline['scale']}, a mjereno je {meta['scale']}.")
+    speed = 1.0
+    if not args.no_calibrate and baseline.get("calibration"):
+        speed = cal / baseline["calibration"]
+        print(f"kalibracija: {cal * 1000:.1f} ms (baseline {baseline['calibration'] * 1000:.1f} ms, "
+              f"vremena baseline × {speed:.2f})")
+    bad = compare(current, baseline, speed)
+    if bad:
+        print(f"GREŠKA: {len(bad)} regresija (prag {baseline.get('threshold', 0.25):.0%}).")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+Opterećenje upisom: N istodobnih sesija (dretve, kao Streamlit sesije
+trenera s mobitela) ponavlja ono što radi aplikacija – upis sesije treninga
+pa prisustva 10–20 sportaša, ili rezultata s natjecanja – s kratkim
+čitanjem između i pauzom za "razmišljanje". Usput vanjski pisac (CLI,
+održavanje, drugi proces) povremeno drži bravu pisanja.
+
+Načini:
+  queue   upisi kroz hk_podravka/writer.py (jedna dretva pisca)
+  direct  svaka sesija piše svojom vezom (kao prije; timeout 5 s)
+
+Za queue izlazni kod je 1 ako je ijedan upis pao (npr. "database is
+locked"), ako upisanih redaka nema koliko je potvrđeno ili je p95
+latencije upisa iznad --max-p95-ms. Direct se samo ispisuje za usporedbu.
+
+    python bench/write_load.py                          # 20 sesija, 15 s, oba načina
+    python bench/write_load.py --mode queue --seconds 60 --sessions 40
+    python bench/write_load.py --db /tmp/hk_big.db      # postojeća baza (kopira se)
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+from hk_podravka import db, maintenance, writer  # noqa: E402
+
+TODAY = date(2026, 6, 30)
+SESSION_SQL = "INSERT INTO sessions (coach_id,group_id,start_ts,end_ts,location,remark) VALUES (?,?,?,?,?,?)"
+ATTENDANCE_SQL = "INSERT INTO attendance (session_id,member_id,present,minutes) VALUES (?,?,?,?)"
+RESULTS_SQL = """INSERT INTO competition_results
+                 (competition_id,member_id,weight_category,style,bouts_total,wins,losses,placement,opponent_list,notes)
+                 VALUES (?,?,?,?,?,?,?,?,?,?)"""
+READ_SQL = """SELECT COUNT(*) FROM sessions s JOIN attendance a ON a.session_id=s.id
+              WHERE s.group_id=? AND s.start_ts >= ? AND a.present=1"""
+
+
+class Result(NamedTuple):
+    mode: str
+    actions: int
+    rows: int
+    locked: int
+    errors: int
+    latencies: List[float]   # s, po upisu (predaja → potvrda)
+    seconds: float
+    missing: int             # potvrđeni redci kojih nema u bazi
+
+
+def pct(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+class Direct:
+    """Kao aplikacija prije: veza po sesiji, upis + commit."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        if not hasattr(self.local, "conn"):
+            self.local.conn = db.connect(self.path, check_same_thread=False)
+        return self.local.conn
+
+    def execute(self, sql, params) -> int:
+        conn = self._conn()
+        try:
+            rowid = conn.execute(sql, params).lastrowid
+            conn.commit()
+            return rowid
+        except Exception:
+            conn.rollback()
+            raise
+
+    def executemany(self, sql, rows) -> int:
+        conn = self._conn()
+        try:
+            n = conn.executemany(sql, rows).rowcount
+            conn.commit()
+            return n
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def external_writer(path: str, stop: threading.Event, hold_ms: int, every_s: float) -> None:
+    """Drugi proces (uvoz, održavanje): povremeno drži bravu pisanja hold_ms."""
+    conn = db.connect(path, timeout=30)
+    conn.isolation_level = None
+    while not stop.wait(every_s):
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("UPDATE analytics_state SET value=value WHERE key='__write_load__'")
+        time.sleep(hold_ms / 1000)
+        conn.execute("COMMIT")
+    conn.close()
+
+
+def run_mode(mode: str, path: str, args) -> Result:
+    conn = db.connect(path)
+    members = [r[0] for r in conn.execute("SELECT id FROM members")]
+    coaches = [r[0] for r in conn.execute("SELECT id FROM coaches")]
+    groups = [r[0] for r in conn.execute("SELECT id FROM groups")]
+    comps = [r[0] for r in conn.execute("SELECT id FROM competitions")]
+    conn.close()
+
+    w = writer.Writer(path).start() if mode == "queue" else None
+    target = w or Direct(path)
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies: List[float] = []
+    counts: Dict[str, int] = {"actions": 0, "rows": 0, "locked": 0, "errors": 0}
+
+    def timed(fn: Callable, *a):
+        t = time.perf_counter()
+        try:
+            value = fn(*a)
+        except sqlite3.OperationalError as e:
+            with lock:
+                counts["locked" if writer.is_locked(e) else "errors"] += 1
+            return None
+        except Exception:
+            with lock:
+                counts["errors"] += 1
+            return None
+        with lock:
+            latencies.append(time.perf_counter() - t)
+        return value
+
+    def session(i: int) -> None:
+        rnd = random.Random(i)
+        read = db.connect(path, check_same_thread=False)
+        try:
+            while not stop.is_set():
+                gid = rnd.choice(groups)
+                read.execute(READ_SQL, (gid, str(TODAY - timedelta(days=30)))).fetchone()
+                if rnd.random() < 0.7:
+                    start = datetime(2026, 7, 1, 8) + timedelta(minutes=rnd.randrange(0, 60 * 24 * 300))
+                    sid = timed(target.execute, SESSION_SQL,
+                                (rnd.choice(coaches), gid, start.strftime("%Y-%m-%d %H:%M"),
+                                 (start + timedelta(minutes=90)).strftime("%Y-%m-%d %H:%M"), "Dvorana", f"load {i}"))
+                    if sid is None:
+                        continue
+                    picks = rnd.sample(members, rnd.randint(10, 20))
+                    n = timed(target.executemany, ATTENDANCE_SQL, [(sid, m, 1, 90) for m in picks])
+                    with lock:
+                        counts["actions"] += 1
+                        counts["rows"] += 1 + (n or 0)
+                else:
+                    cid = rnd.choice(comps)
+                    rows = [(cid, m, "66", "GR", 3, 2, 1, rnd.randint(1, 8), "[]", f"load {i}")
+                            for m in rnd.sample(members, rnd.randint(1, 5))]
+                    n = timed(target.executemany, RESULTS_SQL, rows)
+                    with lock:
+                        counts["actions"] += 1
+                        counts["rows"] += n or 0
+                time.sleep(rnd.uniform(0, 2 * args.think_ms) / 1000)
+        finally:
+            read.close()
+
+    threads = [threading.Thread(target=session, args=(i,), name=f"sesija-{i}") for i in range(args.sessions)]
+    if args.external_ms:
+        threads.append(threading.Thread(target=external_writer, args=(path, stop, args.external_ms, 1.0)))
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    seconds = time.perf_counter() - t0
+    if w is not None:
+        w.stop()
+
+    conn = db.connect(path)
+    stored = conn.execute("SELECT COUNT(*) FROM sessions WHERE remark LIKE 'load %'").fetchone()[0]
+    stored += conn.execute("SELECT COUNT(*) FROM competition_results WHERE notes LIKE 'load %'").fetchone()[0]
+    stored += conn.execute("""SELECT COUNT(*) FROM attendance WHERE session_id IN
+                              (SELECT id FROM sessions WHERE remark LIKE 'load %')""").fetchone()[0]
+    conn.close()
+    return Result(mode, counts["actions"], counts["rows"], counts["locked"], counts["errors"],
+                  latencies, seconds, max(0, counts["rows"] - stored))
+
+
+def report(r: Result) -> None:
+    ms = [x * 1000 for x in r.latencies]
+    print(f"{r.mode:<7} akcija {r.actions:>6}  redaka {r.rows:>7} ({r.rows / r.seconds:,.0f}/s)  "
+          f"zaključano {r.locked:>4}  ostale greške {r.errors:>3}  nedostaje {r.missing:>3}  "
+          f"upis p50 {statistics.median(ms) if ms else 0:.1f} ms  p95 {pct(ms, 95):.1f} ms  "
+          f"p99 {pct(ms, 99):.1f} ms  max {max(ms, default=0):.1f} ms")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", help="postojeća baza umjesto generirane (kopira se, original se ne mijenja)")
+    ap.add_argument("--scale", default="small", help="veličina generirane baze (small/medium/large)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--mode", choices=["queue", "direct", "both"], default="both")
+    ap.add_argument("--sessions", type=int, default=20, help="istodobnih sesija")
+    ap.add_argument("--seconds", type=float, default=15)
+    ap.add_argument("--think-ms", type=int, default=20, help="prosječna pauza sesije između akcija")
+    ap.add_argument("--external-ms", type=int, default=150, help="vanjski pisac drži bravu svake sekunde (0 = bez)")
+    ap.add_argument("--max-p95-ms", type=float, default=500)
+    args = ap.parse_args()
+
+    import generate
+
+    modes = ["direct", "queue"] if args.mode == "both" else [args.mode]
+    bad = []
+    with tempfile.TemporaryDirectory() as workdir:
+        source = os.path.join(workdir, "source.db")
+        if args.db:
+            shutil.copyfile(args.db, source)
+        else:
+            t = time.perf_counter()
+            generate.generate(source, args.seed, TODAY, **generate.SCALES[args.scale])
+            print(f"baza ({args.scale}) generirana za {time.perf_counter() - t:.1f} s", file=sys.stderr)
+        conn = db.connect(source)
+        maintenance.enable_wal(conn)   # kao aplikacija pri pokretanju
+        conn.close()
+        print(f"{args.sessions} sesija × {args.seconds:g} s, vanjski pisac {args.external_ms} ms/s")
+        for mode in modes:
+            path = os.path.join(workdir, f"{mode}.db")
+            src = sqlite3.connect(source)
+            dst = sqlite3.connect(path)
+            src.backup(dst)
+            dst.execute("PRAGMA journal_mode = WAL")
+            src.close()
+            dst.close()
+            r = run_mode(mode, path, args)
+            report(r)
+            if mode == "queue":
+                p95 = pct(r.latencies, 95) * 1000
+                if r.locked or r.errors or r.missing:
+                    bad.append(f"{r.locked + r.errors} neuspjelih upisa, {r.missing} nedostaje")
+                if p95 > args.max_p95_ms:
+                    bad.append(f"p95 {p95:.0f} ms > {args.max_p95_ms:g} ms")
+    if bad:
+        print("GREŠKA: " + "; ".join(bad))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
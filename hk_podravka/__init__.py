@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+HK Podravka – pomoćni moduli aplikacije (raspored, statistika, pohrana...).
+
+Moduli ne ovise o Streamlitu: funkcije primaju otvorenu sqlite3 vezu,
+a odjeljci u hk_podravka_app.py brinu o prikazu i commitu.
+"""
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""python -m hk_podravka – vidi hk_podravka/cli.py."""
+
+from hk_podravka.cli import main
+
+raise SystemExit(main())
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Analitika prisustva: matrica sportaš × tjedan, toplinska karta i procjena
+rizika odustajanja.
+
+Matrica se gradi iz dva upita (sesije u rasponu i parovi sportaš–sesija)
+i popunjava numpy operacijama (searchsorted/bincount), bez Python petlji
+po ćelijama.
+Rezultati rizika spremaju se u dropout_scores i ponovno računaju samo za
+grupe u kojima su se od zadnjeg izračuna pojavile nove sesije ili dolasci.
+"""
+
+import sqlite3
+from datetime import date, datetime, timedelta
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from hk_podravka import archive
+
+# Tjedni se broje od ponedjeljka 3.1.2000.
+EPOCH = date(2000, 1, 3)
+RECENT_WEEKS = 4
+BASELINE_WEEKS = 12
+
+
+def week_index(d: date) -> int:
+    return (d - EPOCH).days // 7
+
+
+def week_start(idx: int) -> date:
+    return EPOCH + timedelta(days=7 * int(idx))
+
+
+class AttendanceMatrix(NamedTuple):
+    member_ids: np.ndarray   # (n,) int64
+    group_ids: np.ndarray    # (n,) int64, -1 = bez grupe
+    first_week: int          # indeks prvog stupca
+    attended: np.ndarray     # (n, w) uint8 – broj dolazaka u tjednu
+    possible: np.ndarray     # (n, w) uint8 – broj treninga grupe sportaša u tjednu
+
+    def rates(self) -> np.ndarray:
+        """Udio dolazaka po tjednu (NaN gdje grupa nije trenirala)."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.possible > 0, self.attended / np.maximum(self.possible, 1), np.nan).astype(np.float32)
+
+    def week_labels(self) -> List[str]:
+        return [week_start(self.first_week + i).strftime("%d.%m.%y") for i in range(self.attended.shape[1])]
+
+
+def attendance_matrix(conn: sqlite3.Connection, date_from: date, date_to: date,
+                      group_ids: Optional[List[int]] = None, src: archive.Sources = archive.HOT) -> AttendanceMatrix:
+    """
+    Matrica dolazaka za članove zadanih grupa (ili svih) u rasponu [date_from, date_to);
+    src iz archive.history() ako raspon seže u arhivirane sezone.
+    """
+    w0, w1 = week_index(date_from), week_index(date_to - timedelta(days=1)) + 1
+    n_weeks = max(w1 - w0, 0)
+    gfilter, gparams = "", []
+    if group_ids is not None:
+        gfilter = f" AND group_id IN ({','.join('?' * len(group_ids))})" if group_ids else " AND 0"
+        gparams = list(group_ids)
+
+    members = np.array(conn.execute(f"SELECT id, COALESCE(group_id,-1) FROM members WHERE 1=1{gfilter} ORDER BY full_name",
+                                    gparams).fetchall(), dtype=np.int64).reshape(-1, 2)
+    member_ids, member_groups = members[:, 0], members[:, 1]
+    attended = np.zeros((len(member_ids), n_weeks), dtype=np.uint8)
+    possible = np.zeros((len(member_ids), n_weeks), dtype=np.uint8)
+    if not len(member_ids) or not n_weeks:
+        return AttendanceMatrix(member_ids, member_groups, w0, attended, possible)
+
+    rng = (str(date_from), str(date_to))
+    # Sesije u rasponu: tjedan se računa vektorski iz datuma (datetime64), jednom po sesiji
+    ses = conn.execute(f"""SELECT id, COALESCE(group_id,-1), substr(start_ts,1,10) FROM {src.sessions}
+                          WHERE start_ts >= ? AND start_ts < ? ORDER BY id""", rng).fetchall()
+    if not ses:
+        return AttendanceMatrix(member_ids, member_groups, w0, attended, possible)
+    s_ids = np.fromiter((r[0] for r in ses), dtype=np.int64, count=len(ses))
+    s_groups = np.fromiter((r[1] for r in ses), dtype=np.int64, count=len(ses))
+    s_days = np.array([r[2] for r in ses], dtype="datetime64[D]")
+    s_cols = (s_days - np.datetime64(EPOCH, "D")).astype(np.int64) // 7 - w0
+    ok_s = (s_cols >= 0) & (s_cols < n_weeks)
+
+    # Redak matrice za svakog člana (member_ids su poredani po imenu, ne po id-u)
+    order = np.argsort(member_ids)
+    sorted_ids = member_ids[order]
+
+    def rows_for(ids: np.ndarray):
+        pos = np.clip(np.searchsorted(sorted_ids, ids), 0, len(sorted_ids) - 1)
+        return order[pos], sorted_ids[pos] == ids
+
+    # Dolasci: parovi (member_id, session_id) -> bincount po (redak, tjedan)
+    att = np.array(conn.execute(f"""SELECT a.member_id, a.session_id
+                                   FROM {src.sessions} s JOIN {src.attendance} a ON a.session_id=s.id
+                                   WHERE s.start_ts >= ? AND s.start_ts < ? AND a.present=1""", rng).fetchall(),
+                   dtype=np.int64).reshape(-1, 2)
+    if len(att):
+        rows, ok = rows_for(att[:, 0])
+        sp = np.searchsorted(s_ids, att[:, 1])
+        ok &= ok_s[sp]
+        flat = rows[ok] * n_weeks + s_cols[sp[ok]]
+        counts = np.bincount(flat, minlength=attended.size).reshape(attended.shape)
+        attended[:] = np.minimum(counts, 255)
+
+    # Treninzi po grupi i tjednu -> nazivnik za svakog člana te grupe
+    groups, ginv = np.unique(s_groups[ok_s], return_inverse=True)
+    per_group = np.bincount(ginv * n_weeks + s_cols[ok_s], minlength=len(groups) * n_weeks)
+    per_group = np.minimum(per_group.reshape(len(groups), n_weeks), 255).astype(np.uint8)
+    if len(groups):
+        gpos = np.clip(np.searchsorted(groups, member_groups), 0, len(groups) - 1)
+        has = (groups[gpos] == member_groups) & (member_groups >= 0)
+        possible[has] = per_group[gpos[has]]
+    return AttendanceMatrix(member_ids, member_groups, w0, attended, possible)
+
+
+def dropout_risk(m: AttendanceMatrix, recent: int = RECENT_WEEKS, baseline: int = BASELINE_WEEKS) -> dict:
+    """
+    Rizik odustajanja (0–100) po sportašu iz zadnjih `recent + baseline` tjedana matrice:
+    70 % težine ima pad udjela dolazaka (zadnji tjedni naspram ranijih),
+    30 % niz uzastopnih propuštenih tjedana na kraju razdoblja (zasićenje na 4).
+    """
+    att = m.attended[:, -(recent + baseline):].astype(np.float32)
+    pos = m.possible[:, -(recent + baseline):].astype(np.float32)
+    r_att, r_pos = att[:, -recent:].sum(1), pos[:, -recent:].sum(1)
+    b_att, b_pos = att[:, :-recent].sum(1), pos[:, :-recent].sum(1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        recent_rate = np.where(r_pos > 0, r_att / r_pos, np.nan)
+        base_rate = np.where(b_pos > 0, b_att / b_pos, np.nan)
+        decline = np.clip((base_rate - np.nan_to_num(recent_rate, nan=0.0)) / base_rate, 0, 1)
+    decline = np.nan_to_num(decline, nan=0.0)
+
+    # propušteni tjedni na kraju: tjedni u kojima je grupa trenirala, a sportaš nije došao
+    missed = (pos > 0) & (att == 0)
+    trained = pos > 0
+    # broji od kraja dok ne naiđe tjedan u kojem je sportaš došao
+    came = trained & ~missed
+    last_came = np.where(came.any(1), came.shape[1] - 1 - np.argmax(came[:, ::-1], axis=1), -1)
+    idx = np.arange(came.shape[1])
+    streak = (missed & (idx[None, :] > last_came[:, None])).sum(1)
+
+    score = np.round(100 * (0.7 * decline + 0.3 * np.minimum(streak / 4.0, 1.0)))
+    # bez ijednog treninga grupe u promatranom razdoblju nema ni procjene
+    score = np.where((r_pos + b_pos) > 0, score, np.nan)
+    return {"score": score, "recent_rate": recent_rate, "baseline_rate": base_rate, "missed_weeks": streak}
+
+
+# ==========================
+# Spremljeni rezultati (inkrementalno)
+# ==========================
+def _state(conn: sqlite3.Connection, key: str, default: str = "") -> str:
+    r = conn.execute("SELECT value FROM analytics_state WHERE key=?", (key,)).fetchone()
+    return r[0] if r else default
+
+
+def _set_state(conn: sqlite3.Connection, key: str, value) -> None:
+    conn.execute("INSERT INTO analytics_state(key,value) VALUES (?,?) "
+                 "ON CONFLICT(key) DO UPDATE SET value=excluded.value", (key, str(value)))
+
+
+def refresh_dropout_scores(conn: sqlite3.Connection, today: Optional[date] = None, force: bool = False) -> int:
+    """
+    Osvježi dropout_scores. Računa se samo za grupe s novim sesijama/dolascima
+    od zadnjeg izračuna; na početku novog tjedna (ili s force=True) za sve.
+    Vraća broj ažuriranih sportaša; commit radi pozivatelj.
+    """
+    today = today or date.today()
+    this_week = week_index(today)
+    last_sid = int(_state(conn, "last_session_id", "0") or 0)
+    last_aid = int(_state(conn, "last_attendance_id", "0") or 0)
+    max_sid = conn.execute("SELECT COALESCE(MAX(id),0) FROM sessions").fetchone()[0]
+    max_aid = conn.execute("SELECT COALESCE(MAX(id),0) FROM attendance").fetchone()[0]
+
+    if force or _state(conn, "week") != str(this_week):
+        group_ids = None
+    else:
+        group_ids = [r[0] for r in conn.execute("""
+            SELECT group_id FROM sessions WHERE id > ?
+            UNION
+            SELECT s.group_id FROM attendance a JOIN sessions s ON s.id=a.session_id WHERE a.id > ?
+        """, (last_sid, last_aid)) if r[0] is not None]
+        if not group_ids:
+            return 0
+
+    # zadnji puni tjedan je prošli; tekući se ne računa dok ne završi
+    end = week_start(this_week)
+    start = end - timedelta(weeks=RECENT_WEEKS + BASELINE_WEEKS)
+    with archive.history(conn, start, end) as src:   # početak sezone: osnovica seže u arhiviranu
+        m = attendance_matrix(conn, start, end, group_ids, src=src)
+    r = dropout_risk(m)
+    now = datetime.now().isoformat(timespec="seconds")
+
+    def _f(x):
+        return None if np.isnan(x) else float(x)
+
+    rows = [(int(mid), int(gid) if gid >= 0 else None, _f(sc), _f(rr), _f(br), int(mw), now)
+            for mid, gid, sc, rr, br, mw in zip(m.member_ids, m.group_ids, r["score"],
+                                                 r["recent_rate"], r["baseline_rate"], r["missed_weeks"])]
+    if group_ids is None:
+        conn.execute("DELETE FROM dropout_scores")
+    conn.executemany("""INSERT INTO dropout_scores
+                        (member_id,group_id,score,recent_rate,baseline_rate,missed_weeks,computed_at)
+                        VALUES (?,?,?,?,?,?,?)
+                        ON CONFLICT(member_id) DO UPDATE SET
+                            group_id=excluded.group_id, score=excluded.score, recent_rate=excluded.recent_rate,
+                            baseline_rate=excluded.baseline_rate, missed_weeks=excluded.missed_weeks,
+                            computed_at=excluded.computed_at""", rows)
+    _set_state(conn, "week", this_week)
+    _set_state(conn, "last_session_id", max_sid)
+    _set_state(conn, "last_attendance_id", max_aid)
+    return len(rows)
+
+
+def heatmap_figure(m: AttendanceMatrix, names: List[str], max_rows: int = 80):
+    """Toplinska karta udjela dolazaka (matplotlib Figure, bez pyplot globalnog stanja)."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    rates = m.rates()[:max_rows]
+    labels = m.week_labels()
+    fig = Figure(figsize=(max(6, 0.18 * rates.shape[1] + 2), max(2.5, 0.22 * rates.shape[0] + 1)))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    im = ax.imshow(np.ma.masked_invalid(rates), aspect="auto", cmap="RdYlGn", vmin=0, vmax=1,
+                   interpolation="nearest")
+    ax.set_yticks(range(rates.shape[0]))
+    ax.set_yticklabels(names[:max_rows], fontsize=7)
+    step = max(1, len(labels) // 20)
+    ax.set_xticks(range(0, len(labels), step))
+    ax.set_xticklabels(labels[::step], rotation=60, ha="right", fontsize=7)
+    fig.colorbar(im, ax=ax, fraction=0.025, label="udio dolazaka")
+    fig.tight_layout()
+    return fig
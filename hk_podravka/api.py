@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+JSON API (samo čitanje) za web stranicu i skripte trenera: članovi (bez
+osobnih podataka), natjecanja, rezultati, treninzi i prisustvo.
+
+Čista ASGI aplikacija bez dodatnih ovisnosti; pokreće se bilo kojim ASGI
+poslužiteljem, npr.:
+
+    pip install uvicorn
+    HK_PODRAVKA_DB=hk_podravka.db uvicorn hk_podravka.api:app
+
+Parametri upita:
+- `limit` (najviše MAX_LIMIT) i `after` – keyset paginacija po id-u;
+  odgovor sadrži `next` (vrijednost za sljedeći `after`) ili null
+- `fields=id,name,...` – samo odabrana polja
+- filteri po resursu (vidi RESOURCES), npr. `/results?member_id=12`
+
+ETag je izveden iz verzija tablica (data_versions) i upita, pa se
+If-None-Match provjerava bez ijednog upita nad podacima (304).
+
+Rezultati, treninzi i prisustvo čitaju se i iz arhiviranih sezona
+(archive.history); arhive koje nisu dostupne navode se u
+`archives_unavailable`.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import sqlite3
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs
+
+from hk_podravka import archive, db, versions
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+GZIP_MIN_BYTES = 1024
+
+
+class Resource(NamedTuple):
+    source: str                          # FROM ... (s JOIN-ovima)
+    pk: str                              # stupac za keyset paginaciju
+    fields: Dict[str, str]               # polje -> SQL izraz
+    filters: Dict[str, Tuple[str, Callable]]   # parametar -> (uvjet s ?, pretvorba)
+    tables: Tuple[str, ...]              # tablice čije verzije ulaze u ETag
+    archived: bool = False               # source ima {sessions}/{attendance}/{competition_results} (i arhive)
+
+
+def _date(s: str) -> str:
+    s = s.strip()
+    if len(s) != 10 or s[4] != "-" or s[7] != "-":
+        raise ValueError("datum mora biti YYYY-MM-DD")
+    return s
+
+
+RESOURCES: Dict[str, Resource] = {
+    # bez OIB-a, adrese, kontakata, dokumenata i datuma rođenja (samo godina)
+    "members": Resource(
+        source="members m LEFT JOIN groups g ON g.id=m.group_id",
+        pk="m.id",
+        fields={
+            "id": "m.id",
+            "full_name": "m.full_name",
+            "first_name": "m.first_name",
+            "last_name": "m.last_name",
+            "birth_year": "CAST(substr(m.dob,1,4) AS INTEGER)",
+            "gender": "m.gender",
+            "group_id": "m.group_id",
+            "group": "g.name",
+            "active_competitor": "m.active_competitor",
+            "veteran": "m.veteran",
+        },
+        filters={
+            "group_id": ("m.group_id=?", int),
+            "active_competitor": ("m.active_competitor=?", int),
+            "veteran": ("m.veteran=?", int),
+        },
+        tables=("members", "groups"),
+    ),
+    "competitions": Resource(
+        source="competitions c",
+        pk="c.id",
+        fields={
+            "id": "c.id",
+            "kind": "COALESCE(NULLIF(c.custom_kind,''), c.kind)",
+            "name": "c.name",
+            "date_from": "c.date_from",
+            "date_to": "c.date_to",
+            "place": "c.place",
+            "country": "c.country",
+            "country_code": "c.country_code",
+            "style": "c.style",
+            "age_group": "c.age_group",
+            "team_rank": "c.team_rank",
+            "club_competitors": "c.club_competitors",
+            "total_competitors": "c.total_competitors",
+            "total_clubs": "c.total_clubs",
+            "total_countries": "c.total_countries",
+            "coaches": "c.coaches_text",
+            "notes": "c.notes",
+            "bulletin_link": "c.bulletin_link",
+            "results_link": "c.results_link",
+            "gallery_link": "c.gallery_link",
+        },
+        filters={
+            "from": ("c.date_from>=?", _date),
+            "to": ("c.date_from<=?", _date),
+            "kind": ("c.kind=?", str),
+            "age_group": ("c.age_group=?", str),
+        },
+        tables=("competitions",),
+    ),
+    "results": Resource(
+        source="""{competition_results} r
+                  LEFT JOIN competitions c ON c.id=r.competition_id
+                  LEFT JOIN members m ON m.id=r.member_id""",
+        pk="r.id",
+        fields={
+            "id": "r.id",
+            "competition_id": "r.competition_id",
+            "competition": "c.name",
+            "date": "c.date_from",
+            "member_id": "r.member_id",
+            "member": "m.full_name",
+            "weight_category": "r.weight_category",
+            "style": "r.style",
+            "bouts_total": "r.bouts_total",
+            "wins": "r.wins",
+            "losses": "r.losses",
+            "placement": "r.placement",
+        },
+        filters={
+            "competition_id": ("r.competition_id=?", int),
+            "member_id": ("r.member_id=?", int),
+            "from": ("c.date_from>=?", _date),
+            "to": ("c.date_from<=?", _date),
+        },
+        tables=("competition_results", "competitions", "members"),
+        archived=True,
+    ),
+    "sessions": Resource(
+        source="""{sessions} s
+                  LEFT JOIN groups g ON g.id=s.group_id
+                  LEFT JOIN coaches co ON co.id=s.coach_id""",
+        pk="s.id",
+        fields={
+            "id": "s.id",
+            "start": "s.start_ts",
+            "end": "s.end_ts",
+            "duration_min": "s.duration_min",
+            "group_id": "s.group_id",
+            "group": "g.name",
+            "coach_id": "s.coach_id",
+            "coach": "co.full_name",
+            "location": "s.location",
+        },
+        filters={
+            "group_id": ("s.group_id=?", int),
+            "coach_id": ("s.coach_id=?", int),
+            "from": ("s.start_ts>=?", _date),
+            "to": ("s.start_ts<?", lambda v: _date(v) + "T99"),   # cijeli dan `to`
+        },
+        tables=("sessions", "groups", "coaches"),
+        archived=True,
+    ),
+    "attendance": Resource(
+        source="""{attendance} a
+                  JOIN {sessions} s ON s.id=a.session_id
+                  LEFT JOIN members m ON m.id=a.member_id""",
+        pk="a.id",
+        fields={
+            "id": "a.id",
+            "session_id": "a.session_id",
+            "start": "s.start_ts",
+            "group_id": "s.group_id",
+            "member_id": "a.member_id",
+            "member": "m.full_name",
+            "present": "a.present",
+            "minutes": "a.minutes",
+        },
+        filters={
+            "session_id": ("a.session_id=?", int),
+            "member_id": ("a.member_id=?", int),
+            "group_id": ("s.group_id=?", int),
+            "from": ("s.start_ts>=?", _date),
+            "to": ("s.start_ts<?", lambda v: _date(v) + "T99"),
+        },
+        tables=("attendance", "sessions", "members"),
+        archived=True,
+    ),
+}
+
+_RESERVED = {"limit", "after", "fields"}
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _parse(name: str, query: Dict[str, List[str]]) -> Tuple[List[str], List[str], list, Optional[int], int]:
+    """(polja, uvjeti, parametri, after, limit) iz query stringa."""
+    res = RESOURCES[name]
+    one = {k: v[-1] for k, v in query.items()}
+    unknown = set(one) - _RESERVED - set(res.filters)
+    if unknown:
+        raise ApiError(400, f"nepoznat parametar: {', '.join(sorted(unknown))}")
+
+    fields = [f for f in one.get("fields", "").split(",") if f] or list(res.fields)
+    bad = [f for f in fields if f not in res.fields]
+    if bad:
+        raise ApiError(400, f"nepoznato polje: {', '.join(bad)}")
+    try:
+        limit = int(one.get("limit", DEFAULT_LIMIT))
+        after = int(one["after"]) if "after" in one else None
+    except ValueError:
+        raise ApiError(400, "limit i after moraju biti cijeli brojevi")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(400, f"limit mora biti između 1 i {MAX_LIMIT}")
+
+    where, params = [], []
+    for key, (cond, conv) in res.filters.items():
+        if key in one:
+            try:
+                params.append(conv(one[key]))
+            except ValueError as e:
+                raise ApiError(400, f"{key}: {e}")
+            where.append(cond)
+    if after is not None:
+        where.append(f"{res.pk}>?")
+        params.append(after)
+    return fields, where, params, after, limit
+
+
+def fetch_page(conn: sqlite3.Connection, name: str, query: Dict[str, List[str]],
+               src: archive.Sources = archive.HOT) -> dict:
+    """Jedna stranica resursa: {"data": [...], "next": id ili None}."""
+    res = RESOURCES[name]
+    fields, where, params, _, limit = _parse(name, query)
+    cols = ", ".join([res.pk] + [f'{res.fields[f]} AS "{f}"' for f in fields])
+    source = res.source.format(**src._asdict()) if res.archived else res.source
+    sql = f"SELECT {cols} FROM {source}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {res.pk} LIMIT ?"
+    rows = conn.execute(sql, params + [limit + 1]).fetchall()
+    nxt = rows[limit - 1][0] if len(rows) > limit else None
+    return {"data": [dict(zip(fields, r[1:])) for r in rows[:limit]], "next": nxt}
+
+
+# ==========================
+# ASGI
+# ==========================
+class Api:
+    """ASGI aplikacija; veze na bazu su samo za čitanje, jedna po dretvi."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._watcher: Optional[versions.VersionWatcher] = None
+        self._watcher_lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(db.ro_uri(self.db_path), uri=True, timeout=10)
+        return conn
+
+    def _page(self, name: str, query: Dict[str, List[str]]) -> dict:
+        conn = self._conn()
+        if not RESOURCES[name].archived:
+            return fetch_page(conn, name, query)
+        with archive.history(conn) as src:
+            page = fetch_page(conn, name, query, src)
+        if src.skipped:
+            page["archives_unavailable"] = list(src.skipped)
+        return page
+
+    def _versions(self, tables: Tuple[str, ...]) -> Tuple[int, ...]:
+        with self._watcher_lock:
+            if self._watcher is None:
+                self._watcher = versions.VersionWatcher(self.db_path)
+        return self._watcher.get(tables)
+
+    def _etag(self, name: str, raw_query: bytes) -> str:
+        try:
+            vers = self._versions(RESOURCES[name].tables)
+        except sqlite3.OperationalError:
+            raise ApiError(503, "baza nije inicijalizirana")
+        key = f"{name}|{vers}|{raw_query.decode('latin-1')}".encode()
+        return 'W/"' + hashlib.sha1(key).hexdigest()[:20] + '"'
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                msg = await receive()
+                if msg["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif msg["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        status, extra, body = await self._handle(scope, headers)
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(k.encode(), v.encode()) for k, v in extra]})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+    async def _handle(self, scope, headers) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        path = scope["path"].rstrip("/") or "/"
+        try:
+            if scope["method"] not in ("GET", "HEAD"):
+                raise ApiError(405, "dozvoljeni su samo GET i HEAD")
+            if path == "/":
+                return self._json(200, {"resources": sorted(RESOURCES)}, headers)
+            name = path.lstrip("/")
+            if name not in RESOURCES:
+                raise ApiError(404, "nepostojeći resurs")
+            raw = scope.get("query_string", b"")
+            etag = self._etag(name, raw)
+            cache = [("etag", etag), ("cache-control", "no-cache"), ("vary", "Accept-Encoding")]
+            inm = headers.get("if-none-match", "")
+            if etag in [t.strip() for t in inm.split(",")] or inm.strip() == "*":
+                return 304, cache, b""
+            query = parse_qs(raw.decode("latin-1"), keep_blank_values=False)
+            page = await asyncio.to_thread(lambda: self._page(name, query))
+            status, hdrs, body = self._json(200, page, headers)
+            return status, hdrs + cache, body
+        except ApiError as e:
+            status, hdrs, body = self._json(e.status, {"error": str(e)}, headers)
+            if e.status == 405:
+                hdrs.append(("allow", "GET, HEAD"))
+            return status, hdrs, body
+        except sqlite3.OperationalError as e:
+            return self._json(503, {"error": f"baza nedostupna: {e}"}, headers)
+
+    @staticmethod
+    def _json(status: int, payload, headers) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        out = [("content-type", "application/json; charset=utf-8")]
+        if len(body) >= GZIP_MIN_BYTES and "gzip" in headers.get("accept-encoding", ""):
+            body = gzip.compress(body, compresslevel=5)
+            out.append(("content-encoding", "gzip"))
+        out.append(("content-length", str(len(body))))
+        return status, out, body
+
+
+def create_app(db_path: Optional[str] = None) -> Api:
+    return Api(db_path or db.default_path())
+
+
+app = create_app()
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+Arhiva sezona: sesije, prisustvo i rezultati zatvorenih sezona sele se iz
+glavne baze u zasebne datoteke (archive/sezona-2023-2024.db), pa tablice
+koje se svakodnevno pune i čitaju ostaju male.
+
+Povijesni izvještaji rade unutar `history(conn, od, do)`: arhive sezona koje
+dodiruju raspon pripajaju se samo za čitanje (ATTACH 'file:...?mode=ro'), a
+privremeni (TEMP) pogledi sessions_all, attendance_all i
+competition_results_all spajaju glavnu bazu i arhive (UNION ALL). Za raspon
+bez arhiviranih sezona ne pripaja se ništa i upiti idu izravno na tablice.
+SQLite pripaja najviše SQLITE_LIMIT_ATTACHED baza (obično 10); arhive preko
+toga (i one kojima nema datoteke) vraćaju se u Sources.skipped.
+
+Premještanje (archive_season): redci se prvo upišu u arhivu (commit), pa se
+u jednoj transakciji glavne baze brišu i sezona se upisuje u season_archives.
+Prekid između ta dva koraka ostavlja redke i u arhivi, ali arhiva se ne čita
+dok sezona nije upisana; ponovno arhiviranje (i za kasno upisane redke iste
+sezone) je idempotentno (INSERT OR REPLACE po id-u).
+
+Rezultati pripadaju sezoni po datumu natjecanja; natjecanja (i njihove
+datoteke) ostaju u glavnoj bazi. Trenažno opterećenje arhiviranih sezona
+izračuna se pri arhiviranju i ostaje u training_load.
+"""
+
+import contextlib
+import os
+import sqlite3
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from hk_podravka import db
+from hk_podravka.seasons import season_bounds, season_label
+
+ARCHIVE_DIR = "archive"
+TABLES = ("sessions", "attendance", "competition_results")
+
+# Indeksi u arhivi: isti kao u glavnoj bazi za upite izvještaja
+_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS {s}.ix_sessions_start ON sessions(start_ts)",
+    "CREATE INDEX IF NOT EXISTS {s}.ix_sessions_group_start ON sessions(group_id, start_ts)",
+    "CREATE INDEX IF NOT EXISTS {s}.ix_attendance_session_member ON attendance(session_id, present, member_id)",
+    "CREATE INDEX IF NOT EXISTS {s}.ix_attendance_member ON attendance(member_id, session_id)",
+    "CREATE INDEX IF NOT EXISTS {s}.ix_competition_results_comp ON competition_results(competition_id)",
+]
+
+# Redci sezone po tablici; parametri su (od, do) – [prvi dan sezone, prvi dan sljedeće)
+_SEASON_ROWS = {
+    "sessions": "start_ts >= ? AND start_ts < ?",
+    "attendance": "session_id IN (SELECT id FROM main.sessions WHERE start_ts >= ? AND start_ts < ?)",
+    "competition_results": "competition_id IN (SELECT id FROM main.competitions WHERE date_from >= ? AND date_from < ?)",
+}
+
+
+class Sources(NamedTuple):
+    """Imena tablica (ili pogleda s arhivama) za upite izvještaja."""
+    sessions: str = "sessions"
+    attendance: str = "attendance"
+    competition_results: str = "competition_results"
+    seasons: Tuple[str, ...] = ()    # pripojene arhivirane sezone
+    skipped: Tuple[str, ...] = ()    # arhivirane sezone u rasponu koje nisu pripojene
+
+
+HOT = Sources()
+
+
+class Archived(NamedTuple):
+    season: str
+    path: str
+    archived_at: str
+    sessions: int
+    attendance: int
+    results: int
+
+
+def file_name(season: str) -> str:
+    return f"sezona-{season.replace('/', '-')}.db"
+
+
+def archived(conn: sqlite3.Connection) -> List[Archived]:
+    try:
+        rows = conn.execute("""SELECT season, path, archived_at, sessions, attendance, results
+                               FROM season_archives ORDER BY season""").fetchall()
+    except sqlite3.OperationalError:   # shema još nije nadograđena
+        return []
+    return [Archived(*r) for r in rows]
+
+
+def archived_seasons(conn: sqlite3.Connection) -> List[str]:
+    return [a.season for a in archived(conn)]
+
+
+def closed_seasons(conn: sqlite3.Connection, today: Optional[date] = None) -> List[str]:
+    """Završene sezone koje još imaju sesije ili rezultate u glavnoj bazi, od najstarije."""
+    current = season_label(today or date.today())
+    lo = [r[0] for r in conn.execute("""SELECT MIN(start_ts) FROM sessions
+                                        UNION ALL
+                                        SELECT MIN(c.date_from) FROM competition_results cr
+                                        JOIN competitions c ON c.id=cr.competition_id
+                                        WHERE COALESCE(c.date_from,'') <> ''""") if r[0]]
+    if not lo:
+        return []
+    out = []
+    season = season_label(date.fromisoformat(min(lo)[:10]))
+    while season < current:
+        s0, s1 = season_bounds(season)
+        rng = (str(s0), str(s1 + timedelta(days=1)))
+        if any(conn.execute(f"SELECT 1 FROM main.{t} WHERE {_SEASON_ROWS[t]} LIMIT 1", rng).fetchone()
+               for t in TABLES):
+            out.append(season)
+        season = season_label(s1 + timedelta(days=1))
+    return out
+
+
+def _columns(conn: sqlite3.Connection, schema: str, table: str) -> List[Tuple[str, str]]:
+    return [(r[1], r[2]) for r in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def _ensure_schema(conn: sqlite3.Connection, schema: str) -> None:
+    """Tablice arhive sa stupcima iz glavne baze (stupci dodani kasnije dodaju se i u arhivu)."""
+    for table in TABLES:
+        main_cols = _columns(conn, "main", table)
+        have = {name for name, _ in _columns(conn, schema, table)}
+        if not have:
+            cols = ", ".join("id INTEGER PRIMARY KEY" if name == "id" else f"{name} {type_}"
+                             for name, type_ in main_cols)
+            conn.execute(f"CREATE TABLE {schema}.{table} ({cols})")
+            continue
+        for name, type_ in main_cols:
+            if name not in have:
+                conn.execute(f"ALTER TABLE {schema}.{table} ADD COLUMN {name} {type_}")
+    for sql in _INDEXES:
+        conn.execute(sql.format(s=schema))
+
+
+def archive_season(conn: sqlite3.Connection, season: str, archive_dir: str = ARCHIVE_DIR,
+                   today: Optional[date] = None) -> Archived:
+    """
+    Preseli sezonu u archive_dir/sezona-AAAA-AAAA.db (commita sam; veza ne
+    smije biti usred transakcije). Vraća zapis iz season_archives.
+    """
+    from hk_podravka import training_load
+
+    s0, s1 = season_bounds(season)
+    end = s1 + timedelta(days=1)
+    if end > (today or date.today()):
+        raise ValueError(f"sezona {season} još nije završila")
+    if conn.in_transaction:
+        raise ValueError("arhiviranje: veza ima nespremljene promjene")
+    # zbrojevi opterećenja prije premještanja (poslije se za arhiviranu sezonu ne računaju iz glavne baze)
+    if training_load.refresh_training_load(conn):
+        conn.commit()
+
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, file_name(season))
+    rng = (str(s0), str(end))
+    conn.execute("ATTACH DATABASE ? AS arch", (path,))
+    try:
+        _ensure_schema(conn, "arch")
+        for table in TABLES:
+            cols = ", ".join(name for name, _ in _columns(conn, "main", table))
+            conn.execute(f"INSERT OR REPLACE INTO arch.{table} ({cols}) "
+                         f"SELECT {cols} FROM main.{table} WHERE {_SEASON_ROWS[table]}", rng)
+        conn.commit()
+
+        for table in TABLES:
+            missing = conn.execute(f"SELECT COUNT(*) FROM main.{table} WHERE {_SEASON_ROWS[table]} "
+                                   f"AND id NOT IN (SELECT id FROM arch.{table})", rng).fetchone()[0]
+            if missing:
+                raise RuntimeError(f"arhiva {path}: {missing} redaka iz {table} nije upisano")
+        # prisustvo i rezultati prije sesija (uvjet za prisustvo čita main.sessions)
+        for table in ("competition_results", "attendance", "sessions"):
+            conn.execute(f"DELETE FROM main.{table} WHERE {_SEASON_ROWS[table]}", rng)
+        counts = [conn.execute(f"SELECT COUNT(*) FROM arch.{t}").fetchone()[0] for t in TABLES]
+        conn.execute("""INSERT INTO season_archives(season, path, archived_at, sessions, attendance, results)
+                        VALUES (?,?,?,?,?,?)
+                        ON CONFLICT(season) DO UPDATE SET path=excluded.path, archived_at=excluded.archived_at,
+                            sessions=excluded.sessions, attendance=excluded.attendance, results=excluded.results""",
+                     (season, path, datetime.now().isoformat(timespec="seconds"), *counts))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute("DETACH DATABASE arch")
+
+    # opterećenje sezone iz arhive (i kasno upisani redci ponovnog arhiviranja)
+    w0 = s0 - timedelta(days=s0.weekday())
+    with history(conn, w0, end + timedelta(days=7)) as src:
+        training_load.recompute_season(conn, season, src)
+        conn.commit()
+    return next(a for a in archived(conn) if a.season == season)
+
+
+# ==========================
+# Čitanje: pripajanje arhiva i pogledi
+# ==========================
+@contextlib.contextmanager
+def history(conn: sqlite3.Connection, date_from: Optional[date] = None,
+            date_to: Optional[date] = None) -> Iterator[Sources]:
+    """
+    Izvori za raspon [date_from, date_to) (None = bez granice): arhive koje ga
+    dodiruju pripajaju se samo za čitanje i spajaju s glavnom bazom u TEMP
+    poglede; na izlazu se pogledi brišu, a arhive odvajaju. Ne ugnježđivati.
+    """
+    wanted = []
+    for a in archived(conn):
+        s0, s1 = season_bounds(a.season)
+        if (date_to is None or s0 < date_to) and (date_from is None or s1 >= date_from):
+            wanted.append(a)
+    if not wanted:
+        yield HOT
+        return
+
+    # arhive ostale pripojene iz prethodnog poziva (vidi finally) koriste se ponovno
+    attached = {r[1] for r in conn.execute("PRAGMA database_list")} - {"main", "temp"}
+    reuse = {"arch_" + a.season.replace("/", "_") for a in wanted} & attached
+    room = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) - len(attached) + len(reuse)
+    use, skipped = [], []
+    for a in sorted(wanted, key=lambda a: a.season, reverse=True):   # najnovije prvo
+        (use if len(use) < room and os.path.exists(a.path) else skipped).append(a)
+    schemas: List[Tuple[str, str]] = []
+    try:
+        for a in use:
+            schema = "arch_" + a.season.replace("/", "_")
+            if schema not in reuse:
+                conn.execute(f"ATTACH DATABASE ? AS {schema}", (db.ro_uri(a.path),))
+            schemas.append((a.season, schema))
+        for table in TABLES:
+            cols = [name for name, _ in _columns(conn, "main", table)]
+            parts = [f"SELECT {', '.join(cols)} FROM main.{table}"]
+            for _, schema in schemas:
+                have = {name for name, _ in _columns(conn, schema, table)}
+                parts.append(f"SELECT {', '.join(c if c in have else f'NULL AS {c}' for c in cols)} "
+                             f"FROM {schema}.{table}")
+            conn.execute(f"DROP VIEW IF EXISTS temp.{table}_all")
+            conn.execute(f"CREATE TEMP VIEW {table}_all AS " + " UNION ALL ".join(parts))
+        yield Sources(*(f"{t}_all" for t in TABLES), tuple(sorted(s for s, _ in schemas)),
+                      tuple(sorted(a.season for a in skipped)))
+    finally:
+        for table in TABLES:
+            conn.execute(f"DROP VIEW IF EXISTS temp.{table}_all")
+        for _, schema in schemas:
+            try:
+                conn.execute(f"DETACH DATABASE {schema}")
+            except sqlite3.OperationalError:
+                # otvorena transakcija pozivatelja drži arhivu pročitanom: ostaje pripojena
+                # (samo za čitanje) do sljedećeg history() ili zatvaranja veze
+                if not conn.in_transaction:
+                    raise
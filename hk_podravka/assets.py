@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Lokalni statički resursi: klupski logo iz repozitorija ili zadnji
+učitani logo (uploads/logo), unaprijed smanjen na veličine za bočnu traku
+i zaglavlje.
+
+Smanjene slike spremaju se jednom na disk (ključ: izvor + mtime + širina)
+i drže u memoriji procesa, pa prikaz ne čita izvornik niti ovisi o mreži.
+"""
+
+import hashlib
+import io
+import os
+from functools import lru_cache
+from typing import Optional
+
+# Širina u pikselima po mjestu prikaza (2× za oštar prikaz na HiDPI zaslonima)
+LOGO_SIZES = {
+    "sidebar": 240,
+    "header": 480,
+}
+LOGO_EXTS = (".png", ".jpg", ".jpeg")
+
+
+def logo_source(upload_dir: str, default_path: str) -> Optional[str]:
+    """Zadnji učitani logo iz <upload_dir>/logo, inače zadani logo (ili None)."""
+    d = os.path.join(upload_dir, "logo")
+    try:
+        files = [e for e in os.scandir(d) if e.is_file() and e.name.lower().endswith(LOGO_EXTS)]
+    except FileNotFoundError:
+        files = []
+    if files:
+        return max(files, key=lambda e: e.stat().st_mtime_ns).path
+    return default_path if os.path.exists(default_path) else None
+
+
+def save_logo(file, upload_dir: str) -> str:
+    """
+    Spremi učitani logo pod imenom iz sadržaja (logo_<sha1>.ext). Isti
+    sadržaj se ne piše ponovno – samo postaje aktualni logo (mtime).
+    """
+    data = bytes(file.getbuffer())
+    ext = os.path.splitext(file.name)[1].lower()
+    if ext not in LOGO_EXTS:
+        ext = ".png"
+    d = os.path.join(upload_dir, "logo")
+    os.makedirs(d, exist_ok=True)
+    path = os.path.join(d, f"logo_{hashlib.sha1(data).hexdigest()[:16]}{ext}")
+    if os.path.exists(path):
+        if path != logo_source(upload_dir, ""):
+            os.utime(path)
+        return path
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return path
+
+
+def _resize(src: str, width: int) -> bytes:
+    try:
+        from PIL import Image
+    except Exception:
+        with open(src, "rb") as f:
+            return f.read()
+    with Image.open(src) as im:
+        im.load()
+        if im.width > width:
+            im = im.resize((width, round(im.height * width / im.width)), Image.LANCZOS)
+        buf = io.BytesIO()
+        if im.mode in ("RGBA", "LA", "P"):
+            im.save(buf, format="PNG", optimize=True)
+        else:
+            im.convert("RGB").save(buf, format="JPEG", quality=88, optimize=True, progressive=True)
+        return buf.getvalue()
+
+
+@lru_cache(maxsize=16)
+def _resized(src: str, mtime_ns: int, width: int, cache_dir: Optional[str]) -> bytes:
+    if not cache_dir:
+        return _resize(src, width)
+    key = hashlib.sha1(f"{os.path.abspath(src)}|{mtime_ns}|{width}".encode()).hexdigest()[:16]
+    path = os.path.join(cache_dir, "assets", f"logo_{width}_{key}.img")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+    data = _resize(src, width)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return data
+
+
+def logo_bytes(kind: str, upload_dir: str, default_path: str,
+               cache_dir: Optional[str] = None) -> Optional[bytes]:
+    """Logo smanjen za `kind` (vidi LOGO_SIZES) ili None ako logo ne postoji."""
+    src = logo_source(upload_dir, default_path)
+    if not src:
+        return None
+    return _resized(src, os.stat(src).st_mtime_ns, LOGO_SIZES[kind], cache_dir)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Statistika prisustva: tjedni, mjesečni i godišnji zbrojevi po sportašu,
+grupi i treneru, uključujući postotak dolazaka.
+
+Svi upiti filtriraju sesije rasponom nad indeksiranim start_ts i koriste
+trajanje spremljeno pri upisu (sessions.duration_min). Za raspone u
+arhiviranim sezonama pozivatelj daje izvore iz archive.history().
+"""
+
+import sqlite3
+from datetime import date, timedelta
+from typing import Tuple
+
+import pandas as pd
+
+from hk_podravka import archive
+
+# Oznaka razdoblja (strftime) po vrsti razdoblja
+PERIODS = {
+    "tjedan": "%Y-W%W",
+    "mjesec": "%Y-%m",
+    "godina": "%Y",
+}
+
+
+def period_range(kind: str, anchor: date) -> Tuple[date, date]:
+    """Raspon [od, do) tjedna/mjeseca/godine koji sadrži `anchor`."""
+    if kind == "tjedan":
+        start = anchor - timedelta(days=anchor.weekday())
+        return start, start + timedelta(days=7)
+    if kind == "mjesec":
+        start = anchor.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1)
+        return start, end
+    start = anchor.replace(month=1, day=1)
+    return start, start.replace(year=start.year + 1)
+
+
+def summary(conn: sqlite3.Connection, date_from: date, date_to: date, src: archive.Sources = archive.HOT) -> dict:
+    """Ukupno za raspon [date_from, date_to): broj treninga, minute trenera, prisustva i minute sportaša."""
+    s = conn.execute(f"""SELECT COUNT(*), COALESCE(SUM(duration_min),0)
+                        FROM {src.sessions} WHERE start_ts >= ? AND start_ts < ?""",
+                     (str(date_from), str(date_to))).fetchone()
+    a = conn.execute(f"""SELECT COUNT(*), COALESCE(SUM(COALESCE(NULLIF(a.minutes,0), s.duration_min)),0)
+                        FROM {src.sessions} s JOIN {src.attendance} a ON a.session_id=s.id
+                        WHERE s.start_ts >= ? AND s.start_ts < ? AND a.present=1""",
+                     (str(date_from), str(date_to))).fetchone()
+    return {"sessions": int(s[0]), "coach_minutes": int(s[1]),
+            "attendances": int(a[0]), "athlete_minutes": int(a[1])}
+
+
+def coach_rollup(conn: sqlite3.Connection, date_from: date, date_to: date, kind: str = "mjesec",
+                 src: archive.Sources = archive.HOT) -> pd.DataFrame:
+    """Treninzi i minute po treneru i razdoblju."""
+    return pd.read_sql_query(f"""
+        SELECT strftime(?, s.start_ts) AS razdoblje, c.full_name AS trener,
+               COUNT(*) AS treninga, SUM(s.duration_min) AS minuta,
+               ROUND(SUM(s.duration_min) / 60.0, 1) AS sati
+        FROM {src.sessions} s LEFT JOIN coaches c ON c.id=s.coach_id
+        WHERE s.start_ts >= ? AND s.start_ts < ?
+        GROUP BY razdoblje, s.coach_id
+        ORDER BY razdoblje, trener
+    """, conn, params=(PERIODS[kind], str(date_from), str(date_to)))
+
+
+def group_rollup(conn: sqlite3.Connection, date_from: date, date_to: date, kind: str = "mjesec",
+                 src: archive.Sources = archive.HOT) -> pd.DataFrame:
+    """
+    Po grupi i razdoblju: treninga, minuta, dolazaka, prosjek po treningu i
+    postotak dolazaka u odnosu na (treninga × trenutni broj članova grupe).
+    """
+    return pd.read_sql_query(f"""
+        WITH s AS (
+            SELECT id, group_id, duration_min, strftime(?, start_ts) AS razdoblje
+            FROM {src.sessions} WHERE start_ts >= ? AND start_ts < ?
+        ),
+        a AS (
+            SELECT s.group_id, s.razdoblje, COUNT(*) AS dolazaka
+            FROM {src.attendance} at JOIN s ON s.id=at.session_id
+            WHERE at.present=1 GROUP BY s.group_id, s.razdoblje
+        ),
+        t AS (
+            SELECT group_id, razdoblje, COUNT(*) AS treninga, SUM(duration_min) AS minuta
+            FROM s GROUP BY group_id, razdoblje
+        ),
+        m AS (SELECT group_id, COUNT(*) AS clanova FROM members GROUP BY group_id)
+        SELECT t.razdoblje, g.name AS grupa, t.treninga, t.minuta,
+               COALESCE(a.dolazaka,0) AS dolazaka, COALESCE(m.clanova,0) AS članova,
+               ROUND(1.0 * COALESCE(a.dolazaka,0) / t.treninga, 1) AS prosjek_po_treningu,
+               ROUND(100.0 * COALESCE(a.dolazaka,0) / NULLIF(t.treninga * m.clanova, 0), 1) AS postotak
+        FROM t
+        LEFT JOIN a ON a.group_id IS t.group_id AND a.razdoblje=t.razdoblje
+        LEFT JOIN m ON m.group_id IS t.group_id
+        LEFT JOIN groups g ON g.id=t.group_id
+        ORDER BY t.razdoblje, grupa
+    """, conn, params=(PERIODS[kind], str(date_from), str(date_to)))
+
+
+def member_rollup(conn: sqlite3.Connection, date_from: date, date_to: date, kind: str = "mjesec",
+                  src: archive.Sources = archive.HOT) -> pd.DataFrame:
+    """
+    Po sportašu i razdoblju: dolazaka, minuta, mogućih treninga (treninzi
+    njegove grupe) i postotak dolazaka. Dolasci na treninge druge grupe se
+    broje, ali bez postotka ako vlastita grupa tada nije trenirala.
+    """
+    return pd.read_sql_query(f"""
+        WITH s AS (
+            SELECT id, group_id, duration_min, strftime(?, start_ts) AS razdoblje
+            FROM {src.sessions} WHERE start_ts >= ? AND start_ts < ?
+        ),
+        a AS (
+            SELECT at.member_id, s.razdoblje, COUNT(*) AS dolazaka,
+                   SUM(COALESCE(NULLIF(at.minutes,0), s.duration_min)) AS minuta
+            FROM {src.attendance} at JOIN s ON s.id=at.session_id
+            WHERE at.present=1 GROUP BY at.member_id, s.razdoblje
+        ),
+        t AS (SELECT group_id, razdoblje, COUNT(*) AS treninga FROM s GROUP BY group_id, razdoblje),
+        r AS (
+            SELECT m.id AS member_id, t.razdoblje, t.treninga
+            FROM members m JOIN t ON t.group_id=m.group_id
+            UNION
+            SELECT a.member_id, a.razdoblje, COALESCE(t.treninga, 0)
+            FROM a JOIN members m ON m.id=a.member_id
+            LEFT JOIN t ON t.group_id=m.group_id AND t.razdoblje=a.razdoblje
+        )
+        SELECT r.razdoblje, m.full_name AS sportaš, g.name AS grupa,
+               COALESCE(a.dolazaka,0) AS dolazaka, COALESCE(a.minuta,0) AS minuta,
+               r.treninga AS mogućih,
+               ROUND(100.0 * COALESCE(a.dolazaka,0) / NULLIF(r.treninga,0), 1) AS postotak
+        FROM r
+        JOIN members m ON m.id=r.member_id
+        LEFT JOIN a ON a.member_id=r.member_id AND a.razdoblje=r.razdoblje
+        LEFT JOIN groups g ON g.id=m.group_id
+        ORDER BY r.razdoblje, sportaš
+    """, conn, params=(PERIODS[kind], str(date_from), str(date_to)))
@@ -0,0 +1,420 @@
+# -*- coding: utf-8 -*-
+"""
+Sigurnosne kopije baze i mape uploads/ bez zaustavljanja aplikacije.
+
+Baza se kopira SQLite online backup API-jem (Connection.backup) u koracima
+od PAGES_PER_STEP stranica nad jednim snimkom baze (WAL), pa unos
+prisustva za to vrijeme ne čeka. Kopija se piše u privremenu datoteku i tek gotova se
+preimenuje, a prebacuje se u journal_mode=DELETE da bude jedna datoteka.
+
+Uploadi se spremaju adresirano sadržajem (backups/files/ab/<sha256>):
+blobovi već u imenu nose SHA-256, ostale datoteke hashiraju se samo kad im
+se promijeni veličina ili vrijeme izmjene. Svaka kopija ima popis
+(snapshots/<ime>.json: putanja -> sha, veličina), pa nova kopija prenosi
+samo nove datoteke; nepromijenjeni blobovi se povezuju (hard link) umjesto
+kopiraju.
+
+    backups/
+      db/<ime>.db + <ime>.json     baza i opis (broj redaka, trajanje, provjera)
+      snapshots/<ime>.json         popis uploada te kopije
+      snapshots/<ime>.archive.json popis arhiviranih sezona (archive/, hk_podravka/archive.py)
+      files/ab/<sha256>            sadržaj uploada i arhiva (dijele ga sve kopije)
+
+Zadržavanje: zadnja kopija po danu (KEEP_DAILY dana), tjednu i mjesecu;
+datoteke uploada na koje ne pokazuje nijedna zadržana kopija brišu se.
+Provjera (verify) vraća kopiju u privremenu bazu, radi quick_check i
+uspoređuje broj redaka s onim zapisanim pri izradi te provjerava uploade.
+"""
+
+import hashlib
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from hk_podravka import blobstore, db, diagnostics
+
+BACKUP_DIR = "backups"
+PAGES_PER_STEP = 1024          # 4 MB po koraku uz stranice od 4 KB
+STEP_PAUSE = 0.002             # s između koraka (pisci dobiju bazu)
+KEEP_DAILY = 7
+KEEP_WEEKLY = 4
+KEEP_MONTHLY = 12
+VERIFY_SAMPLE = 20             # koliko datoteka uploada se ponovno hashira pri provjeri
+_STAMP = "%Y%m%d-%H%M%S"
+_LABELS = {"uploads": "uploada", "archive": "arhiva"}
+
+
+class Backup(NamedTuple):
+    name: str
+    created: datetime
+    db_file: str
+    meta_file: str
+    meta: dict
+
+
+def _dirs(backup_dir: str) -> Tuple[str, str, str]:
+    return (os.path.join(backup_dir, "db"), os.path.join(backup_dir, "snapshots"),
+            os.path.join(backup_dir, "files"))
+
+
+def _write_json(path: str, data: dict) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for b in iter(lambda: f.read(blobstore.CHUNK_SIZE), b""):
+            h.update(b)
+    return h.hexdigest()
+
+
+# ==========================
+# Baza
+# ==========================
+def copy_db(src: sqlite3.Connection, dest_path: str, pages: int = PAGES_PER_STEP,
+            pause: float = STEP_PAUSE) -> int:
+    """
+    Online kopija u dest_path (privremena datoteka + preimenovanje); vraća broj stranica.
+
+    Backup API kreće ispočetka kad izvor promijeni druga veza, pa bi uz stalne
+    upise kopija u koracima mogla trajati beskonačno. U WAL načinu izvorna veza
+    zato drži otvorenu transakciju čitanja: svi koraci čitaju isti snimak, a
+    pisci za to vrijeme normalno upisuju u WAL. Bez WAL-a bi ta transakcija
+    blokirala pisce, pa se kopira u jednom koraku.
+    """
+    wal = src.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+    if wal and not src.in_transaction:
+        src.execute("BEGIN")
+        src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()   # otvori snimak
+    elif not wal:
+        pages = -1
+    tmp = dest_path + ".part"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    total = 0
+
+    def progress(status, remaining, count):
+        nonlocal total
+        total = count
+        if remaining and pause:
+            time.sleep(pause)
+
+    dst = sqlite3.connect(tmp)
+    try:
+        src.backup(dst, pages=pages, progress=progress)
+        dst.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        dst.close()
+        if src.in_transaction:
+            src.rollback()
+    os.replace(tmp, dest_path)
+    return total
+
+
+# ==========================
+# Uploadi
+# ==========================
+def _blob_sha(rel: str) -> Optional[str]:
+    """SHA-256 iz imena bloba (blobs/ab/cd/<sha>.ext), bez čitanja datoteke."""
+    parts = rel.split("/")
+    if len(parts) == 4 and parts[0] == blobstore.BLOB_SUBDIR:
+        sha = os.path.splitext(parts[3])[0]
+        if len(sha) == 64:
+            return sha
+    return None
+
+
+def snapshot_uploads(upload_dir: str, backup_dir: str, previous: Optional[dict] = None) -> Tuple[dict, int, int]:
+    """
+    Popis uploada {putanja: [sha, veličina, mtime]} i prijenos novih datoteka u
+    files/. Vraća (popis, novih datoteka, novih bajtova).
+    """
+    files_dir = _dirs(backup_dir)[2]
+    previous = previous or {}
+    manifest: Dict[str, list] = {}
+    new_files = new_bytes = 0
+    root = os.path.abspath(upload_dir)
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root).replace(os.sep, "/")
+        if rel_dir == f"{blobstore.BLOB_SUBDIR}/tmp":
+            dirnames[:] = []
+            continue
+        for fn in filenames:
+            path = os.path.join(dirpath, fn)
+            rel = fn if rel_dir == "." else f"{rel_dir}/{fn}"
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:   # obrisano u međuvremenu
+                continue
+            sha = _blob_sha(rel)
+            prev = previous.get(rel)
+            if sha is None:
+                if prev and prev[1] == st.st_size and prev[2] == st.st_mtime:
+                    sha = prev[0]
+                else:
+                    sha = _sha256(path)
+            target = os.path.join(files_dir, sha[:2], sha)
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                tmp = target + ".part"
+                try:
+                    # blob se nikad ne mijenja na mjestu (blobstore piše novu datoteku i preimenuje)
+                    if _blob_sha(rel) is not None:
+                        os.link(path, tmp)
+                    else:
+                        shutil.copy2(path, tmp)
+                except OSError:
+                    shutil.copy2(path, tmp)
+                os.replace(tmp, target)
+                new_files += 1
+                new_bytes += st.st_size
+            manifest[rel] = [sha, st.st_size, st.st_mtime]
+    return manifest, new_files, new_bytes
+
+
+# ==========================
+# Izrada, popis, provjera, vraćanje
+# ==========================
+def create(db_path: str, upload_dir: Optional[str] = None, backup_dir: str = BACKUP_DIR,
+           pages: int = PAGES_PER_STEP, archive_dir: Optional[str] = None) -> Backup:
+    """Kopija baze i (ako su zadani upload_dir, archive_dir) inkrementalni snimak uploada i arhiva sezona."""
+    db_dir, snap_dir, _ = _dirs(backup_dir)
+    os.makedirs(db_dir, exist_ok=True)
+    os.makedirs(snap_dir, exist_ok=True)
+    now = datetime.now()
+    name = now.strftime(_STAMP)
+    db_file = os.path.join(db_dir, name + ".db")
+
+    t0 = time.perf_counter()
+    src = sqlite3.connect(db.ro_uri(db_path), uri=True, timeout=30)
+    try:
+        total_pages = copy_db(src, db_file, pages)
+    finally:
+        src.close()
+    db_seconds = time.perf_counter() - t0
+
+    copy = sqlite3.connect(db_file)
+    try:
+        counts = {t.table: t.rows for t in diagnostics.table_counts(copy, exact=True)}
+        user_version = copy.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        copy.close()
+
+    meta = {"name": name, "created": now.isoformat(timespec="seconds"), "db_source": os.path.abspath(db_path),
+            "db_bytes": os.path.getsize(db_file), "pages": total_pages, "db_seconds": round(db_seconds, 3),
+            "user_version": user_version, "counts": counts, "uploads": None, "archive": None, "verified": None}
+    previous = latest(backup_dir)
+    for kind, directory in (("uploads", upload_dir), ("archive", archive_dir)):
+        if not directory or not os.path.isdir(directory):
+            continue
+        t1 = time.perf_counter()
+        prev_manifest = _manifest(backup_dir, previous.name, kind) if previous and previous.meta.get(kind) else {}
+        manifest, new_files, new_bytes = snapshot_uploads(directory, backup_dir, prev_manifest)
+        _write_json(_manifest_path(backup_dir, name, kind), manifest)
+        meta[kind] = {"dir": os.path.abspath(directory), "files": len(manifest),
+                      "bytes": sum(v[1] for v in manifest.values()),
+                      "new_files": new_files, "new_bytes": new_bytes,
+                      "seconds": round(time.perf_counter() - t1, 3)}
+    meta_file = os.path.join(db_dir, name + ".json")
+    _write_json(meta_file, meta)
+    return Backup(name, now, db_file, meta_file, meta)
+
+
+def list_backups(backup_dir: str = BACKUP_DIR) -> List[Backup]:
+    """Sve kopije, najnovija prva."""
+    db_dir = _dirs(backup_dir)[0]
+    if not os.path.isdir(db_dir):
+        return []
+    out = []
+    for fn in os.listdir(db_dir):
+        if not fn.endswith(".json") or fn.endswith(".tmp"):
+            continue
+        name = fn[:-5]
+        db_file = os.path.join(db_dir, name + ".db")
+        try:
+            created = datetime.strptime(name, _STAMP)
+            with open(os.path.join(db_dir, fn), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (ValueError, OSError):
+            continue
+        if os.path.exists(db_file):
+            out.append(Backup(name, created, db_file, os.path.join(db_dir, fn), meta))
+    out.sort(key=lambda b: b.created, reverse=True)
+    return out
+
+
+def latest(backup_dir: str = BACKUP_DIR) -> Optional[Backup]:
+    backups = list_backups(backup_dir)
+    return backups[0] if backups else None
+
+
+def get(backup_dir: str, name: str) -> Backup:
+    for b in list_backups(backup_dir):
+        if b.name == name:
+            return b
+    raise ValueError(f"nema kopije {name} u {backup_dir}")
+
+
+def _manifest_path(backup_dir: str, name: str, kind: str = "uploads") -> str:
+    return os.path.join(_dirs(backup_dir)[1], name + (".json" if kind == "uploads" else f".{kind}.json"))
+
+
+def _manifest(backup_dir: str, name: str, kind: str = "uploads") -> dict:
+    path = _manifest_path(backup_dir, name, kind)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def verify(backup_dir: str, backup: Backup, sample: int = VERIFY_SAMPLE) -> Tuple[bool, List[str]]:
+    """
+    Probni povrat: kopija se vraća u privremenu bazu (backup API), slijedi
+    quick_check i usporedba broja redaka; uploadi i arhive sezona: postoje li sve datoteke
+    ispravne veličine, a `sample` nasumičnih se ponovno hashira.
+    Rezultat se upisuje u opis kopije (meta["verified"]).
+    """
+    problems: List[str] = []
+    with tempfile.TemporaryDirectory(prefix="hk-verify-") as tmp:
+        restored = os.path.join(tmp, "restore.db")
+        src = sqlite3.connect(db.ro_uri(backup.db_file), uri=True)
+        try:
+            copy_db(src, restored, pause=0)
+        finally:
+            src.close()
+        conn = sqlite3.connect(restored)
+        try:
+            check = [r[0] for r in conn.execute("PRAGMA quick_check(20)")]
+            if check != ["ok"]:
+                problems.append("quick_check: " + "; ".join(check))
+            counts = {t.table: t.rows for t in diagnostics.table_counts(conn, exact=True)}
+        finally:
+            conn.close()
+    for table, n in (backup.meta.get("counts") or {}).items():
+        if counts.get(table) != n:
+            problems.append(f"{table}: {counts.get(table)} redaka, pri izradi {n}")
+
+    files_dir = _dirs(backup_dir)[2]
+    for kind in ("uploads", "archive"):
+        if not backup.meta.get(kind):
+            continue
+        manifest = _manifest(backup_dir, backup.name, kind)
+        if len(manifest) != backup.meta[kind]["files"]:
+            problems.append(f"popis {_LABELS[kind]}: {len(manifest)} datoteka, pri izradi {backup.meta[kind]['files']}")
+        present = []
+        for rel, (sha, size, _) in manifest.items():
+            path = os.path.join(files_dir, sha[:2], sha)
+            try:
+                if os.path.getsize(path) != size:
+                    problems.append(f"{rel}: pogrešna veličina")
+                else:
+                    present.append((rel, sha, path))
+            except OSError:
+                problems.append(f"{rel}: nema datoteke")
+        for rel, sha, path in random.sample(present, min(sample, len(present))):
+            if _sha256(path) != sha:
+                problems.append(f"{rel}: sadržaj ne odgovara SHA-256")
+
+    ok = not problems
+    backup.meta["verified"] = {"at": datetime.now().isoformat(timespec="seconds"), "ok": ok,
+                               "problems": problems[:50]}
+    _write_json(backup.meta_file, backup.meta)
+    return ok, problems
+
+
+def restore(backup_dir: str, backup: Backup, db_path: str, upload_dir: Optional[str] = None,
+            archive_dir: Optional[str] = None) -> Tuple[int, int]:
+    """
+    Vrati bazu (backup API u postojeću datoteku, pa otvorene veze vide novu
+    bazu; pisci čekaju dok povrat ne završi) i datoteke uploada i arhiva
+    sezona koje nedostaju ili se razlikuju po veličini.
+    Vraća (stranica baze, vraćenih datoteka).
+    """
+    src = sqlite3.connect(db.ro_uri(backup.db_file), uri=True)
+    dst = sqlite3.connect(db_path, timeout=30)
+    try:
+        src.backup(dst)   # u jednom koraku: drugi pisci ne mogu upisati usred povrata
+        pages = dst.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        dst.close()
+        src.close()
+
+    restored = 0
+    files_dir = _dirs(backup_dir)[2]
+    for kind, directory in (("uploads", upload_dir), ("archive", archive_dir)):
+        if not directory or not backup.meta.get(kind):
+            continue
+        for rel, (sha, size, mtime) in _manifest(backup_dir, backup.name, kind).items():
+            target = os.path.join(directory, *rel.split("/"))
+            try:
+                if os.path.getsize(target) == size:
+                    continue
+            except OSError:
+                pass
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(os.path.join(files_dir, sha[:2], sha), target + ".part")
+            os.replace(target + ".part", target)
+            restored += 1
+    return pages, restored
+
+
+# ==========================
+# Zadržavanje
+# ==========================
+def keep_set(backups: List[Backup], daily: int = KEEP_DAILY, weekly: int = KEEP_WEEKLY,
+             monthly: int = KEEP_MONTHLY) -> set:
+    """Imena kopija koje ostaju: najnovija po danu, ISO tjednu i mjesecu (i uvijek zadnja)."""
+    keep = {backups[0].name} if backups else set()
+    for limit, key in ((daily, lambda d: d.date()), (weekly, lambda d: d.isocalendar()[:2]),
+                       (monthly, lambda d: (d.year, d.month))):
+        seen = []
+        for b in backups:   # najnovije prvo: prva u razdoblju je zadnja tog razdoblja
+            k = key(b.created)
+            if k in seen:
+                continue
+            if len(seen) >= limit:
+                break
+            seen.append(k)
+            keep.add(b.name)
+    return keep
+
+
+def prune(backup_dir: str = BACKUP_DIR, daily: int = KEEP_DAILY, weekly: int = KEEP_WEEKLY,
+          monthly: int = KEEP_MONTHLY) -> Tuple[List[str], int]:
+    """Obriši kopije izvan pravila zadržavanja i neupotrijebljene datoteke uploada. Vraća (obrisane, datoteka)."""
+    backups = list_backups(backup_dir)
+    keep = keep_set(backups, daily, weekly, monthly)
+    files_dir = _dirs(backup_dir)[2]
+    removed = []
+    for b in backups:
+        if b.name in keep:
+            continue
+        for path in (b.db_file, b.meta_file, _manifest_path(backup_dir, b.name),
+                     _manifest_path(backup_dir, b.name, "archive")):
+            if os.path.exists(path):
+                os.remove(path)
+        removed.append(b.name)
+
+    live = set()
+    for name in keep:
+        for kind in ("uploads", "archive"):
+            live.update(v[0] for v in _manifest(backup_dir, name, kind).values())
+    files = 0
+    if os.path.isdir(files_dir):
+        for sub in os.listdir(files_dir):
+            d = os.path.join(files_dir, sub)
+            for fn in os.listdir(d):
+                if fn not in live:
+                    os.remove(os.path.join(d, fn))
+                    files += 1
+    return removed, files
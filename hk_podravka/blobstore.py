@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Spremište datoteka adresirano sadržajem: upload se u komadima prepisuje u
+privremenu datoteku uz SHA-256, a sprema kao uploads/blobs/ab/cd/<sha256>.ext.
+Ista datoteka učitana više puta (npr. ista privola za svako dijete) na
+disku postoji samo jednom.
+
+Tablica `blobs` vodi broj referenci; održavaju ga okidači na stupcima iz
+BLOB_REFS (vidi init_db), pa brisanje retka smanjuje brojač bez dodatnog koda.
+"""
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+from datetime import datetime
+from typing import Optional
+
+from hk_podravka import metrics
+
+CHUNK_SIZE = 1 << 20
+BLOB_SUBDIR = "blobs"
+
+# (tablica, stupac) koji sadrže putanju do datoteke
+BLOB_REFS = [
+    ("club_docs", "path"),
+    ("coach_docs", "path"),
+    ("competition_photos", "path"),
+    ("members", "photo_path"),
+    ("members", "consent_path"),
+    ("members", "application_path"),
+    ("members", "medical_path"),
+    ("coaches", "photo_path"),
+    ("competitions", "bulletin_file"),
+    ("competitions", "results_file"),
+    ("image_variants", "path"),
+]
+
+
+def trigger_sql(table: str, column: str) -> list:
+    """Okidači koji održavaju blobs.refcount za jedan stupac s putanjom."""
+    name = f"trg_blobref_{table}_{column}"
+    inc = "UPDATE blobs SET refcount = refcount + 1 WHERE path = NEW.{c};".format(c=column)
+    dec = "UPDATE blobs SET refcount = refcount - 1 WHERE path = OLD.{c};".format(c=column)
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS {name}_ins AFTER INSERT ON {table}
+            WHEN NEW.{column} IS NOT NULL BEGIN {inc} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {name}_del AFTER DELETE ON {table}
+            WHEN OLD.{column} IS NOT NULL BEGIN {dec} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {name}_upd AFTER UPDATE OF {column} ON {table}
+            WHEN OLD.{column} IS NOT NEW.{column} BEGIN {dec} {inc} END""",
+    ]
+
+
+def _chunks(file):
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            while True:
+                b = f.read(CHUNK_SIZE)
+                if not b:
+                    return
+                yield b
+    if hasattr(file, "seek"):
+        file.seek(0)
+    while True:
+        b = file.read(CHUNK_SIZE)
+        if not b:
+            return
+        yield b
+
+
+def blob_path(upload_dir: str, sha256: str, ext: str = "") -> str:
+    return os.path.join(upload_dir, BLOB_SUBDIR, sha256[:2], sha256[2:4], sha256 + ext)
+
+
+def store(conn: sqlite3.Connection, file, upload_dir: str, kind: str = "",
+          filename: Optional[str] = None) -> str:
+    """
+    Spremi datoteku (upload objekt ili putanju) i vrati relativnu putanju bloba.
+    Ako isti sadržaj već postoji, ništa se ne piše. Pozivatelj radi commit.
+    """
+    filename = filename or getattr(file, "name", None) or os.path.basename(str(file))
+    ext = os.path.splitext(filename)[1].lower()[:10]
+    tmp_dir = os.path.join(upload_dir, BLOB_SUBDIR, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    h = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for b in _chunks(file):
+                h.update(b)
+                out.write(b)
+                size += len(b)
+        digest = h.hexdigest()
+
+        row = conn.execute("SELECT path FROM blobs WHERE sha256=?", (digest,)).fetchone()
+        label = kind.split("/")[0]
+        if row:
+            try:
+                # nova referenca još nije upisana: svjež mtime da je čišćenje (storage.purge) ne smatra starom siročadi
+                os.utime(row[0])
+                metrics.UPLOAD_FILES.inc((label, "1"))
+                return row[0]
+            except FileNotFoundError:
+                pass   # datoteke nema: zapiše se ponovno na istu putanju
+        path = row[0] if row else blob_path(upload_dir, digest, ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp, path)
+        tmp = None
+        conn.execute("""INSERT OR IGNORE INTO blobs(sha256, path, size, kind, created_at)
+                        VALUES (?,?,?,?,?)""", (digest, path, size, kind, datetime.now().isoformat()))
+        metrics.UPLOAD_FILES.inc((label, "0"))
+        metrics.UPLOAD_BYTES.inc((label,), size)
+        return path
+    finally:
+        if tmp and os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def recount(conn: sqlite3.Connection) -> int:
+    """Ponovno izračunaj blobs.refcount iz svih BLOB_REFS stupaca; vraća broj promijenjenih blobova."""
+    refs = " UNION ALL ".join(f"SELECT {c} AS path FROM {t} WHERE {c} IS NOT NULL" for t, c in BLOB_REFS)
+    counts = dict(conn.execute(f"SELECT path, COUNT(*) FROM ({refs}) GROUP BY path"))
+    upd = [(counts.get(path, 0), sha) for sha, path, n in conn.execute("SELECT sha256, path, refcount FROM blobs")
+           if counts.get(path, 0) != n]
+    conn.executemany("UPDATE blobs SET refcount=? WHERE sha256=?", upd)
+    return len(upd)
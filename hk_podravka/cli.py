@@ -0,0 +1,411 @@
+# -*- coding: utf-8 -*-
+"""
+Naredbeni redak za noćne poslove i velike uvoze, bez Streamlita:
+
+    python -m hk_podravka import members clanovi.xlsx
+    python -m hk_podravka import results rezultati.csv --batch 1000
+    python -m hk_podravka export members clanovi.xlsx
+    python -m hk_podravka export attendance prisustvo.csv --from 2025-09-01
+    python -m hk_podravka stats --period mjesec --by groups -o grupe.xlsx
+    python -m hk_podravka reminders --days 30 --format csv
+    python -m hk_podravka maintain all
+    python -m hk_podravka archive closed --keep 1
+
+Koristi istu bazu i iste module kao aplikacija (hk_podravka/db.py,
+imports.py, reports.py...). Napredak se ispisuje na stderr, a podaci
+(izvještaji bez -o) na stdout, pa se izlaz može preusmjeriti u cronu.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import date
+from typing import Callable, List, Optional
+
+from hk_podravka import archive, backup, db, imports, maintenance, storage
+
+CACHE_DIR = ".cache"
+
+
+def _log(args, msg: str) -> None:
+    if not args.quiet:
+        print(msg, file=sys.stderr, flush=True)
+
+
+def _progress(args, label: str) -> Callable[[int], None]:
+    """Ispis napretka najviše jednom u sekundi."""
+    t0 = last = time.perf_counter()
+
+    def report(n: int) -> None:
+        nonlocal last
+        now = time.perf_counter()
+        if now - last >= 1.0:
+            last = now
+            _log(args, f"{label}: {n} ({now - t0:.1f} s)")
+    return report
+
+
+def _date(s: str) -> date:
+    try:
+        return date.fromisoformat(s)
+    except ValueError:
+        raise argparse.ArgumentTypeError("datum mora biti YYYY-MM-DD")
+
+
+def _open(args) -> sqlite3.Connection:
+    """Veza na bazu sa shemom nadograđenom kao pri pokretanju aplikacije."""
+    conn = db.connect(args.db, timeout=30)
+    db.init_schema(conn)
+    conn.commit()
+    maintenance.enable_wal(conn)
+    return conn
+
+
+def _write_table(df, path: str, sheet: str) -> None:
+    if path.lower().endswith(".csv"):
+        df.to_csv(path, index=False, encoding="utf-8-sig")
+    else:
+        import pandas as pd
+        with pd.ExcelWriter(path, engine="xlsxwriter") as writer:
+            df.to_excel(writer, index=False, sheet_name=sheet)
+
+
+# ==========================
+# Naredbe
+# ==========================
+def cmd_init(args) -> int:
+    _open(args).close()
+    _log(args, f"Baza {args.db} je spremna.")
+    return 0
+
+
+def cmd_import(args) -> int:
+    conn = _open(args)
+    try:
+        rows = imports.read_rows(args.file)
+        progress = _progress(args, f"uvoz {args.what}")
+        if args.what == "members":
+            n = imports.import_members(conn, rows, args.batch, progress)
+            _log(args, f"Uvezeno članova: {n}")
+        else:
+            n, skipped = imports.import_results(conn, rows, args.batch, progress)
+            _log(args, f"Uvezeno rezultata: {n}, preskočeno (nepoznat član/natjecanje): {skipped}")
+    finally:
+        conn.close()
+    return 0
+
+
+def _export_attendance(conn, args, src: archive.Sources = archive.HOT) -> int:
+    """Prisustvo po retku (može biti stotine tisuća redaka) – CSV se piše u dijelovima."""
+    sql = f"""SELECT s.start_ts AS termin, g.name AS grupa, co.full_name AS trener, m.full_name AS sportaš,
+                    a.present AS prisutan, COALESCE(NULLIF(a.minutes,0), s.duration_min) AS minute
+             FROM {src.attendance} a JOIN {src.sessions} s ON s.id=a.session_id
+             LEFT JOIN members m ON m.id=a.member_id
+             LEFT JOIN groups g ON g.id=s.group_id
+             LEFT JOIN coaches co ON co.id=s.coach_id
+             WHERE s.start_ts >= ? AND s.start_ts < ?
+             ORDER BY s.start_ts, a.id"""
+    params = (str(args.date_from or date(1900, 1, 1)), str(args.date_to or date(9999, 1, 1)))
+    if not args.file.lower().endswith(".csv"):
+        import pandas as pd
+        _write_table(pd.read_sql_query(sql, conn, params=params), args.file, "Prisustvo")
+        return 0
+    cur = conn.execute(sql, params)
+    progress = _progress(args, "izvoz prisustva")
+    n = 0
+    with open(args.file, "w", newline="", encoding="utf-8-sig") as fh:
+        w = csv.writer(fh)
+        w.writerow([d[0] for d in cur.description])
+        while True:
+            chunk = cur.fetchmany(10000)
+            if not chunk:
+                break
+            w.writerows(chunk)
+            n += len(chunk)
+            progress(n)
+    return n
+
+
+def cmd_export(args) -> int:
+    from hk_podravka import reports
+    conn = _open(args)
+    try:
+        if args.what == "members":
+            df = reports.members_frame(conn, date.today()).drop(columns="_med_days", errors="ignore")
+            _write_table(df, args.file, "Clanovi")
+            n = len(df)
+        elif args.what == "results":
+            with archive.history(conn) as src:
+                df = reports.results_frame(conn, src)
+            if src.skipped:
+                print(f"Upozorenje: arhive nisu dostupne, njihovi rezultati nisu u izvozu: {', '.join(src.skipped)}",
+                      file=sys.stderr)
+            _write_table(df, args.file, "Rezultati")
+            n = len(df)
+        else:
+            with archive.history(conn, args.date_from, args.date_to) as src:
+                n = _export_attendance(conn, args, src)
+    finally:
+        conn.close()
+    _log(args, f"Izvezeno u {args.file}" + (f" ({n} redaka)" if n else ""))
+    return 0
+
+
+def cmd_stats(args) -> int:
+    from hk_podravka import attendance_stats
+    conn = _open(args)
+    try:
+        d0, d1 = attendance_stats.period_range(args.period, args.date)
+        with archive.history(conn, d0, d1) as src:
+            tot = attendance_stats.summary(conn, d0, d1, src)
+            _log(args, f"{d0} – {d1}: treninga {tot['sessions']}, sati trenera {tot['coach_minutes'] / 60:.1f}, "
+                       f"dolazaka {tot['attendances']}, sati sportaša {tot['athlete_minutes'] / 60:.1f}")
+            if not args.by:
+                return 0
+            rollup = {"members": attendance_stats.member_rollup, "groups": attendance_stats.group_rollup,
+                      "coaches": attendance_stats.coach_rollup}[args.by]
+            df = rollup(conn, d0, d1, args.sub or args.period, src)
+    finally:
+        conn.close()
+    if args.output:
+        _write_table(df, args.output, args.by.capitalize())
+        _log(args, f"Spremljeno u {args.output}")
+    else:
+        df.to_csv(sys.stdout, index=False)
+    return 0
+
+
+def cmd_reminders(args) -> int:
+    from hk_podravka import reports
+    conn = _open(args)
+    try:
+        items = reports.expiring(conn, date.today(), args.days, args.document or tuple(reports.EXPIRY_COLUMNS))
+    finally:
+        conn.close()
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        if args.format == "json":
+            json.dump([i._asdict() for i in items], out, ensure_ascii=False, indent=1)
+            out.write("\n")
+        elif args.format == "csv":
+            w = csv.writer(out)
+            w.writerow(reports.Expiry._fields)
+            w.writerows(items)
+        else:
+            for i in items:
+                when = f"isteklo prije {-i.days_left} dana" if i.days_left < 0 else f"za {i.days_left} dana"
+                out.write(f"{i.full_name}: {i.document} {when} ({i.valid_until})"
+                          + (f" – {i.email}" if i.email else "") + "\n")
+    finally:
+        if args.output:
+            out.close()
+    _log(args, f"Dokumenata koji istječu u {args.days} dana: {len(items)}")
+    return 0
+
+
+def cmd_backup(args) -> int:
+    if args.action == "create":
+        _open(args).close()   # shema i WAL kao u aplikaciji
+        b = backup.create(args.db, None if args.no_uploads else args.uploads, args.dir,
+                          archive_dir=None if args.no_uploads else args.archive_dir)
+        up = b.meta["uploads"]
+        _log(args, f"Kopija {b.name}: baza {b.meta['db_bytes'] / 1e6:.1f} MB u {b.meta['db_seconds']:.1f} s"
+             + (f", uploadi {up['files']} datoteka (novih {up['new_files']}, {up['new_bytes'] / 1e6:.1f} MB) "
+                f"u {up['seconds']:.1f} s" if up else "")
+             + (f", arhive sezona {b.meta['archive']['files']} (novih {b.meta['archive']['new_files']})"
+                if b.meta["archive"] else ""))
+        if args.prune:
+            removed, files = backup.prune(args.dir, args.daily, args.weekly, args.monthly)
+            _log(args, f"Obrisano kopija: {len(removed)}, datoteka uploada: {files}")
+        if args.verify:
+            ok, problems = backup.verify(args.dir, b)
+            _log(args, "Provjera: ispravno" if ok else "Provjera NEUSPJEŠNA:\n  " + "\n  ".join(problems))
+            return 0 if ok else 2
+    elif args.action == "list":
+        for b in backup.list_backups(args.dir):
+            v = b.meta.get("verified")
+            up = b.meta.get("uploads")
+            print(f"{b.name}\t{b.meta['db_bytes'] / 1e6:.1f} MB\t"
+                  f"{up['files'] if up else '-'} datoteka\t"
+                  f"{'-' if not v else ('ok ' if v['ok'] else 'GREŠKA ') + v['at']}")
+    elif args.action == "verify":
+        b = backup.get(args.dir, args.name) if args.name else backup.latest(args.dir)
+        if b is None:
+            raise ValueError(f"nema kopija u {args.dir}")
+        ok, problems = backup.verify(args.dir, b)
+        _log(args, f"{b.name}: " + ("ispravno" if ok else "NEUSPJEŠNO:\n  " + "\n  ".join(problems)))
+        return 0 if ok else 2
+    elif args.action == "restore":
+        if not args.name:
+            raise ValueError("restore: navedi ime kopije (backup list)")
+        b = backup.get(args.dir, args.name)
+        ok, problems = backup.verify(args.dir, b)
+        if not ok and not args.force:
+            raise ValueError("kopija nije prošla provjeru (--force za povrat svejedno): " + "; ".join(problems[:5]))
+        pages, files = backup.restore(args.dir, b, args.db, None if args.no_uploads else args.uploads,
+                                      None if args.no_uploads else args.archive_dir)
+        _log(args, f"Vraćena kopija {b.name}: {pages} stranica baze, {files} datoteka uploada i arhiva")
+    else:
+        removed, files = backup.prune(args.dir, args.daily, args.weekly, args.monthly)
+        _log(args, f"Obrisano kopija: {len(removed)}, datoteka uploada: {files}")
+    return 0
+
+
+def cmd_archive(args) -> int:
+    conn = _open(args)
+    try:
+        if args.action == "list":
+            for a in archive.archived(conn):
+                print(f"{a.season}\t{a.path}\t{a.archived_at}\tsesija {a.sessions}\t"
+                      f"prisustava {a.attendance}\trezultata {a.results}")
+            closed = archive.closed_seasons(conn)
+            if closed:
+                _log(args, "Završene sezone u glavnoj bazi: " + ", ".join(closed))
+            return 0
+        if args.action == "season":
+            if not args.seasons:
+                raise ValueError("archive season: navedi sezonu, npr. 2023/2024")
+            seasons = args.seasons
+        else:
+            closed = archive.closed_seasons(conn)
+            seasons = closed[:max(len(closed) - args.keep, 0)]
+        for season in seasons:
+            t0 = time.perf_counter()
+            a = archive.archive_season(conn, season, args.dir)
+            _log(args, f"[{season}] {a.path}: sesija {a.sessions}, prisustava {a.attendance}, "
+                       f"rezultata {a.results} ({time.perf_counter() - t0:.1f} s)")
+        if seasons:
+            _log(args, "Slobodne stranice glavne baze vraća: python -m hk_podravka maintain vacuum")
+    finally:
+        conn.close()
+    return 0
+
+
+MAINTENANCE_TASKS = ["countries", "images", "recount", "gc", "load", "dropout"] + maintenance.TASKS
+
+
+def cmd_maintain(args) -> int:
+    from hk_podravka import analytics, blobstore, countries, images, training_load
+    tasks = MAINTENANCE_TASKS if args.task == "all" else [args.task]
+    conn = _open(args)
+    try:
+        for task in tasks:
+            t0 = time.perf_counter()
+            if task == "countries":
+                msg = f"popunjeno kodova država: {countries.backfill_codes(conn, os.path.join(args.cache_dir, 'countries.json'))}"
+            elif task == "images":
+                shas = images.pending(conn, limit=100000)
+                progress = _progress(args, "obrada slika")
+                for i, sha in enumerate(shas, 1):
+                    images.try_process(conn, sha, args.uploads, keep_original=args.keep_originals)
+                    if i % 20 == 0:
+                        progress(i)
+                msg = f"obrađeno slika: {len(shas)}"
+            elif task == "recount":
+                msg = f"ispravljenih brojača referenci: {blobstore.recount(conn)}"
+            elif task == "gc":
+                files, nbytes = storage.purge(conn, args.uploads, args.grace_days)
+                missing = storage.drop_missing_blobs(conn)
+                msg = f"obrisano datoteka: {files} ({nbytes / 1e6:.1f} MB), uklonjeno zapisa bez datoteke: {missing}"
+            elif task in maintenance.TASKS:
+                step = maintenance.run(conn, args.db, [task], full=args.full)[0]
+                msg = (f"{step.detail}; baza {step.before.db_bytes / 1e6:.1f} → {step.after.db_bytes / 1e6:.1f} MB, "
+                       f"WAL {step.before.wal_bytes / 1e6:.1f} → {step.after.wal_bytes / 1e6:.1f} MB, "
+                       f"slobodnih stranica {step.before.freelist_pages} → {step.after.freelist_pages}")
+            elif task == "load":
+                msg = f"preračunate sezone opterećenja: {', '.join(training_load.refresh_training_load(conn, args.full)) or '-'}"
+            else:
+                msg = f"sportaša s novim rizikom odustajanja: {analytics.refresh_dropout_scores(conn, force=args.full)}"
+            conn.commit()
+            _log(args, f"[{task}] {msg} ({time.perf_counter() - t0:.1f} s)")
+    finally:
+        conn.close()
+    return 0
+
+
+# ==========================
+# Argumenti
+# ==========================
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="python -m hk_podravka", description="HK Podravka – uvoz, izvoz, izvještaji i održavanje")
+    p.add_argument("--db", default=db.default_path(), help="putanja baze (zadano: $HK_PODRAVKA_DB ili hk_podravka.db)")
+    p.add_argument("--uploads", default=db.UPLOAD_DIR, help="mapa s datotekama (zadano: uploads)")
+    p.add_argument("-q", "--quiet", action="store_true", help="bez ispisa napretka")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    s = sub.add_parser("init", help="stvori ili nadogradi shemu baze")
+    s.set_defaults(func=cmd_init)
+
+    s = sub.add_parser("import", help="uvoz iz .xlsx/.csv po predlošku")
+    s.add_argument("what", choices=["members", "results"])
+    s.add_argument("file")
+    s.add_argument("--batch", type=int, default=imports.BATCH_SIZE,
+                   help=f"redaka po transakciji (zadano {imports.BATCH_SIZE})")
+    s.set_defaults(func=cmd_import)
+
+    s = sub.add_parser("export", help="izvoz u .xlsx ili .csv")
+    s.add_argument("what", choices=["members", "results", "attendance"])
+    s.add_argument("file")
+    s.add_argument("--from", dest="date_from", type=_date, help="prisustvo od (YYYY-MM-DD)")
+    s.add_argument("--to", dest="date_to", type=_date, help="prisustvo do, isključivo")
+    s.set_defaults(func=cmd_export)
+
+    s = sub.add_parser("stats", help="statistika prisustva za tjedan/mjesec/godinu")
+    s.add_argument("--period", choices=["tjedan", "mjesec", "godina"], default="mjesec")
+    s.add_argument("--date", type=_date, default=date.today(), help="dan unutar razdoblja (zadano danas)")
+    s.add_argument("--by", choices=["members", "groups", "coaches"], help="zbroj po sportašu/grupi/treneru")
+    s.add_argument("--sub", choices=["tjedan", "mjesec", "godina"], help="podrazdoblje zbroja (zadano kao --period)")
+    s.add_argument("-o", "--output", help=".xlsx ili .csv (inače CSV na stdout)")
+    s.set_defaults(func=cmd_stats)
+
+    s = sub.add_parser("reminders", help="liječničke, osobne i putovnice kojima istječe valjanost")
+    s.add_argument("--days", type=int, default=14)
+    s.add_argument("--document", action="append", choices=["liječnička", "osobna", "putovnica"])
+    s.add_argument("--format", choices=["text", "csv", "json"], default="text")
+    s.add_argument("-o", "--output")
+    s.set_defaults(func=cmd_reminders)
+
+    s = sub.add_parser("maintain", help="održavanje: " + ", ".join(MAINTENANCE_TASKS))
+    s.add_argument("task", choices=["all"] + MAINTENANCE_TASKS)
+    s.add_argument("--full", action="store_true", help="potpuni preračun (load, dropout), puni ANALYZE (optimize), "
+                                                         "prijelaz na auto_vacuum=INCREMENTAL punim VACUUM-om (vacuum)")
+    s.add_argument("--grace-days", type=int, default=storage.GRACE_DAYS, help="gc: briši siročad stariju od N dana")
+    s.add_argument("--keep-originals", action="store_true", help="images: zadrži izvornike fotografija")
+    s.add_argument("--cache-dir", default=CACHE_DIR)
+    s.set_defaults(func=cmd_maintain)
+
+    s = sub.add_parser("archive", help="zatvorene sezone u zasebne datoteke (list, season, closed)")
+    s.add_argument("action", choices=["list", "season", "closed"])
+    s.add_argument("seasons", nargs="*", help="season: sezone, npr. 2023/2024")
+    s.add_argument("--keep", type=int, default=1, help="closed: zadnjih N završenih sezona ostaje u glavnoj bazi")
+    s.add_argument("--dir", default=os.environ.get("HK_PODRAVKA_ARCHIVE", archive.ARCHIVE_DIR), help="mapa arhiva")
+    s.set_defaults(func=cmd_archive)
+
+    s = sub.add_parser("backup", help="sigurnosne kopije baze i uploada (create, list, verify, restore, prune)")
+    s.add_argument("action", choices=["create", "list", "verify", "restore", "prune"])
+    s.add_argument("name", nargs="?", help="ime kopije (verify: zadano zadnja; restore: obavezno)")
+    s.add_argument("--dir", default=os.environ.get("HK_PODRAVKA_BACKUPS", backup.BACKUP_DIR), help="mapa s kopijama")
+    s.add_argument("--archive-dir", default=os.environ.get("HK_PODRAVKA_ARCHIVE", archive.ARCHIVE_DIR),
+                   help="mapa arhiviranih sezona (archive)")
+    s.add_argument("--no-uploads", action="store_true", help="samo baza (bez uploada i arhiva sezona)")
+    s.add_argument("--prune", action="store_true", help="create: nakon kopije primijeni zadržavanje")
+    s.add_argument("--verify", action="store_true", help="create: nakon kopije napravi probni povrat")
+    s.add_argument("--force", action="store_true", help="restore: i ako provjera ne prođe")
+    s.add_argument("--daily", type=int, default=backup.KEEP_DAILY, help="zadrži zadnju kopiju za N dana")
+    s.add_argument("--weekly", type=int, default=backup.KEEP_WEEKLY, help="... N tjedana")
+    s.add_argument("--monthly", type=int, default=backup.KEEP_MONTHLY, help="... N mjeseci")
+    s.set_defaults(func=cmd_backup)
+    return p
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (OSError, sqlite3.Error, ValueError) as e:
+        print(f"Greška: {e}", file=sys.stderr)
+        return 1
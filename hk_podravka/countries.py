@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+Države: indeks za prepoznavanje naziva države (hrvatski i engleski naziv,
+uobičajeni nazivi, ISO2/ISO3 i IOC kratice) u ISO3 kod.
+
+Indeks se gradi jednom (hrvatska tablica + pycountry ako je instaliran),
+sprema na disk kao JSON i drži u memoriji, pa je svako traženje jedan
+pogled u rječnik. pycountry se uvozi samo pri izgradnji indeksa.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional
+
+
+class Country(NamedTuple):
+    iso2: str
+    iso3: str
+    name_hr: str
+    name_en: str
+
+
+# ISO2 ISO3 | hrvatski naziv | engleski naziv
+_HR_TABLE = """
+HR HRV | Hrvatska | Croatia
+SI SVN | Slovenija | Slovenia
+BA BIH | Bosna i Hercegovina | Bosnia and Herzegovina
+RS SRB | Srbija | Serbia
+ME MNE | Crna Gora | Montenegro
+MK MKD | Sjeverna Makedonija | North Macedonia
+AL ALB | Albanija | Albania
+XK XKX | Kosovo | Kosovo
+HU HUN | Mađarska | Hungary
+AT AUT | Austrija | Austria
+DE DEU | Njemačka | Germany
+IT ITA | Italija | Italy
+CH CHE | Švicarska | Switzerland
+LI LIE | Lihtenštajn | Liechtenstein
+FR FRA | Francuska | France
+ES ESP | Španjolska | Spain
+PT PRT | Portugal | Portugal
+AD AND | Andora | Andorra
+MC MCO | Monako | Monaco
+SM SMR | San Marino | San Marino
+VA VAT | Vatikan | Holy See
+MT MLT | Malta | Malta
+GB GBR | Ujedinjeno Kraljevstvo | United Kingdom
+IE IRL | Irska | Ireland
+IS ISL | Island | Iceland
+NL NLD | Nizozemska | Netherlands
+BE BEL | Belgija | Belgium
+LU LUX | Luksemburg | Luxembourg
+DK DNK | Danska | Denmark
+NO NOR | Norveška | Norway
+SE SWE | Švedska | Sweden
+FI FIN | Finska | Finland
+EE EST | Estonija | Estonia
+LV LVA | Latvija | Latvia
+LT LTU | Litva | Lithuania
+PL POL | Poljska | Poland
+CZ CZE | Češka | Czechia
+SK SVK | Slovačka | Slovakia
+RO ROU | Rumunjska | Romania
+BG BGR | Bugarska | Bulgaria
+GR GRC | Grčka | Greece
+CY CYP | Cipar | Cyprus
+TR TUR | Turska | Türkiye
+UA UKR | Ukrajina | Ukraine
+BY BLR | Bjelorusija | Belarus
+MD MDA | Moldavija | Moldova
+RU RUS | Rusija | Russia
+GE GEO | Gruzija | Georgia
+AM ARM | Armenija | Armenia
+AZ AZE | Azerbajdžan | Azerbaijan
+KZ KAZ | Kazahstan | Kazakhstan
+KG KGZ | Kirgistan | Kyrgyzstan
+UZ UZB | Uzbekistan | Uzbekistan
+TJ TJK | Tadžikistan | Tajikistan
+TM TKM | Turkmenistan | Turkmenistan
+MN MNG | Mongolija | Mongolia
+CN CHN | Kina | China
+JP JPN | Japan | Japan
+KR KOR | Južna Koreja | South Korea
+KP PRK | Sjeverna Koreja | North Korea
+TW TWN | Tajvan | Taiwan
+IN IND | Indija | India
+PK PAK | Pakistan | Pakistan
+AF AFG | Afganistan | Afghanistan
+IR IRN | Iran | Iran
+IQ IRQ | Irak | Iraq
+IL ISR | Izrael | Israel
+SY SYR | Sirija | Syria
+LB LBN | Libanon | Lebanon
+JO JOR | Jordan | Jordan
+SA SAU | Saudijska Arabija | Saudi Arabia
+AE ARE | Ujedinjeni Arapski Emirati | United Arab Emirates
+QA QAT | Katar | Qatar
+KW KWT | Kuvajt | Kuwait
+BH BHR | Bahrein | Bahrain
+EG EGY | Egipat | Egypt
+TN TUN | Tunis | Tunisia
+DZ DZA | Alžir | Algeria
+MA MAR | Maroko | Morocco
+LY LBY | Libija | Libya
+NG NGA | Nigerija | Nigeria
+SN SEN | Senegal | Senegal
+CM CMR | Kamerun | Cameroon
+GN GIN | Gvineja | Guinea
+GW GNB | Gvineja Bisau | Guinea-Bissau
+KE KEN | Kenija | Kenya
+ZA ZAF | Južnoafrička Republika | South Africa
+US USA | Sjedinjene Američke Države | United States
+CA CAN | Kanada | Canada
+MX MEX | Meksiko | Mexico
+CU CUB | Kuba | Cuba
+PR PRI | Portoriko | Puerto Rico
+BR BRA | Brazil | Brazil
+AR ARG | Argentina | Argentina
+CL CHL | Čile | Chile
+CO COL | Kolumbija | Colombia
+VE VEN | Venezuela | Venezuela
+PE PER | Peru | Peru
+EC ECU | Ekvador | Ecuador
+AU AUS | Australija | Australia
+NZ NZL | Novi Zeland | New Zealand
+TH THA | Tajland | Thailand
+VN VNM | Vijetnam | Vietnam
+PH PHL | Filipini | Philippines
+ID IDN | Indonezija | Indonesia
+"""
+
+# Uobičajeni nazivi i IOC kratice (kako ih pišu UWW bilteni) -> ISO3
+_ALIASES = {
+    "SAD": "USA", "Amerika": "USA", "Sjedinjene Države": "USA", "United States of America": "USA",
+    "UK": "GBR", "Velika Britanija": "GBR", "Britanija": "GBR", "Engleska": "GBR", "Great Britain": "GBR",
+    "BiH": "BIH", "Bosna": "BIH", "Makedonija": "MKD", "Macedonia": "MKD",
+    "Češka Republika": "CZE", "Czech Republic": "CZE", "Holandija": "NLD", "Holland": "NLD",
+    "Turkey": "TUR", "Russian Federation": "RUS", "Belorusija": "BLR", "Kirgizija": "KGZ",
+    "Koreja": "KOR", "Republika Koreja": "KOR", "Korea": "KOR", "Emirati": "ARE", "UAE": "ARE",
+    "Chinese Taipei": "TWN", "Južna Afrika": "ZAF", "Moldova": "MDA", "Crna gora": "MNE",
+    # IOC kratice koje se razlikuju od ISO3
+    "CRO": "HRV", "SLO": "SVN", "GER": "DEU", "SUI": "CHE", "NED": "NLD", "DEN": "DNK",
+    "BUL": "BGR", "GRE": "GRC", "LAT": "LVA", "POR": "PRT", "MGL": "MNG", "IRI": "IRN",
+    "ALG": "DZA", "NGR": "NGA", "RSA": "ZAF", "PUR": "PRI", "CHI": "CHL", "TPE": "TWN",
+    "KOS": "XKX", "MON": "MCO",
+}
+
+
+def normalize(name: str) -> str:
+    """Ključ za traženje: mala slova, bez dijakritika i interpunkcije."""
+    s = str(name or "").strip().casefold().replace("đ", "d")
+    s = "".join(ch for ch in unicodedata.normalize("NFKD", s) if not unicodedata.combining(ch))
+    return re.sub(r"[^a-z0-9]+", " ", s).strip()
+
+
+def _source_hash() -> str:
+    try:
+        import importlib.metadata as md
+        pyc = md.version("pycountry")
+    except Exception:
+        pyc = ""
+    return hashlib.sha1((_HR_TABLE + repr(sorted(_ALIASES.items())) + pyc).encode()).hexdigest()[:12]
+
+
+def _build() -> dict:
+    countries: Dict[str, List[str]] = {}
+    index: Dict[str, str] = {}
+
+    def add(key: str, iso3: str, override: bool = False):
+        k = normalize(key)
+        if k and (override or k not in index):
+            index[k] = iso3
+
+    try:
+        import pycountry
+        for c in pycountry.countries:
+            en = getattr(c, "common_name", None) or c.name
+            countries[c.alpha_3] = [c.alpha_2, en, en]
+            for key in (c.name, en, getattr(c, "official_name", None), c.alpha_2, c.alpha_3):
+                if key:
+                    add(key, c.alpha_3)
+    except Exception:
+        pass
+
+    # hrvatski nazivi i aliasi imaju prednost pred pycountry nazivima
+    for line in _HR_TABLE.strip().splitlines():
+        codes, hr, en = [p.strip() for p in line.split("|")]
+        iso2, iso3 = codes.split()
+        countries[iso3] = [iso2, hr, en]
+        for key in (hr, en, iso2, iso3):
+            add(key, iso3, override=True)
+    for alias, iso3 in _ALIASES.items():
+        add(alias, iso3, override=True)
+    return {"source": _source_hash(), "countries": countries, "index": index}
+
+
+@lru_cache(maxsize=4)
+def _load(cache_path: Optional[str]) -> dict:
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("source") == _source_hash():
+                return data
+        except Exception:
+            pass
+    data = _build()
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        tmp = cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, cache_path)
+    return data
+
+
+def resolve(name: str, cache_path: Optional[str] = None) -> Optional[Country]:
+    """Država za slobodno upisani naziv/kod ili None."""
+    data = _load(cache_path)
+    iso3 = data["index"].get(normalize(name))
+    if not iso3:
+        return None
+    iso2, hr, en = data["countries"][iso3]
+    return Country(iso2, iso3, hr, en)
+
+
+def iso3(name: str, cache_path: Optional[str] = None) -> str:
+    c = resolve(name, cache_path)
+    return c.iso3 if c else ""
+
+
+def options(cache_path: Optional[str] = None) -> List[str]:
+    """Hrvatski nazivi (gdje postoje) za odabir u formi, abecedno."""
+    data = _load(cache_path)
+    return sorted({v[1] for v in data["countries"].values()}, key=normalize)
+
+
+def backfill_codes(conn: sqlite3.Connection, cache_path: Optional[str] = None) -> int:
+    """Popuni prazan competitions.country_code gdje se država može prepoznati."""
+    rows = conn.execute("""SELECT id, country FROM competitions
+                           WHERE COALESCE(country_code,'')='' AND COALESCE(country,'')<>''""").fetchall()
+    upd = [(code, cid) for cid, name in rows if (code := iso3(name, cache_path))]
+    if upd:   # executemany i bez redaka otvara transakciju koju pozivatelj ne bi zatvorio
+        conn.executemany("UPDATE competitions SET country_code=? WHERE id=?", upd)
+    return len(upd)
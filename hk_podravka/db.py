@@ -0,0 +1,450 @@
+# -*- coding: utf-8 -*-
+"""
+Baza podataka: putanja, otvaranje veze i shema (tablice, indeksi, okidači).
+
+Zajedničko za Streamlit aplikaciju, JSON API i naredbeni redak
+(python -m hk_podravka); shema se nadograđuje na mjestu (CREATE ... IF NOT
+EXISTS i dodavanje stupaca koji nedostaju), a commit radi pozivatelj.
+"""
+
+import os
+import sqlite3
+from urllib.parse import quote
+
+from hk_podravka import blobstore, versions
+
+DB_PATH = "hk_podravka.db"
+UPLOAD_DIR = "uploads"
+SCHEMA_VERSION = 1   # PRAGMA user_version; povećati kad init_schema dobije promjenu koja traži migraciju
+
+
+def default_path() -> str:
+    """Putanja baze za API i naredbeni redak (varijabla okoline HK_PODRAVKA_DB)."""
+    return os.environ.get("HK_PODRAVKA_DB", DB_PATH)
+
+
+def connect(path: str = DB_PATH, check_same_thread: bool = True, timeout: float = 5.0,
+            factory=sqlite3.Connection) -> sqlite3.Connection:
+    """factory: npr. querylog.InstrumentedConnection za mjerenje upita."""
+    # uri=True: ATTACH 'file:...?mode=ro' za arhivirane sezone (obična putanja radi kao i prije)
+    conn = sqlite3.connect(path, check_same_thread=check_same_thread, timeout=timeout, factory=factory, uri=True)
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def ro_uri(path: str) -> str:
+    """URI za otvaranje samo za čitanje (uri=True); #, ? i % iz putanje se kodiraju, inače su dio URI-ja."""
+    return "file:" + quote(os.path.abspath(path).replace(os.sep, "/")) + "?mode=ro"
+
+
+def init_schema(conn: sqlite3.Connection) -> None:
+    """Stvori ili nadogradi sve tablice (bez commita)."""
+    cur = conn.cursor()
+    # Nova (prazna) baza: slobodne stranice vraćaju se s PRAGMA incremental_vacuum (hk_podravka/maintenance.py)
+    if cur.execute("PRAGMA page_count").fetchone()[0] == 0:
+        cur.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+    # Osnovni podaci o klubu
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS club_info (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            name TEXT, street TEXT, city_zip TEXT,
+            email TEXT, address TEXT, oib TEXT, web TEXT, iban TEXT,
+            president TEXT, secretary TEXT,
+            instagram TEXT, facebook TEXT, tiktok TEXT,
+            created_at TEXT, updated_at TEXT
+        )
+    """)
+
+    # Članovi tijela (predsjedništvo & nadzorni)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS board_members (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT CHECK(kind IN ('board','supervisory')),
+            full_name TEXT, phone TEXT, email TEXT
+        )
+    """)
+
+    # Dokumenti kluba
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS club_docs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT,             -- npr. 'statut', 'pravilnik', 'ostalo'
+            filename TEXT,
+            path TEXT,
+            uploaded_at TEXT
+        )
+    """)
+
+    # Grupe
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS groups (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE
+        )
+    """)
+
+    # Članovi
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS members (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            full_name TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            dob TEXT,
+            gender TEXT CHECK (gender IN ('M','Ž','')),
+            oib TEXT,
+            street TEXT,
+            city TEXT,
+            postal_code TEXT,
+            residence TEXT,
+            athlete_email TEXT,
+            parent_email TEXT,
+            athlete_phone TEXT,
+            parent_phone TEXT,
+            id_card_number TEXT, id_card_issuer TEXT, id_card_valid_until TEXT,
+            passport_number TEXT, passport_issuer TEXT, passport_valid_until TEXT,
+            active_competitor INTEGER DEFAULT 0,
+            veteran INTEGER DEFAULT 0,
+            other_flag INTEGER DEFAULT 0,
+            membership_fee_eur REAL DEFAULT 0,
+            group_id INTEGER,
+            photo_path TEXT,
+            consent_path TEXT,       -- privola
+            application_path TEXT,   -- pristupnica ili dodatni dokument
+            medical_path TEXT,
+            medical_valid_until TEXT,
+            FOREIGN KEY(group_id) REFERENCES groups(id) ON DELETE SET NULL
+        )
+    """)
+    # Backward compatible ALTERs
+    def ensure_column(table: str, col: str, ddl: str) -> bool:
+        have = cur.execute(f"PRAGMA table_info({table})").fetchall()
+        names = [r[1] for r in have]
+        if col not in names:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN {col} {ddl}")
+            return True
+        return False
+
+    ensure_column("members","first_name","TEXT")
+    ensure_column("members","last_name","TEXT")
+    ensure_column("members","street","TEXT")
+    ensure_column("members","city","TEXT")
+    ensure_column("members","postal_code","TEXT")
+    ensure_column("members","athlete_phone","TEXT")
+    ensure_column("members","parent_phone","TEXT")
+    ensure_column("members","parent_name","TEXT")
+
+    # Treneri
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS coaches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            full_name TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            dob TEXT,
+            oib TEXT,
+            email TEXT,
+            iban TEXT,
+            photo_path TEXT
+        )
+    """)
+    ensure_column("coaches","first_name","TEXT")
+    ensure_column("coaches","last_name","TEXT")
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS coach_docs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            coach_id INTEGER,
+            kind TEXT, filename TEXT, path TEXT, uploaded_at TEXT,
+            FOREIGN KEY(coach_id) REFERENCES coaches(id) ON DELETE CASCADE
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS coach_groups (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            coach_id INTEGER,
+            group_id INTEGER,
+            assigned_at TEXT,
+            FOREIGN KEY(coach_id) REFERENCES coaches(id) ON DELETE CASCADE,
+            FOREIGN KEY(group_id) REFERENCES groups(id) ON DELETE CASCADE
+        )
+    """)
+
+    # Natjecanja
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS competitions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT,          -- kategorija natjecanja
+            custom_kind TEXT,   -- ili podvrsta repre.
+            name TEXT,          -- ime natjecanja
+            date_from TEXT,
+            date_to TEXT,
+            place TEXT,
+            style TEXT,         -- GR, FS, WW, BW, MODIFICIRANO
+            age_group TEXT,     -- POČETNICI, U11, U13, U15, U17, U20, U23, SENIORI
+            country TEXT,       -- puna država
+            country_code TEXT,  -- ISO3
+            team_rank TEXT,
+            club_competitors INTEGER,     -- broj nastupajućih iz kluba
+            total_competitors INTEGER,    -- ukupan broj natjecatelja
+            total_clubs INTEGER,
+            total_countries INTEGER,
+            coaches_text TEXT,
+            notes TEXT,         -- zapažanja trenera (za objave)
+            bulletin_link TEXT,
+            results_link TEXT,
+            gallery_link TEXT,
+            bulletin_file TEXT,
+            results_file TEXT
+        )
+    """)
+    ensure_column("competitions","bulletin_file","TEXT")
+    ensure_column("competitions","results_file","TEXT")
+
+    # Rezultati natjecanja po sportašu
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS competition_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            competition_id INTEGER,
+            member_id INTEGER,
+            weight_category TEXT,
+            style TEXT,
+            bouts_total INTEGER,
+            wins INTEGER,
+            losses INTEGER,
+            placement INTEGER,
+            opponent_list TEXT,    -- JSON: [{name,club,win/lose}...]
+            notes TEXT,
+            FOREIGN KEY(competition_id) REFERENCES competitions(id) ON DELETE CASCADE,
+            FOREIGN KEY(member_id) REFERENCES members(id) ON DELETE SET NULL
+        )
+    """)
+
+    # Slike s natjecanja (više datoteka)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS competition_photos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            competition_id INTEGER,
+            filename TEXT, path TEXT, uploaded_at TEXT,
+            FOREIGN KEY(competition_id) REFERENCES competitions(id) ON DELETE CASCADE
+        )
+    """)
+
+    # Galerija: stranice po natjecanju/sezoni (keyset po uploaded_at, id)
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_competition_photos_comp_uploaded ON competition_photos(competition_id, uploaded_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_competition_photos_uploaded ON competition_photos(uploaded_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_competitions_date ON competitions(date_from)")
+
+    # Prisustvo: treneri (sesije) i članovi (dolazak)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            coach_id INTEGER,
+            group_id INTEGER,
+            start_ts TEXT,
+            end_ts TEXT,
+            location TEXT,
+            remark TEXT,
+            FOREIGN KEY(coach_id) REFERENCES coaches(id) ON DELETE SET NULL,
+            FOREIGN KEY(group_id) REFERENCES groups(id) ON DELETE SET NULL
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS attendance (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id INTEGER,
+            member_id INTEGER,
+            present INTEGER DEFAULT 1,
+            minutes INTEGER DEFAULT 0,
+            FOREIGN KEY(session_id) REFERENCES sessions(id) ON DELETE CASCADE,
+            FOREIGN KEY(member_id) REFERENCES members(id) ON DELETE CASCADE
+        )
+    """)
+
+    ensure_column("sessions","slot_id","INTEGER")
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_sessions_slot_start ON sessions(slot_id, start_ts)")
+
+    # Trajanje sesije u minutama računa se pri upisu (okidači), ne pri svakom upitu
+    duration_sql = "MAX(0, CAST(ROUND((julianday({0}.end_ts)-julianday({0}.start_ts))*1440) AS INTEGER))"
+    if ensure_column("sessions","duration_min","INTEGER"):
+        cur.execute(f"UPDATE sessions SET duration_min = COALESCE({duration_sql.format('sessions')}, 0)")
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_sessions_duration_ins AFTER INSERT ON sessions
+        WHEN NEW.duration_min IS NULL
+        BEGIN
+            UPDATE sessions SET duration_min = COALESCE({duration_sql.format('NEW')}, 0) WHERE id = NEW.id;
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_sessions_duration_upd AFTER UPDATE OF start_ts, end_ts ON sessions
+        BEGIN
+            UPDATE sessions SET duration_min = COALESCE({duration_sql.format('NEW')}, 0) WHERE id = NEW.id;
+        END
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_sessions_start ON sessions(start_ts)")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_sessions_group_start ON sessions(group_id, start_ts)")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_sessions_coach_start ON sessions(coach_id, start_ts)")
+    # pokrivajući indeks: spoj sesija -> dolasci bez čitanja redaka tablice
+    cur.execute("DROP INDEX IF EXISTS ix_attendance_session")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_attendance_session_member ON attendance(session_id, present, member_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_attendance_member ON attendance(member_id, session_id)")
+
+    # Raspored: tjedni termini i dani bez treninga (praznici, iznimke)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS timetable_slots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_id INTEGER,
+            coach_id INTEGER,
+            weekday INTEGER CHECK (weekday BETWEEN 0 AND 6),  -- 0 = ponedjeljak
+            start_time TEXT,    -- HH:MM
+            end_time TEXT,      -- HH:MM
+            location TEXT,
+            valid_from TEXT,
+            valid_to TEXT,
+            active INTEGER DEFAULT 1,
+            FOREIGN KEY(group_id) REFERENCES groups(id) ON DELETE CASCADE,
+            FOREIGN KEY(coach_id) REFERENCES coaches(id) ON DELETE SET NULL
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS timetable_exceptions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date_from TEXT,
+            date_to TEXT,
+            group_id INTEGER,   -- NULL = sve grupe
+            note TEXT,
+            FOREIGN KEY(group_id) REFERENCES groups(id) ON DELETE CASCADE
+        )
+    """)
+
+    # Pripreme reprezentacije
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS camps (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT,
+            place TEXT,
+            coach TEXT,
+            start_date TEXT,
+            end_date TEXT
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS camp_attendance (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            camp_id INTEGER,
+            member_id INTEGER,
+            trainings INTEGER DEFAULT 0,
+            hours REAL DEFAULT 0.0,
+            FOREIGN KEY(camp_id) REFERENCES camps(id) ON DELETE CASCADE,
+            FOREIGN KEY(member_id) REFERENCES members(id) ON DELETE CASCADE
+        )
+    """)
+
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_camps_start ON camps(start_date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_camp_attendance_camp ON camp_attendance(camp_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_camp_attendance_member ON camp_attendance(member_id)")
+
+    # Trenažno opterećenje (treninzi + pripreme) po tjednu/mjesecu/sezoni
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS training_load (
+            member_id INTEGER,
+            period_kind TEXT CHECK (period_kind IN ('tjedan','mjesec','sezona')),
+            period TEXT,            -- ponedjeljak tjedna / YYYY-MM / 2025/2026
+            sessions INTEGER DEFAULT 0,
+            session_minutes INTEGER DEFAULT 0,
+            camp_trainings REAL DEFAULT 0,
+            camp_hours REAL DEFAULT 0,
+            PRIMARY KEY (member_id, period_kind, period),
+            FOREIGN KEY(member_id) REFERENCES members(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_training_load_period ON training_load(period_kind, period)")
+
+    # Analitika prisustva: spremljeni rizik odustajanja i stanje inkrementalnog izračuna
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS dropout_scores (
+            member_id INTEGER PRIMARY KEY,
+            group_id INTEGER,
+            score REAL,             -- 0–100
+            recent_rate REAL,
+            baseline_rate REAL,
+            missed_weeks INTEGER,
+            computed_at TEXT,
+            FOREIGN KEY(member_id) REFERENCES members(id) ON DELETE CASCADE
+        )
+    """)
+    cur.execute("CREATE TABLE IF NOT EXISTS analytics_state (key TEXT PRIMARY KEY, value TEXT)")
+
+    # Dnevnik održavanja baze (hk_podravka/maintenance.py): veličine prije i poslije
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS maintenance_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task TEXT NOT NULL,             -- optimize | vacuum | checkpoint
+            started_at TEXT NOT NULL,
+            ms REAL,
+            db_bytes_before INTEGER, db_bytes_after INTEGER,
+            wal_bytes_before INTEGER, wal_bytes_after INTEGER,
+            freelist_before INTEGER, freelist_after INTEGER,
+            detail TEXT
+        )
+    """)
+
+    # Arhivirane sezone (hk_podravka/archive.py): sesije, prisustvo i rezultati u archive/sezona-*.db
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS season_archives (
+            season TEXT PRIMARY KEY,        -- '2023/2024'
+            path TEXT NOT NULL,
+            archived_at TEXT NOT NULL,
+            sessions INTEGER NOT NULL DEFAULT 0,
+            attendance INTEGER NOT NULL DEFAULT 0,
+            results INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+
+    # Datoteke adresirane sadržajem (uploads/blobs) s brojem referenci
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS blobs (
+            sha256 TEXT PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE,
+            size INTEGER,
+            kind TEXT,              -- podmapa prvog uploada (npr. 'members/consent')
+            refcount INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT
+        )
+    """)
+    # Varijante slika (web, sličica) izrađene u pozadini – hk_podravka/images.py
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS image_variants (
+            source_sha256 TEXT NOT NULL,   -- blob izvornika
+            variant TEXT NOT NULL,         -- 'web' | 'thumb'
+            path TEXT NOT NULL,
+            width INTEGER, height INTEGER, size INTEGER, format TEXT,
+            src_width INTEGER, src_height INTEGER,
+            created_at TEXT,
+            PRIMARY KEY (source_sha256, variant)
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_image_variants_path ON image_variants(path)")
+    # Slike koje se ne daju obraditi (oštećena datoteka, prevelika slika): ne pokušavaju se ponovno
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS image_failures (
+            sha256 TEXT PRIMARY KEY,
+            error TEXT,
+            failed_at TEXT
+        )
+    """)
+    for table, column in blobstore.BLOB_REFS:
+        for sql in blobstore.trigger_sql(table, column):
+            cur.execute(sql)
+
+    # Brojači verzija po tablici za cache upita (hk_podravka/versions.py)
+    cur.execute("CREATE TABLE IF NOT EXISTS data_versions (table_name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)")
+    cur.executemany("INSERT OR IGNORE INTO data_versions(table_name, version) VALUES (?, 0)",
+                    [(t,) for t in versions.TRACKED_TABLES])
+    for table in versions.TRACKED_TABLES:
+        for sql in versions.trigger_sql(table):
+            cur.execute(sql)
+
+    if cur.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
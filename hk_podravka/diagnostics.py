@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Stanje baze za sekciju ⚙️ Dijagnostika: broj redaka po tablici, veličine
+datoteka (baza, WAL, slobodne stranice), verzija sheme, korištenje indeksa
+u zabilježenim upitima, spremište uploada i PRAGMA quick_check u pozadini.
+
+Broj redaka bez punog prolaza kroz tablicu: iz sqlite_stat1 (nakon
+ANALYZE), inače procjena MAX(rowid); točan COUNT(*) samo na zahtjev.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from hk_podravka import db
+
+
+class TableCount(NamedTuple):
+    table: str
+    rows: int
+    source: str      # 'statistika' (sqlite_stat1) | 'procjena' (MAX(rowid)) | 'točno' (COUNT(*))
+
+
+class FileSizes(NamedTuple):
+    db_bytes: int
+    wal_bytes: int
+    page_size: int
+    page_count: int
+    freelist_pages: int
+
+    @property
+    def freelist_bytes(self) -> int:
+        return self.freelist_pages * self.page_size
+
+
+class DbInfo(NamedTuple):
+    sqlite_version: str
+    user_version: int
+    schema_version: int
+    journal_mode: str
+    auto_vacuum: str
+    analyzed: bool
+
+
+class IndexUsage(NamedTuple):
+    used: Dict[str, int]          # indeks -> broj upita koji ga koriste
+    unused: List[str]             # indeksi koje nijedan zabilježeni upit ne koristi
+    scans: List[Tuple[str, str]]  # (tablica, upit) – puni prolaz kroz tablicu
+    checked: int
+
+
+AUTO_VACUUM = {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}
+
+
+def tables(conn: sqlite3.Connection) -> List[Tuple[str, bool]]:
+    """(tablica, ima rowid) za korisničke tablice."""
+    rows = conn.execute("""SELECT name, sql FROM sqlite_master
+                           WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name""").fetchall()
+    return [(name, "WITHOUT ROWID" not in (sql or "").upper()) for name, sql in rows]
+
+
+def _stat1(conn: sqlite3.Connection) -> Dict[str, int]:
+    try:
+        rows = conn.execute("SELECT tbl, stat FROM sqlite_stat1").fetchall()
+    except sqlite3.OperationalError:   # ANALYZE još nije pokrenut
+        return {}
+    out: Dict[str, int] = {}
+    for tbl, stat in rows:
+        try:
+            out[tbl] = max(out.get(tbl, 0), int(str(stat).split()[0]))
+        except (ValueError, IndexError):
+            continue
+    return out
+
+
+def table_counts(conn: sqlite3.Connection, exact: bool = False) -> List[TableCount]:
+    stat = {} if exact else _stat1(conn)
+    out = []
+    for name, rowid in tables(conn):
+        if name in stat:
+            out.append(TableCount(name, stat[name], "statistika"))
+        elif rowid and not exact:
+            n = conn.execute(f'SELECT MAX(rowid) FROM "{name}"').fetchone()[0]
+            out.append(TableCount(name, n or 0, "procjena"))
+        else:
+            out.append(TableCount(name, conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0], "točno"))
+    return out
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def file_sizes(conn: sqlite3.Connection, db_path: str) -> FileSizes:
+    pragma = lambda name: conn.execute(f"PRAGMA {name}").fetchone()[0]
+    return FileSizes(_size(db_path), _size(db_path + "-wal"),
+                     pragma("page_size"), pragma("page_count"), pragma("freelist_count"))
+
+
+def db_info(conn: sqlite3.Connection) -> DbInfo:
+    pragma = lambda name: conn.execute(f"PRAGMA {name}").fetchone()[0]
+    analyzed = conn.execute("SELECT 1 FROM sqlite_master WHERE name='sqlite_stat1'").fetchone() is not None
+    return DbInfo(sqlite3.sqlite_version, pragma("user_version"), pragma("schema_version"),
+                  pragma("journal_mode"), AUTO_VACUUM.get(pragma("auto_vacuum"), "?"), analyzed)
+
+
+def upload_store(conn: sqlite3.Connection) -> Tuple[int, int, int]:
+    """(broj blobova, bajtova izvornika, bajtova varijanti slika) iz tablica blobs i image_variants."""
+    files, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size),0) FROM blobs").fetchone()
+    variants = conn.execute("SELECT COALESCE(SUM(size),0) FROM image_variants").fetchone()[0]
+    return files, size, variants
+
+
+_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\S+)")
+_SCAN = re.compile(r"^\s*SCAN (\S+)")
+
+
+def index_usage(conn: sqlite3.Connection, statements: Iterable[Tuple[str, str]]) -> IndexUsage:
+    """
+    EXPLAIN QUERY PLAN za zabilježene upite (querylog: tekst + oblik parametara):
+    koji indeksi se koriste, koji nikad i koji upiti prolaze cijelom tablicom.
+    """
+    from hk_podravka import querylog
+
+    indexes = [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='index' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+    used: Dict[str, int] = {}
+    scans: List[Tuple[str, str]] = []
+    checked = 0
+    for sql, params in statements:
+        if not re.match(r"\s*(SELECT|WITH|UPDATE|DELETE)\b", sql, re.I):
+            continue
+        try:
+            plan = querylog.explain(conn, sql, params)
+        except sqlite3.Error:
+            continue
+        checked += 1
+        for name in {m.group(1) for line in plan for m in [_INDEX.search(line)] if m}:
+            used[name] = used.get(name, 0) + 1
+        for line in plan:
+            m = _SCAN.match(line)
+            if m and not line.strip().startswith("SCAN CONSTANT ROW"):
+                scans.append((m.group(1), sql))
+    return IndexUsage(used, [i for i in indexes if i not in used], scans, checked)
+
+
+# ==========================
+# PRAGMA quick_check u pozadini
+# ==========================
+class QuickCheck:
+    """Jedna provjera po bazi; vlastita read-only veza, rezultat ostaje do sljedećeg pokretanja."""
+
+    MAX_ERRORS = 100
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.started: Optional[datetime] = None
+        self.finished: Optional[datetime] = None
+        self.result: List[str] = []
+        self.error = ""
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def ok(self) -> bool:
+        return self.finished is not None and not self.error and self.result == ["ok"]
+
+    def start(self) -> bool:
+        if self.running:
+            return False
+        self.started, self.finished, self.result, self.error = datetime.now(), None, [], ""
+        self._thread = threading.Thread(target=self._run, name="hk-quick-check", daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self) -> None:
+        try:
+            conn = sqlite3.connect(db.ro_uri(self.db_path), uri=True, timeout=30.0)
+            try:
+                self.result = [r[0] for r in conn.execute(f"PRAGMA quick_check({self.MAX_ERRORS})")]
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            self.error = str(e)
+        self.finished = datetime.now()
+
+
+_checks: Dict[str, QuickCheck] = {}
+_lock = threading.Lock()
+
+
+def quick_check(db_path: str) -> QuickCheck:
+    with _lock:
+        return _checks.setdefault(os.path.abspath(db_path), QuickCheck(db_path))
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Galerija fotografija s natjecanja: stranice po natjecanju ili po sezoni.
+
+Stranice se čitaju keyset paginacijom po (uploaded_at, id) preko indeksa
+na competition_photos, uz putanju sličice iz image_variants, pa se za
+jednu stranicu dohvaća samo `limit` redaka bez obzira na broj fotografija.
+"""
+
+import sqlite3
+from datetime import date
+from typing import List, NamedTuple, Optional, Tuple
+
+PAGE_SIZE = 24
+
+Cursor = Tuple[str, int]   # (uploaded_at, id) zadnje fotografije na stranici
+
+
+class Photo(NamedTuple):
+    id: int
+    competition_id: int
+    competition: str
+    filename: str
+    path: str
+    uploaded_at: str
+    thumb_path: Optional[str]
+    web_path: Optional[str]
+
+
+# Sličica/web verzija za izvornik ili za redak koji već pokazuje na web verziju
+_SELECT = """
+    SELECT p.id, p.competition_id, c.name, p.filename, p.path, p.uploaded_at,
+           (SELECT v.path FROM image_variants v WHERE v.variant='thumb' AND v.source_sha256 =
+               COALESCE((SELECT source_sha256 FROM image_variants WHERE path=p.path),
+                        (SELECT sha256 FROM blobs WHERE path=p.path))),
+           (SELECT v.path FROM image_variants v WHERE v.variant='web' AND v.source_sha256 =
+               COALESCE((SELECT source_sha256 FROM image_variants WHERE path=p.path),
+                        (SELECT sha256 FROM blobs WHERE path=p.path)))
+    FROM competition_photos p LEFT JOIN competitions c ON c.id=p.competition_id
+"""
+
+
+def photo_page(conn: sqlite3.Connection, competition_id: Optional[int] = None,
+               season: Optional[Tuple[date, date]] = None, after: Optional[Cursor] = None,
+               limit: int = PAGE_SIZE) -> Tuple[List[Photo], Optional[Cursor]]:
+    """
+    Jedna stranica fotografija (najnovije prve) za natjecanje ili sezonu
+    (raspon datuma natjecanja). Vraća (fotografije, kursor sljedeće stranice ili None).
+    """
+    where, params = [], []
+    if competition_id is not None:
+        where.append("p.competition_id=?")
+        params.append(competition_id)
+    if season is not None:
+        where.append("p.competition_id IN (SELECT id FROM competitions WHERE date_from >= ? AND date_from <= ?)")
+        params += [str(season[0]), str(season[1])]
+    if after is not None:
+        where.append("(p.uploaded_at, p.id) < (?, ?)")
+        params += list(after)
+    q = _SELECT + (" WHERE " + " AND ".join(where) if where else "")
+    q += " ORDER BY p.uploaded_at DESC, p.id DESC LIMIT ?"
+    rows = [Photo(*r) for r in conn.execute(q, params + [limit + 1])]
+    nxt = (rows[limit - 1].uploaded_at, rows[limit - 1].id) if len(rows) > limit else None
+    return rows[:limit], nxt
+
+
+def competitions_with_photos(conn: sqlite3.Connection,
+                             season: Optional[Tuple[date, date]] = None) -> List[tuple]:
+    """(id, naziv, datum, broj fotografija) za natjecanja koja imaju fotografije."""
+    q = """SELECT c.id, c.name, c.date_from,
+                  (SELECT COUNT(*) FROM competition_photos p WHERE p.competition_id=c.id) AS n
+           FROM competitions c WHERE EXISTS (SELECT 1 FROM competition_photos p WHERE p.competition_id=c.id)"""
+    params: list = []
+    if season is not None:
+        q += " AND c.date_from >= ? AND c.date_from <= ?"
+        params += [str(season[0]), str(season[1])]
+    return conn.execute(q + " ORDER BY c.date_from DESC", params).fetchall()
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Obrada slika u pozadini: za svaku učitanu fotografiju izrađuje se verzija
+za web i mala sličica (bez EXIF podataka, ispravno okrenute), a dimenzije
+se bilježe u `image_variants`.
+
+Posao se šalje u pool dretvi nakon spremanja forme, pa upload 50 slika ne
+čeka na obradu. Varijante se spremaju u blobstore; ako se izvornici ne
+čuvaju, redovi koji pokazuju na izvornik prebacuju se na web verziju, a
+izvornik ostaje bez referenci za čišćenje.
+"""
+
+import io
+import logging
+import math
+import os
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from hk_podravka import blobstore
+
+# varijanta -> (najveća dulja stranica u px, format, kvaliteta)
+# JPEG: st.image ga prikazuje bez ponovnog kodiranja (WebP bi pretvorio u PNG/JPEG).
+VARIANTS = {
+    "web": (1600, "JPEG", 82),
+    "thumb": (320, "JPEG", 75),
+}
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp")
+MAX_WORKERS = 2
+
+# Stupci koji se prebacuju na web verziju kad se izvornik ne čuva
+PHOTO_REFS = [
+    ("competition_photos", "path"),
+    ("members", "photo_path"),
+    ("coaches", "photo_path"),
+]
+
+_executor: Optional[ThreadPoolExecutor] = None
+log = logging.getLogger("hk_podravka.images")
+_lock = threading.Lock()
+
+
+def _encode(im, max_side: int, fmt: str, quality: int):
+    from PIL import Image
+    w, h = im.size
+    scale = min(1.0, max_side / max(w, h))
+    if scale < 1.0:
+        im = im.resize((max(1, round(w * scale)), max(1, round(h * scale))), Image.LANCZOS)
+    if fmt == "JPEG" and im.mode != "RGB":
+        im = im.convert("RGB")
+    buf = io.BytesIO()
+    # bez exif=...: EXIF (GPS, uređaj) se ne prenosi; ICC profil ostaje radi boja
+    im.save(buf, format=fmt, quality=quality, optimize=True,
+            progressive=(fmt == "JPEG"), icc_profile=im.info.get("icc_profile"))
+    buf.seek(0)
+    buf.name = f"{fmt.lower()}.{'jpg' if fmt == 'JPEG' else fmt.lower()}"
+    return buf, im.size
+
+
+def process_blob(conn: sqlite3.Connection, sha256: str, upload_dir: str,
+                 keep_original: bool = True) -> int:
+    """Izradi sve varijante koje nedostaju za jedan blob; vraća broj novih varijanti."""
+    from PIL import Image, ImageOps
+
+    row = conn.execute("SELECT path FROM blobs WHERE sha256=?", (sha256,)).fetchone()
+    if not row or not os.path.exists(row[0]):
+        return 0
+    src_path = row[0]
+    have = {r[0] for r in conn.execute("SELECT variant FROM image_variants WHERE source_sha256=?", (sha256,))}
+    todo = [v for v in VARIANTS if v not in have]
+    if todo:
+        with Image.open(src_path) as im:
+            src_w, src_h = im.size
+            if im.getexif().get(0x0112) in (5, 6, 7, 8):   # okrenuta za 90°
+                src_w, src_h = src_h, src_w
+            # JPEG se dekodira odmah u manjem mjerilu (1/2, 1/4, 1/8) ako je dovoljno velik
+            need = max(v[0] for v in VARIANTS.values()) / max(im.size)
+            if need < 1.0:
+                im.draft("RGB", (math.ceil(im.width * need), math.ceil(im.height * need)))
+            im = ImageOps.exif_transpose(im)
+            for v in todo:
+                max_side, fmt, quality = VARIANTS[v]
+                buf, (w, h) = _encode(im, max_side, fmt, quality)
+                size = len(buf.getbuffer())
+                path = blobstore.store(conn, buf, upload_dir, kind=f"images/{v}")
+                conn.execute("""INSERT OR REPLACE INTO image_variants
+                    (source_sha256, variant, path, width, height, size, format, src_width, src_height, created_at)
+                    VALUES (?,?,?,?,?,?,?,?,?,?)""",
+                    (sha256, v, path, w, h, size, fmt, src_w, src_h, datetime.now().isoformat()))
+    if not keep_original:
+        web = conn.execute("SELECT path FROM image_variants WHERE source_sha256=? AND variant='web'",
+                           (sha256,)).fetchone()
+        if web:
+            for table, column in PHOTO_REFS:
+                conn.execute(f"UPDATE {table} SET {column}=? WHERE {column}=?", (web[0], src_path))
+    return len(todo)
+
+
+def try_process(conn: sqlite3.Connection, sha256: str, upload_dir: str, keep_original: bool = True) -> int:
+    """
+    process_blob + commit. Greška se zapisuje u log; slika koja se ne da
+    obraditi upisuje se u image_failures i pending() je više ne vraća
+    (greška baze, npr. zaključana, ostaje za sljedeći put).
+    """
+    try:
+        done = process_blob(conn, sha256, upload_dir, keep_original)
+        conn.commit()
+        return done
+    except sqlite3.Error:
+        conn.rollback()
+        log.exception("obrada slike %s: greška baze, ponovno sljedeći put", sha256)
+        return 0
+    except Exception as e:
+        conn.rollback()
+        log.exception("obrada slike %s nije uspjela, preskače se", sha256)
+        try:
+            conn.execute("INSERT OR REPLACE INTO image_failures(sha256, error, failed_at) VALUES (?,?,?)",
+                         (sha256, f"{type(e).__name__}: {e}"[:500], datetime.now().isoformat()))
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+        return 0
+
+
+def _run(db_path: str, upload_dir: str, shas: List[str], keep_original: bool) -> int:
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA foreign_keys = ON")
+    done = 0
+    try:
+        for sha in shas:
+            done += try_process(conn, sha, upload_dir, keep_original)
+    finally:
+        conn.close()
+    return done
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="hk-images")
+        return _executor
+
+
+def image_shas(conn: sqlite3.Connection, paths: Iterable[str]) -> List[str]:
+    """SHA-256 blobova za zadane putanje koje su slike."""
+    paths = [p for p in paths if p and p.lower().endswith(IMAGE_EXTS)]
+    if not paths:
+        return []
+    q = f"SELECT sha256 FROM blobs WHERE path IN ({','.join('?' * len(paths))})"
+    return [r[0] for r in conn.execute(q, paths)]
+
+
+def enqueue(db_path: str, upload_dir: str, shas: List[str], keep_original: bool = True) -> Optional[Future]:
+    """Pošalji obradu u pozadinu (blobovi moraju biti već spremljeni i commitani)."""
+    if not shas:
+        return None
+    return _pool().submit(_run, db_path, upload_dir, list(shas), keep_original)
+
+
+def pending(conn: sqlite3.Connection, limit: int = 500) -> List[str]:
+    """Slike iz PHOTO_REFS koje još nemaju sve varijante (npr. učitane prije ove obrade), bez image_failures."""
+    refs = " UNION ".join(f"SELECT {c} AS path FROM {t} WHERE {c} IS NOT NULL" for t, c in PHOTO_REFS)
+    rows = conn.execute(f"""
+        SELECT b.sha256, b.path FROM blobs b JOIN ({refs}) r ON r.path=b.path
+        WHERE (SELECT COUNT(*) FROM image_variants v WHERE v.source_sha256=b.sha256) < ?
+          AND b.path NOT IN (SELECT path FROM image_variants)
+          AND b.sha256 NOT IN (SELECT sha256 FROM image_failures)
+        LIMIT ?""", (len(VARIANTS), limit)).fetchall()
+    return [sha for sha, path in rows if path.lower().endswith(IMAGE_EXTS)]
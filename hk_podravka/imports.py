@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Uvoz članova i rezultata iz Excela (.xlsx) ili CSV-a po predlošcima iz
+odjeljka Članovi.
+
+Redci se čitaju jedan po jedan (openpyxl u read_only načinu), a upisuju
+u serijama: executemany + commit svakih `batch_size` redaka, pa veliki
+uvoz ne drži cijelu datoteku u memoriji niti jednu dugu transakciju.
+Grupe, članovi i natjecanja traže se u rječniku učitanom jednom po uvozu.
+"""
+
+import csv
+import io
+import os
+import sqlite3
+import time
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from hk_podravka import metrics
+
+BATCH_SIZE = 500
+
+Progress = Optional[Callable[[int], None]]   # broj do sada upisanih redaka
+
+
+def _observe(kind: str, t0: float, rows: int) -> None:
+    metrics.IMPORT_SECONDS.observe(time.perf_counter() - t0, (kind,))
+    metrics.IMPORT_ROWS.inc((kind,), rows)
+
+
+def _cell(v):
+    if v is None:
+        return ""
+    if isinstance(v, datetime):
+        return v.date().isoformat() if v.time() == datetime.min.time() else v.isoformat(sep=" ")
+    if isinstance(v, date):
+        return v.isoformat()
+    if isinstance(v, float) and v.is_integer():
+        return int(v)
+    if isinstance(v, str):
+        return v.strip()
+    return v
+
+
+def read_rows(source, filename: Optional[str] = None) -> Iterator[Dict[str, object]]:
+    """
+    Redci tablice kao rječnici (zaglavlje iz prvog retka, prazno -> "").
+    `source` je putanja ili datoteka (npr. Streamlit upload); vrsta po nastavku.
+    """
+    name = (filename or getattr(source, "name", None) or str(source)).lower()
+    if name.endswith(".csv"):
+        if isinstance(source, (str, os.PathLike)):
+            fh = open(source, newline="", encoding="utf-8-sig")
+        else:
+            fh = io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+        with fh:
+            for r in csv.DictReader(fh):
+                yield {k.strip(): _cell(v) for k, v in r.items() if k}
+        return
+
+    from openpyxl import load_workbook
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else "" for h in next(rows, ())]
+        for values in rows:
+            if all(v is None or v == "" for v in values):
+                continue
+            yield {h: _cell(v) for h, v in zip(header, values) if h}
+    finally:
+        wb.close()
+
+
+def _int(v) -> int:
+    return int(float(v)) if v not in ("", None) else 0
+
+
+def _float(v) -> float:
+    return float(str(v).replace(",", ".")) if v not in ("", None) else 0.0
+
+
+def _s(v) -> str:
+    return "" if v is None else str(v)
+
+
+def _write(conn: sqlite3.Connection, sql: str, rows: Iterable[tuple], batch_size: Optional[int],
+           progress: Progress) -> int:
+    """Upis u serijama s commitom po seriji; batch_size=None = jedna transakcija."""
+    batch: List[tuple] = []
+    done = 0
+    for params in rows:
+        batch.append(params)
+        if batch_size and len(batch) >= batch_size:
+            conn.executemany(sql, batch)
+            conn.commit()
+            done += len(batch)
+            batch.clear()
+            if progress:
+                progress(done)
+    if batch:
+        conn.executemany(sql, batch)
+        done += len(batch)
+    conn.commit()
+    if progress:
+        progress(done)
+    return done
+
+
+# ==========================
+# Članovi
+# ==========================
+MEMBER_INSERT = """INSERT INTO members
+    (full_name,first_name,last_name,dob,gender,oib,street,city,postal_code,residence,
+     athlete_email,parent_email,athlete_phone,parent_phone,parent_name,
+     id_card_number,id_card_issuer,id_card_valid_until,
+     passport_number,passport_issuer,passport_valid_until,
+     active_competitor,veteran,other_flag,membership_fee_eur,group_id)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)"""
+
+
+def member_params(r: Dict[str, object], group_ids: Dict[str, int]) -> tuple:
+    """Parametri za MEMBER_INSERT iz retka predloška članova."""
+    g = lambda k: _s(r.get(k, ""))
+    full_name = g("ime_prezime") or (g("ime") + " " + g("prezime")).strip()
+    return (full_name, g("ime"), g("prezime"), g("datum_rođenja"), g("spol(M/Ž)"),
+            g("oib"), g("ulica"), g("grad"), g("poštanski_broj"),
+            f"{g('ulica')}, {g('grad')} {g('poštanski_broj')}",
+            g("email_sportaša"), g("email_roditelja"),
+            g("telefon_sportaša"), g("telefon_roditelja"), g("roditelj_ime_prezime"),
+            g("osobna_broj"), g("osobna_izdavatelj"), g("osobna_vrijedi_do"),
+            g("putovnica_broj"), g("putovnica_izdavatelj"), g("putovnica_vrijedi_do"),
+            _int(r.get("aktivni_natjecatelj(0/1)")), _int(r.get("veteran(0/1)")), _int(r.get("ostalo(0/1)")),
+            _float(r.get("članarina_EUR")), group_ids.get(g("grupa")) if g("grupa") else None)
+
+
+def import_members(conn: sqlite3.Connection, rows: Iterable[Dict[str, object]],
+                   batch_size: Optional[int] = BATCH_SIZE, progress: Progress = None) -> int:
+    """Upiši članove iz redaka predloška; vraća broj upisanih."""
+    t0 = time.perf_counter()
+    group_ids = {name: gid for gid, name in conn.execute("SELECT id, name FROM groups")}
+    done = _write(conn, MEMBER_INSERT, (member_params(r, group_ids) for r in rows), batch_size, progress)
+    _observe("members", t0, done)
+    return done
+
+
+# ==========================
+# Rezultati
+# ==========================
+RESULT_INSERT = """INSERT INTO competition_results
+    (competition_id,member_id,weight_category,style,bouts_total,wins,losses,placement,opponent_list,notes)
+    VALUES (?,?,?,?,?,?,?,?,?,?)"""
+
+
+def import_results(conn: sqlite3.Connection, rows: Iterable[Dict[str, object]],
+                   batch_size: Optional[int] = BATCH_SIZE, progress: Progress = None) -> Tuple[int, int]:
+    """
+    Upiši rezultate (član se traži po imenu i prezimenu); redci bez
+    postojećeg natjecanja ili člana se preskaču. Vraća (upisano, preskočeno).
+    """
+    t0 = time.perf_counter()
+    comp_ids = {cid for (cid,) in conn.execute("SELECT id FROM competitions")}
+    member_ids = {name: mid for mid, name in conn.execute("SELECT id, full_name FROM members ORDER BY id DESC")}
+    skipped = 0
+
+    def params():
+        nonlocal skipped
+        for r in rows:
+            cid = _int(r.get("natjecanje_id"))
+            mid = member_ids.get(_s(r.get("clan(ime_prezime)", "")))
+            if cid not in comp_ids or mid is None:
+                skipped += 1
+                continue
+            yield (cid, mid, _s(r.get("kategorija", "")), _s(r.get("stil", "")),
+                   _int(r.get("ukupno_borbi")), _int(r.get("pobjede")),
+                   _int(r.get("porazi")), _int(r.get("plasman(1-100)")),
+                   _s(r.get("protivnici(JSON)", "")), _s(r.get("napomena", "")))
+
+    done = _write(conn, RESULT_INSERT, params(), batch_size, progress)
+    _observe("results", t0, done)
+    return done, skipped
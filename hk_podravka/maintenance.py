@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Održavanje SQLite baze: statistika za planer upita (PRAGMA optimize /
+ANALYZE), vraćanje slobodnih stranica (auto_vacuum=INCREMENTAL +
+incremental_vacuum) i WAL checkpoint. Svaki korak upisuje se u
+maintenance_log s veličinama baze, WAL-a i slobodnih stranica prije i poslije.
+
+Pokreće se iz naredbenog retka (python -m hk_podravka maintain optimize|
+vacuum|checkpoint) ili u procesu aplikacije (Scheduler): pozadinska dretva
+svakih CHECK_MINUTES provjeri je li održavanje dospjelo i je li baza mirna
+(QUIET_HOURS ili bez upisa IDLE_MINUTES minuta).
+
+Postojeća baza s auto_vacuum=NONE prelazi na INCREMENTAL samo punim
+VACUUM-om (maintain vacuum --full), jer to prepisuje cijelu datoteku; nove
+baze dobivaju INCREMENTAL odmah pri stvaranju (db.init_schema).
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional, Sequence
+
+from hk_podravka import diagnostics
+
+TASKS = ["optimize", "vacuum", "checkpoint"]
+EVERY_HOURS = 24
+QUIET_HOURS = range(1, 6)      # 01:00–05:59
+IDLE_MINUTES = 15
+CHECK_MINUTES = 10
+ANALYSIS_LIMIT = 1000          # redaka po indeksu za ANALYZE (približna statistika, brzo i na velikoj bazi)
+VACUUM_MIN_FREE_PAGES = 256
+VACUUM_STEP_PAGES = 1000       # stranica po transakciji, da pisci ne čekaju dugo
+
+_STATE_KEY = "db_maintenance_last"
+
+
+class Step(NamedTuple):
+    task: str
+    ms: float
+    before: diagnostics.FileSizes
+    after: diagnostics.FileSizes
+    detail: str
+
+
+def enable_wal(conn: sqlite3.Connection) -> str:
+    """Uključi WAL (trajno za datoteku; čitatelji ne blokiraju pisca). Vraća journal_mode."""
+    mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    if mode.lower() != "wal" and not conn.in_transaction:
+        mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+    return mode
+
+
+def optimize(conn: sqlite3.Connection, full: bool = False) -> str:
+    """ANALYZE kad statistike još nema (ili full), inače PRAGMA optimize (samo tablice kojima treba)."""
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    has_stats = conn.execute("SELECT 1 FROM sqlite_master WHERE name='sqlite_stat1'").fetchone() is not None
+    if full or not has_stats:
+        conn.execute("ANALYZE")
+        return "ANALYZE"
+    conn.execute("PRAGMA optimize")
+    return "PRAGMA optimize"
+
+
+def vacuum(conn: sqlite3.Connection, full: bool = False, min_free_pages: int = VACUUM_MIN_FREE_PAGES) -> str:
+    """
+    Vrati slobodne stranice datotečnom sustavu u koracima od VACUUM_STEP_PAGES.
+    full=True: prijelaz na auto_vacuum=INCREMENTAL punim VACUUM-om (prepisuje bazu).
+    """
+    mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    if mode != 2:
+        if not full:
+            return "auto_vacuum nije INCREMENTAL – jednom pokreni: maintain vacuum --full"
+        conn.commit()
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        if conn.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal":
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")   # VACUUM je cijelu bazu prepisao u WAL
+        return "VACUUM, auto_vacuum = INCREMENTAL"
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if free < min_free_pages and not full:
+        return f"slobodnih stranica {free} < {min_free_pages}"
+    while True:
+        left = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if not left:
+            break
+        # executescript izvodi pragmu do kraja (execute bi oslobodio samo jednu stranicu)
+        conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES});")
+        if conn.execute("PRAGMA freelist_count").fetchone()[0] >= left:
+            break
+    return f"vraćeno stranica: {free - conn.execute('PRAGMA freelist_count').fetchone()[0]}"
+
+
+def checkpoint(conn: sqlite3.Connection, mode: str = "TRUNCATE") -> str:
+    if conn.execute("PRAGMA journal_mode").fetchone()[0].lower() != "wal":
+        return "nije WAL"
+    conn.commit()
+    busy, log, done = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+    if busy:
+        return f"wal_checkpoint({mode}): zauzeto – prepisano {done}/{log} stranica"
+    return f"wal_checkpoint({mode})"
+
+
+def run(conn: sqlite3.Connection, db_path: str, tasks: Sequence[str] = TASKS, full: bool = False) -> List[Step]:
+    """Izvedi korake redom; svaki se upisuje u maintenance_log (s commitom)."""
+    steps = []
+    for task in tasks:
+        before = diagnostics.file_sizes(conn, db_path)
+        t0 = time.perf_counter()
+        if task == "optimize":
+            detail = optimize(conn, full)
+        elif task == "vacuum":
+            detail = vacuum(conn, full)
+        elif task == "checkpoint":
+            detail = checkpoint(conn)
+        else:
+            raise ValueError(f"nepoznat korak održavanja: {task}")
+        conn.commit()
+        ms = (time.perf_counter() - t0) * 1000
+        after = diagnostics.file_sizes(conn, db_path)
+        conn.execute("""INSERT INTO maintenance_log(task, started_at, ms, db_bytes_before, db_bytes_after,
+                                                    wal_bytes_before, wal_bytes_after,
+                                                    freelist_before, freelist_after, detail)
+                        VALUES (?,?,?,?,?,?,?,?,?,?)""",
+                     (task, datetime.now().isoformat(timespec="seconds"), round(ms, 1),
+                      before.db_bytes, after.db_bytes, before.wal_bytes, after.wal_bytes,
+                      before.freelist_pages, after.freelist_pages, detail))
+        conn.commit()
+        steps.append(Step(task, ms, before, after, detail))
+    return steps
+
+
+def history(conn: sqlite3.Connection, limit: int = 20) -> List[tuple]:
+    return conn.execute("""SELECT started_at, task, ms, db_bytes_before, db_bytes_after,
+                                  wal_bytes_before, wal_bytes_after, freelist_before, freelist_after, detail
+                           FROM maintenance_log ORDER BY id DESC LIMIT ?""", (limit,)).fetchall()
+
+
+# ==========================
+# Raspored u procesu aplikacije
+# ==========================
+class Scheduler:
+    """
+    Pozadinska dretva: svakih CHECK_MINUTES provjeri je li održavanje dospjelo
+    (EVERY_HOURS od zadnjeg, zapis u analytics_state pa vrijedi za sve procese)
+    i je li vrijeme mirno. Mirno = QUIET_HOURS ili bez upisa (PRAGMA
+    data_version) od zadnje provjere i najmanje IDLE_MINUTES.
+    """
+
+    def __init__(self, db_path: str, every_hours: int = EVERY_HOURS):
+        self.db_path = db_path
+        self.every = timedelta(hours=every_hours)
+        self.last: List[Step] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._data_version: Optional[int] = None
+        self._quiet_since = time.monotonic()
+
+    def start(self) -> "Scheduler":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="hk-db-maintenance", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _quiet(self, conn: sqlite3.Connection) -> bool:
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._data_version = version
+            self._quiet_since = time.monotonic()
+        idle = time.monotonic() - self._quiet_since >= IDLE_MINUTES * 60
+        return idle or datetime.now().hour in QUIET_HOURS
+
+    def _claim(self, conn: sqlite3.Connection) -> bool:
+        """Zauzmi termin (BEGIN IMMEDIATE) da ga drugi proces ne pokrene u isto vrijeme."""
+        now = datetime.now()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM analytics_state WHERE key=?", (_STATE_KEY,)).fetchone()
+            if row and now - datetime.fromisoformat(row[0]) < self.every:
+                conn.rollback()
+                return False
+            conn.execute("INSERT OR REPLACE INTO analytics_state(key, value) VALUES (?,?)", (_STATE_KEY, now.isoformat()))
+            conn.commit()
+            return True
+        except Exception:
+            conn.rollback()
+            raise
+
+    def tick(self, conn: sqlite3.Connection) -> Optional[List[Step]]:
+        if not self._quiet(conn) or not self._claim(conn):
+            return None
+        self.last = run(conn, self.db_path)
+        self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        return self.last
+
+    def _loop(self) -> None:
+        conn = None
+        while not self._stop.wait(CHECK_MINUTES * 60):
+            try:
+                if conn is None:
+                    conn = sqlite3.connect(self.db_path, timeout=30)
+                self.tick(conn)
+            except sqlite3.Error:
+                if conn is not None:
+                    conn.close()
+                conn = None   # baza zauzeta ili zaključana: sljedeći put
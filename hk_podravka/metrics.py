@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+Metrike u Prometheus tekstualnom formatu (brojači, histogrami, mjerači).
+
+Brzi put bez zaključavanja: svaka dretva piše u svoj rječnik (shard), a
+zbrajanje se radi tek pri čitanju (/metrics). Streamlit za svako izvođenje
+pokreće novu dretvu, pa se rječnici završenih dretvi pri čitanju ili pri
+prijavi nove dretve pretapaju u zajednički zbroj.
+
+Mjerači (Gauge) se računaju pri čitanju iz zadane funkcije (veličina baze,
+WAL-a, spremišta uploada) ili se postavljaju s set().
+
+    python -c "import urllib.request; print(urllib.request.urlopen('http://127.0.0.1:9464/metrics').read().decode())"
+"""
+
+import bisect
+import os
+import sqlite3
+import threading
+import weakref
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+PORT = 9464
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+COMPACT_SHARDS = 32   # pretapanje završenih dretvi kad ih se nakupi ovoliko
+
+_lock = threading.Lock()
+_registry: List["_Metric"] = []
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._shards: List[Tuple[weakref.ref, dict]] = []
+        self._base: dict = {}   # zbroj završenih dretvi
+        with _lock:
+            _registry.append(self)
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.d
+        except AttributeError:
+            d = self._local.d = {}
+            with _lock:
+                if len(self._shards) >= COMPACT_SHARDS:
+                    self._compact()
+                self._shards.append((weakref.ref(threading.current_thread()), d))
+            return d
+
+    def _compact(self) -> None:
+        """Pretopi rječnike završenih dretvi u _base (pod _lock)."""
+        live = []
+        for ref, d in self._shards:
+            t = ref()
+            if t is None or not t.is_alive():
+                for k, v in d.items():
+                    self._fold(k, v)
+            else:
+                live.append((ref, d))
+        self._shards = live
+
+    def _fold(self, key, value) -> None:
+        raise NotImplementedError
+
+    def _snapshot(self) -> dict:
+        with _lock:
+            self._compact()
+            shards = [d for _, d in self._shards]
+            total = {k: (list(v) if isinstance(v, list) else v) for k, v in self._base.items()}
+        for d in shards:
+            for _ in range(3):   # dretva može dodati ključ usred čitanja
+                try:
+                    items = list(d.items())
+                    break
+                except RuntimeError:
+                    continue
+            else:
+                items = []
+            for k, v in items:
+                self._merge(total, k, v)
+        return total
+
+    def _merge(self, total: dict, key, value) -> None:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, labels: Tuple = (), value: float = 1.0) -> None:
+        d = self._shard()
+        d[labels] = d.get(labels, 0) + value
+
+    def _fold(self, key, value) -> None:
+        self._base[key] = self._base.get(key, 0) + value
+
+    def _merge(self, total, key, value) -> None:
+        total[key] = total.get(key, 0) + value
+
+    def value(self, labels: Tuple = ()) -> float:
+        return self._snapshot().get(labels, 0)
+
+    def render(self) -> List[str]:
+        out = super().render()
+        for key, v in sorted(self._snapshot().items()):
+            out.append(f"{self.name}{_labels(self.labels, key)} {_num(v)}")
+        return out
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets=DURATION_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, labels: Tuple = ()) -> None:
+        d = self._shard()
+        row = d.get(labels)
+        if row is None:
+            row = d[labels] = [0] * (len(self.buckets) + 1) + [0.0]   # po pretincu (+Inf), zbroj
+        row[bisect.bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def _fold(self, key, value) -> None:
+        self._merge(self._base, key, value)
+
+    def _merge(self, total, key, value) -> None:
+        row = total.get(key)
+        if row is None:
+            total[key] = list(value)
+        else:
+            for i, v in enumerate(value):
+                row[i] += v
+
+    def render(self) -> List[str]:
+        out = super().render()
+        for key, row in sorted(self._snapshot().items()):
+            acc = 0
+            for le, n in zip(self.buckets + (float("inf"),), row):
+                acc += n
+                le_label = 'le="' + _num(le) + '"'
+                out.append(f"{self.name}_bucket{_labels(self.labels, key, le_label)} {acc}")
+            out.append(f"{self.name}_sum{_labels(self.labels, key)} {_num(row[-1])}")
+            out.append(f"{self.name}_count{_labels(self.labels, key)} {acc}")
+        return out
+
+
+class Gauge(_Metric):
+    """Mjerač: fn() -> broj ili {oznake: broj} pri čitanju, inače zadnja vrijednost iz set()."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 fn: Optional[Callable[[], object]] = None):
+        super().__init__(name, help, labels)
+        self.fn = fn
+        self._values: Dict[Tuple, float] = {}
+
+    def set(self, value: float, labels: Tuple = ()) -> None:
+        self._values[labels] = value
+
+    def render(self) -> List[str]:
+        values = dict(self._values)
+        if self.fn is not None:
+            try:
+                got = self.fn()
+            except (OSError, sqlite3.Error):
+                got = None
+            if isinstance(got, dict):
+                values.update(got)
+            elif got is not None:
+                values[()] = got
+        out = super().render()
+        for key, v in sorted(values.items()):
+            out.append(f"{self.name}{_labels(self.labels, key)} {_num(v)}")
+        return out
+
+
+# ==========================
+# Metrike aplikacije
+# ==========================
+RERUN_SECONDS = Histogram("hk_rerun_seconds", "Trajanje izvođenja stranice.", ["section"])
+SQL_QUERIES = Counter("hk_sql_queries_total", "Broj SQL upita.", ["section"])
+SQL_SECONDS = Histogram("hk_sql_query_seconds", "Trajanje SQL upita (izvršavanje + dohvat).", ["section"],
+                        buckets=SQL_BUCKETS)
+SQL_SLOW = Counter("hk_sql_slow_queries_total", "SQL upiti sporiji od querylog.SLOW_MS.", ["section"])
+IMPORT_SECONDS = Histogram("hk_import_seconds", "Trajanje uvoza (Excel/CSV).", ["kind"])
+IMPORT_ROWS = Counter("hk_import_rows_total", "Uvezeni redci.", ["kind"])
+CACHE_LOOKUPS = Counter("hk_cache_lookups_total", "Dohvati iz cachea upita.", ["cache"])
+CACHE_MISSES = Counter("hk_cache_misses_total", "Promašaji cachea upita (upit u bazu).", ["cache"])
+UPLOAD_BYTES = Counter("hk_upload_bytes_total", "Novi bajtovi u spremištu uploada (bez duplikata).", ["kind"])
+UPLOAD_FILES = Counter("hk_upload_files_total", "Spremljeni uploadi; duplicate=1 ako sadržaj već postoji.",
+                       ["kind", "duplicate"])
+WRITE_SECONDS = Histogram("hk_write_seconds", "Upis kroz dretvu pisca: od predaje u red do commita.", ["status"],
+                          buckets=SQL_BUCKETS)
+WRITE_BATCH = Histogram("hk_write_batch_size", "Naredbi po transakciji dretve pisca.",
+                        buckets=(1, 2, 5, 10, 20, 50, 100))
+WRITE_BUSY_RETRIES = Counter("hk_write_busy_retries_total", "Ponovljene transakcije pisca (baza zauzeta izvana).")
+
+
+def file_size(path: str) -> float:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def register_db_gauges(db_path: str) -> None:
+    """Veličina baze i WAL-a te spremišta uploada (iz tablice blobs) za zadanu bazu (jednom po procesu)."""
+    with _lock:
+        registered = any(m.name == "hk_db_size_bytes" for m in _registry)
+    if registered:
+        return
+    def blobs():
+        from hk_podravka import db   # db → blobstore → metrics: uvoz tek pri očitanju
+        conn = sqlite3.connect(db.ro_uri(db_path), uri=True, timeout=1.0)
+        try:
+            n, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size),0) FROM blobs").fetchone()
+        finally:
+            conn.close()
+        return {("files",): n, ("bytes",): size}
+
+    Gauge("hk_db_size_bytes", "Veličina datoteke baze.", fn=lambda: file_size(db_path))
+    Gauge("hk_db_wal_size_bytes", "Veličina WAL datoteke.", fn=lambda: file_size(db_path + "-wal"))
+    Gauge("hk_upload_store", "Spremište uploada: broj blobova i bajtova.", ["unit"], fn=blobs)
+
+
+def render() -> str:
+    with _lock:
+        metrics = list(_registry)
+    lines: List[str] = []
+    for m in metrics:
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+# ==========================
+# HTTP
+# ==========================
+def serve(port: int = PORT, host: str = "127.0.0.1"):
+    """Pokreni /metrics u pozadinskoj dretvi (ThreadingHTTPServer); OSError ako je port zauzet."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer   # tek kad zatreba (vrijeme uvoza)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="hk-metrics", daemon=True).start()
+    return server
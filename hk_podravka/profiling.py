@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+Profil izvođenja stranice: vrijeme po fazama (odjeljak, tablice, Excel,
+grafovi...), od toga SQL (querylog.counters) i vršna memorija.
+
+Faze se označavaju s `phase(name)` ili dekoratorom `timed(name)`; izvan
+`rerun()` (npr. samostalno izvođenje fragmenta) ne rade ništa. Svako
+izvođenje zapisuje se kao jedan JSON redak u log koji se rotira
+(MAX_BYTES, BACKUPS), a zadnja izvođenja drže se u memoriji za prikaz.
+
+Memorija se mjeri s tracemalloc samo kad je uključeno (set_memory_tracking)
+jer usporava alokacije; tracemalloc je zajednički svim dretvama pa je vrh
+memorije pri istovremenim sesijama približan. Na zahtjev (request_profile)
+sljedeće izvođenje ide kroz cProfile: .prof datoteka + sažetak (pstats).
+"""
+
+import contextlib
+import functools
+import io
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime
+from typing import List, Optional
+
+from hk_podravka import metrics, querylog
+
+MAX_BYTES = 1_000_000
+BACKUPS = 3
+PROFILE_LINES = 30
+
+_lock = threading.Lock()
+_ctx = threading.local()
+_runs: deque = deque(maxlen=50)
+_profile_requested = threading.Event()
+
+
+class _Frame:
+    __slots__ = ("name", "depth", "t0", "queries", "sql", "mem0", "peak_seen", "record")
+
+    def __init__(self, name: str, depth: int, record: dict):
+        self.name = name
+        self.depth = depth
+        self.record = record
+        self.queries, self.sql = querylog.counters()
+        self.peak_seen = 0
+        self.mem0 = 0
+        if tracemalloc.is_tracing():
+            self.mem0 = tracemalloc.get_traced_memory()[0]
+        self.t0 = time.perf_counter()
+
+
+class Run:
+    """Jedno izvođenje: ukupno i po fazama (depth = razina ugniježđenja)."""
+
+    def __init__(self):
+        self.at = datetime.now().isoformat(timespec="seconds")
+        self.section = ""
+        self.ms = 0.0
+        self.sql_ms = 0.0
+        self.queries = 0
+        self.peak_kb: Optional[float] = None
+        self.phases: List[dict] = []
+        self.profile_path: Optional[str] = None
+        self.profile_text: Optional[str] = None
+        self._stack: List[_Frame] = []
+        self._peak_seen = 0   # vrh zatvorenih faza najviše razine (faze resetiraju tracemalloc vrh)
+
+    def as_dict(self) -> dict:
+        return {"at": self.at, "section": self.section, "ms": round(self.ms, 1),
+                "sql_ms": round(self.sql_ms, 1), "queries": self.queries, "peak_kb": self.peak_kb,
+                "phases": self.phases, "profile": self.profile_path}
+
+
+# ==========================
+# Faze
+# ==========================
+def _enter(run: Run, name: str) -> _Frame:
+    record = {"name": name, "depth": len(run._stack)}
+    run.phases.append(record)
+    if run._stack and tracemalloc.is_tracing():
+        parent = run._stack[-1]
+        parent.peak_seen = max(parent.peak_seen, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    frame = _Frame(name, len(run._stack), record)
+    run._stack.append(frame)
+    return frame
+
+
+def _exit(run: Run, frame: _Frame) -> None:
+    ms = (time.perf_counter() - frame.t0) * 1000
+    queries, sql = querylog.counters()
+    run._stack.pop()
+    rec = frame.record
+    rec["ms"] = round(ms, 1)
+    rec["sql_ms"] = round((sql - frame.sql) * 1000, 1)
+    rec["queries"] = queries - frame.queries
+    if tracemalloc.is_tracing():
+        peak = max(tracemalloc.get_traced_memory()[1], frame.peak_seen)
+        rec["peak_kb"] = round(max(peak - frame.mem0, 0) / 1024, 1)
+        if run._stack:
+            run._stack[-1].peak_seen = max(run._stack[-1].peak_seen, peak)
+        else:
+            run._peak_seen = max(run._peak_seen, peak)
+
+
+@contextlib.contextmanager
+def phase(name: str):
+    """Izmjeri blok kao fazu tekućeg izvođenja (izvan rerun() ne radi ništa)."""
+    run = getattr(_ctx, "run", None)
+    if run is None:
+        yield
+        return
+    frame = _enter(run, name)
+    try:
+        yield
+    finally:
+        _exit(run, frame)
+
+
+def timed(name: Optional[str] = None):
+    """Dekorator: cijeli poziv funkcije je jedna faza (zadano ime = ime funkcije)."""
+    def wrap(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if getattr(_ctx, "run", None) is None:
+                return fn(*args, **kwargs)
+            with phase(label):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def set_section(section: str) -> None:
+    run = getattr(_ctx, "run", None)
+    if run is not None:
+        run.section = section
+
+
+# ==========================
+# Izvođenje
+# ==========================
+def set_memory_tracking(on: bool) -> None:
+    if on and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not on and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def request_profile() -> None:
+    """Sljedeće izvođenje (bilo koje sesije) ide kroz cProfile."""
+    _profile_requested.set()
+
+
+def _rotate(path: str) -> None:
+    for i in range(BACKUPS - 1, 0, -1):
+        if os.path.exists(f"{path}.{i}"):
+            os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+    os.replace(path, f"{path}.1")
+
+
+def _write_log(path: str, run: Run) -> None:
+    line = json.dumps(run.as_dict(), ensure_ascii=False) + "\n"
+    with _lock:
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            if os.path.exists(path) and os.path.getsize(path) >= MAX_BYTES:
+                _rotate(path)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError:
+            pass   # profil ne smije srušiti stranicu
+
+
+@contextlib.contextmanager
+def rerun(log_path: Optional[str] = None, profile_dir: Optional[str] = None):
+    """
+    Jedno izvođenje skripte. Na kraju se sprema u zadnja izvođenja i (ako je
+    zadan log_path) dopisuje u JSONL log; cProfile ako je zatražen.
+    """
+    run = Run()
+    _ctx.run = run
+    profiler = None
+    if _profile_requested.is_set():
+        _profile_requested.clear()
+        import cProfile   # samo na zahtjev
+        profiler = cProfile.Profile()
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    mem0 = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+    queries0, sql0 = querylog.counters()
+    t0 = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield run
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        run.ms = (time.perf_counter() - t0) * 1000
+        queries, sql = querylog.counters()
+        run.queries, run.sql_ms = queries - queries0, (sql - sql0) * 1000
+        if tracemalloc.is_tracing():
+            peak = max([tracemalloc.get_traced_memory()[1], run._peak_seen] + [f.peak_seen for f in run._stack])
+            run.peak_kb = round(max(peak - mem0, 0) / 1024, 1)
+        run._stack.clear()
+        _ctx.run = None
+        metrics.RERUN_SECONDS.observe(run.ms / 1000, (run.section or "?",))
+        if profiler is not None:
+            _save_profile(run, profiler, profile_dir)
+        with _lock:
+            _runs.append(run)
+        if log_path:
+            _write_log(log_path, run)
+
+
+def _save_profile(run: Run, profiler, profile_dir: Optional[str]) -> None:
+    import pstats
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_LINES)
+    run.profile_text = out.getvalue()
+    if profile_dir:
+        try:
+            os.makedirs(profile_dir, exist_ok=True)
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+            path = os.path.join(profile_dir, f"{stamp}-{''.join(c for c in run.section if c.isalnum()) or 'rerun'}.prof")
+            profiler.dump_stats(path)
+            run.profile_path = path
+        except OSError:
+            pass
+
+
+def runs() -> List[Run]:
+    """Zadnja izvođenja, najnovije prvo."""
+    with _lock:
+        return list(reversed(_runs))
+
+
+def last_profile() -> Optional[Run]:
+    return next((r for r in runs() if r.profile_text), None)
+
+
+def read_log(path: str, limit: int = 1000) -> List[dict]:
+    """Zadnjih `limit` zapisa iz JSONL loga (s rotiranim datotekama), najnovije prvo."""
+    out: List[dict] = []
+    for p in [path] + [f"{path}.{i}" for i in range(1, BACKUPS + 1)]:
+        if len(out) >= limit or not os.path.exists(p):
+            continue
+        with open(p, encoding="utf-8") as f:
+            lines = f.readlines()
+        for line in reversed(lines):
+            try:
+                out.append(json.loads(line))
+            except ValueError:
+                continue
+            if len(out) >= limit:
+                break
+    return out
@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""
+Mjerenje SQL upita: veza (InstrumentedConnection) čiji kursori bilježe
+tekst upita, oblik parametara (bez vrijednosti), broj vraćenih redaka i
+vrijeme (izvršavanje + dohvat redaka).
+
+Upiti se zbrajaju po odjeljku i tekstu upita, a po izvođenju skripte
+(rerun) bilježi se broj upita i ukupno vrijeme. Upiti sporiji od
+SLOW_MS pišu se u log `hk_podravka.sql` i u popis zadnjih sporih upita.
+Odjeljak i izvođenje postavlja aplikacija (scope/rerun); Streamlit
+izvodi svaku sesiju u svojoj dretvi, pa je kontekst po dretvi.
+"""
+
+import contextlib
+import itertools
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from hk_podravka import metrics
+
+SLOW_MS = 200
+MAX_STATEMENTS = 1000     # različitih upita u zbroju; ostali se broje pod OVERFLOW
+OVERFLOW = "(ostali upiti)"
+BACKGROUND = "(pozadina)"
+
+log = logging.getLogger("hk_podravka.sql")
+
+_lock = threading.Lock()
+_ctx = threading.local()
+_rerun_ids = itertools.count(1)
+
+# (odjeljak, sql) -> [broj, ukupno s, najdulje s, redaka, parametri]
+_stats: Dict[Tuple[str, str], list] = {}
+_slow: deque = deque(maxlen=100)
+_reruns: deque = deque(maxlen=50)
+# upiti kursora dovršenih iz __del__ (GC može pozvati usred _record dok dretva drži _lock):
+# samo se dodaju ovdje (bez zaključavanja) i bilježe pri sljedećem upitu ili pregledu
+_pending: deque = deque()
+
+
+class QueryStat(NamedTuple):
+    section: str
+    sql: str
+    calls: int
+    total_ms: float
+    avg_ms: float
+    max_ms: float
+    rows: int
+    params: str         # oblik parametara, npr. "3", ":id,:name", "executemany 200×4"
+
+
+class SlowQuery(NamedTuple):
+    at: float           # time.time()
+    section: str
+    rerun: int
+    sql: str
+    params: str
+    rows: int
+    ms: float
+
+
+class Rerun(NamedTuple):
+    id: int
+    section: str
+    started: float
+    queries: int
+    sql_ms: float
+    wall_ms: float
+
+
+_WS = re.compile(r"\s+")
+
+
+def normalize(sql: str) -> str:
+    return _WS.sub(" ", sql).strip()
+
+
+def _shape(params, many: bool = False) -> str:
+    if many:
+        try:
+            seq = params if isinstance(params, (list, tuple)) else list(params)
+        except TypeError:
+            return "executemany"
+        width = len(seq[0]) if seq and hasattr(seq[0], "__len__") else 0
+        return f"executemany {len(seq)}×{width}"
+    if isinstance(params, dict):
+        return ",".join(":" + k for k in params)
+    return str(len(params)) if params else "0"
+
+
+# ==========================
+# Kontekst (odjeljak, izvođenje)
+# ==========================
+def current() -> Tuple[str, int]:
+    return getattr(_ctx, "section", BACKGROUND), getattr(_ctx, "rerun", 0)
+
+
+@contextlib.contextmanager
+def scope(section: str):
+    """Upiti unutar bloka pripisuju se odjeljku `section`."""
+    old = getattr(_ctx, "section", BACKGROUND)
+    _ctx.section = section
+    try:
+        yield
+    finally:
+        _ctx.section = old
+
+
+@contextlib.contextmanager
+def rerun(section: str = ""):
+    """Jedno izvođenje skripte: na kraju se bilježi broj upita i njihovo ukupno vrijeme."""
+    _ctx.rerun = next(_rerun_ids)
+    _ctx.queries = 0
+    _ctx.sql_seconds = 0.0
+    _ctx.section = section or BACKGROUND
+    t0, wall0 = time.time(), time.perf_counter()
+    try:
+        yield _ctx.rerun
+    finally:
+        with _lock:
+            _reruns.append(Rerun(_ctx.rerun, _ctx.section, t0, _ctx.queries,
+                                 _ctx.sql_seconds * 1000, (time.perf_counter() - wall0) * 1000))
+        _ctx.rerun = 0
+        _ctx.section = BACKGROUND
+
+
+def counters() -> Tuple[int, float]:
+    """Broj upita i SQL sekunde tekućeg izvođenja u ovoj dretvi (za mjerenje faza)."""
+    if not getattr(_ctx, "rerun", 0):
+        return 0, 0.0
+    return _ctx.queries, _ctx.sql_seconds
+
+
+def set_section(section: str) -> None:
+    """Promijeni odjeljak tekućeg izvođenja (npr. nakon odabira u izborniku)."""
+    _ctx.section = section
+
+
+# ==========================
+# Bilježenje
+# ==========================
+class _Exec:
+    __slots__ = ("sql", "params", "section", "rerun", "seconds", "rows", "done")
+
+    def __init__(self, sql: str, params: str):
+        self.sql = sql
+        self.params = params
+        self.section, self.rerun = current()
+        self.seconds = 0.0
+        self.rows = 0
+        self.done = False
+
+
+def _flush() -> None:
+    while _pending:
+        try:
+            e = _pending.popleft()
+        except IndexError:
+            break
+        _store(e)
+
+
+def _record(e: _Exec) -> None:
+    _store(e)
+    _flush()
+
+
+def _store(e: _Exec) -> None:
+    e.done = True
+    sql = normalize(e.sql)
+    with _lock:
+        key = (e.section, sql)
+        s = _stats.get(key)
+        if s is None:
+            if len(_stats) >= MAX_STATEMENTS:
+                key = (e.section, OVERFLOW)
+                s = _stats.setdefault(key, [0, 0.0, 0.0, 0, ""])
+            else:
+                s = _stats[key] = [0, 0.0, 0.0, 0, e.params]
+        s[0] += 1
+        s[1] += e.seconds
+        s[2] = max(s[2], e.seconds)
+        s[3] += e.rows
+    metrics.SQL_QUERIES.inc((e.section,))
+    metrics.SQL_SECONDS.observe(e.seconds, (e.section,))
+    if e.rerun and getattr(_ctx, "rerun", 0) == e.rerun:
+        _ctx.queries += 1
+        _ctx.sql_seconds += e.seconds
+    ms = e.seconds * 1000
+    if ms >= SLOW_MS:
+        metrics.SQL_SLOW.inc((e.section,))
+        _slow.append(SlowQuery(time.time(), e.section, e.rerun, sql, e.params, e.rows, ms))
+        log.warning("spor upit %.0f ms, %d redaka [%s] %s", ms, e.rows, e.section, sql[:500])
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Kursor koji mjeri execute i dohvat redaka; upit se bilježi kad su redci dohvaćeni."""
+
+    _exec: Optional[_Exec] = None
+
+    def _start(self, sql: str, params: str, call, *args):
+        self._finish()
+        e = self._exec = _Exec(sql, params)
+        t = time.perf_counter()
+        try:
+            call(*args)
+        finally:
+            e.seconds += time.perf_counter() - t
+        if self.description is None:   # bez rezultata (INSERT/UPDATE/DDL)
+            e.rows = max(self.rowcount, 0)
+            _record(e)
+        return self
+
+    def _finish(self) -> None:
+        e = self._exec
+        if e is not None and not e.done:
+            _record(e)
+
+    def execute(self, sql, parameters=()):
+        return self._start(sql, _shape(parameters), super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not isinstance(seq_of_parameters, (list, tuple)):
+            seq_of_parameters = list(seq_of_parameters)
+        return self._start(sql, _shape(seq_of_parameters, many=True), super().executemany, sql, seq_of_parameters)
+
+    def _fetched(self, t: float, n: int, end: bool) -> None:
+        e = self._exec
+        if e is not None and not e.done:
+            e.seconds += time.perf_counter() - t
+            e.rows += n
+            if end:
+                _record(e)
+
+    def fetchone(self):
+        t = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(t, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        t = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(t, len(rows), not rows)
+        return rows
+
+    def fetchall(self):
+        t = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(t, len(rows), True)
+        return rows
+
+    def __next__(self):
+        t = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(t, 0, True)
+            raise
+        self._fetched(t, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        e = self._exec
+        if e is not None and not e.done:
+            e.done = True
+            _pending.append(e)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3.connect(..., factory=InstrumentedConnection); i conn.execute prolazi kroz cursor()."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+
+# ==========================
+# Pregled
+# ==========================
+def top_queries(n: int = 20, by: str = "total", section: Optional[str] = None) -> List[QueryStat]:
+    """Upiti s najvećim ukupnim (`total`), najduljim (`max`) vremenom ili najviše poziva (`calls`)."""
+    _flush()
+    with _lock:
+        items = [(k, list(v)) for k, v in _stats.items() if section is None or k[0] == section]
+    key = {"total": lambda kv: kv[1][1], "max": lambda kv: kv[1][2], "calls": lambda kv: kv[1][0]}[by]
+    items.sort(key=key, reverse=True)
+    return [QueryStat(sec, sql, c, tot * 1000, tot * 1000 / c, mx * 1000, rows, params)
+            for (sec, sql), (c, tot, mx, rows, params) in items[:n]]
+
+
+def slow_queries() -> List[SlowQuery]:
+    _flush()
+    with _lock:
+        return list(reversed(_slow))
+
+
+def reruns() -> List[Rerun]:
+    with _lock:
+        return list(reversed(_reruns))
+
+
+def reset() -> None:
+    _pending.clear()
+    with _lock:
+        _stats.clear()
+        _slow.clear()
+        _reruns.clear()
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: str = "0") -> List[str]:
+    """
+    EXPLAIN QUERY PLAN za zabilježeni upit (ne izvršava ga); parametri se
+    zamjenjuju s NULL prema zabilježenom obliku. Vraća retke plana s uvlakom.
+    """
+    if params.startswith(":"):
+        args = {k[1:]: None for k in params.split(",")}
+    elif params.startswith("executemany"):
+        width = params.rsplit("×", 1)[-1]
+        args = [None] * int(width) if width.isdigit() else []
+    else:
+        args = [None] * int(params or 0)
+    rows = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, args).fetchall()
+    depth: Dict[int, int] = {0: -1}
+    out = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        out.append("  " * depth[node] + detail)
+    return out
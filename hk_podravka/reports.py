@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Izvještaji i izvozi zajednički aplikaciji i naredbenom retku: popis
+članova, svi rezultati i dokumenti članova kojima uskoro istječe
+valjanost (liječnička, osobna, putovnica).
+"""
+
+import sqlite3
+from datetime import date
+from typing import List, NamedTuple
+
+import pandas as pd
+
+from hk_podravka import archive
+
+EXPIRY_DAYS = 14
+
+# dokument -> stupac s datumom valjanosti
+EXPIRY_COLUMNS = {
+    "liječnička": "medical_valid_until",
+    "osobna": "id_card_valid_until",
+    "putovnica": "passport_valid_until",
+}
+
+
+def members_frame(conn: sqlite3.Connection, today: date) -> pd.DataFrame:
+    """Popis članova s formatiranim datumima i starošću (godine, dani); _med_days = dana do isteka liječničke."""
+    mdf = pd.read_sql_query("""
+        SELECT m.id, m.full_name AS ime_prezime, m.first_name AS ime, m.last_name AS prezime,
+               m.gender AS spol, m.oib, m.street AS ulica, m.city AS grad, m.postal_code AS poštanski_broj,
+               m.athlete_email, m.parent_email, m.athlete_phone, m.parent_phone, m.parent_name,
+               m.active_competitor AS aktivni, m.veteran,
+               m.membership_fee_eur AS članarina, m.medical_valid_until AS liječnička_do, m.dob,
+               g.name AS grupa
+        FROM members m LEFT JOIN groups g ON m.group_id=g.id
+        ORDER BY m.full_name
+    """, conn)
+    if mdf.empty:
+        return mdf
+    dob = pd.to_datetime(mdf["dob"].replace("", None), errors="coerce")
+    days = (pd.Timestamp(today) - dob).dt.days
+    years = days // 365
+    ages = years.astype("Int64").astype(str) + " godina, " + (days - years * 365).astype("Int64").astype(str) + " dana"
+    med = pd.to_datetime(mdf["liječnička_do"].replace("", None), errors="coerce")
+    mdf.insert(0, "R.br.", range(1, len(mdf) + 1))
+    mdf["dob"] = dob.dt.strftime("%d.%m.%Y.").fillna(mdf["dob"].fillna(""))
+    mdf["liječnička_do"] = med.dt.strftime("%d.%m.%Y.").fillna(mdf["liječnička_do"].fillna(""))
+    mdf.insert(3, "starost", ages.where(dob.notna(), ""))
+    mdf["_med_days"] = (med - pd.Timestamp(today)).dt.days
+    return mdf
+
+
+def results_frame(conn: sqlite3.Connection, src: archive.Sources = archive.HOT) -> pd.DataFrame:
+    """
+    Svi rezultati (najnovija natjecanja prva) s rednim brojem i datumom
+    dd.mm.yyyy. S izvorima iz archive.history() i rezultati arhiviranih sezona.
+    """
+    res = pd.read_sql_query(f"""
+        SELECT cr.id, c.name AS natjecanje, c.date_from AS datum, m.full_name AS sportaš,
+               cr.weight_category AS kategorija, cr.style AS stil,
+               cr.bouts_total AS borbi, cr.wins AS pobjede, cr.losses AS porazi, cr.placement AS plasman
+        FROM {src.competition_results} cr
+        JOIN competitions c ON c.id=cr.competition_id
+        LEFT JOIN members m ON m.id=cr.member_id
+        ORDER BY c.date_from DESC, cr.id   -- isti redni brojevi i nakon arhiviranja (UNION ALL mijenja redoslijed)
+    """, conn)
+    if not res.empty:
+        try:
+            res["datum"] = pd.to_datetime(res["datum"]).dt.strftime("%d.%m.%Y.")
+        except Exception:
+            pass
+        res.insert(0, "R.br.", range(1, len(res) + 1))
+    return res
+
+
+class Expiry(NamedTuple):
+    member_id: int
+    full_name: str
+    document: str        # ključ iz EXPIRY_COLUMNS
+    valid_until: str     # YYYY-MM-DD
+    days_left: int       # negativno = već isteklo
+    email: str           # sportaša, inače roditelja
+    phone: str
+
+
+def expiring(conn: sqlite3.Connection, today: date, days: int = EXPIRY_DAYS,
+             documents=tuple(EXPIRY_COLUMNS)) -> List[Expiry]:
+    """Dokumenti koji istječu u sljedećih `days` dana ili su već istekli, po datumu isteka."""
+    limit = date.fromordinal(today.toordinal() + days).isoformat()
+    parts = [f"""SELECT id, full_name, '{doc}', substr({EXPIRY_COLUMNS[doc]},1,10),
+                        COALESCE(NULLIF(athlete_email,''), parent_email, ''),
+                        COALESCE(NULLIF(athlete_phone,''), parent_phone, '')
+                 FROM members WHERE COALESCE({EXPIRY_COLUMNS[doc]},'')<>'' AND substr({EXPIRY_COLUMNS[doc]},1,10) <= ?"""
+             for doc in documents]
+    rows = conn.execute(" UNION ALL ".join(parts) + " ORDER BY 4, 2", [limit] * len(parts)).fetchall()
+    out = []
+    for mid, name, doc, until, email, phone in rows:
+        try:
+            left = (date.fromisoformat(until) - today).days
+        except ValueError:
+            continue
+        out.append(Expiry(mid, name or "", doc, until, left, email or "", phone or ""))
+    return out
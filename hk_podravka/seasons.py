@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""Sezone kluba: sezona traje od 1. rujna do 31. kolovoza."""
+
+from datetime import date, timedelta
+from typing import Tuple
+
+SEASON_START_MONTH = 9
+
+
+def season_label(d: date) -> str:
+    """Oznaka sezone kojoj pripada datum, npr. '2025/2026'."""
+    y = d.year if d.month >= SEASON_START_MONTH else d.year - 1
+    return f"{y}/{y + 1}"
+
+
+def season_bounds(label: str) -> Tuple[date, date]:
+    """Prvi i zadnji dan sezone zadane oznakom '2025/2026'."""
+    y = int(label.split("/")[0])
+    return date(y, SEASON_START_MONTH, 1), date(y + 1, SEASON_START_MONTH, 1) - timedelta(days=1)
+
+
+def current_season() -> str:
+    return season_label(date.today())
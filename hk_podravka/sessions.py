@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Odabir sesija po vremenskom prozoru: danas, ovaj tjedan ili raspon,
+opcionalno za jednog trenera ili njegove grupe. Upiti idu preko
+indeksa na start_ts i uvijek imaju LIMIT, pa popis za odabir ostaje malen
+bez obzira na broj sezona u bazi.
+"""
+
+import sqlite3
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+PICKER_LIMIT = 200
+
+
+def window_for(mode: str, today: Optional[date] = None) -> Tuple[date, date]:
+    """Raspon [od, do) za 'danas' ili 'tjedan' (ponedjeljak–nedjelja)."""
+    today = today or date.today()
+    if mode == "tjedan":
+        start = today - timedelta(days=today.weekday())
+        return start, start + timedelta(days=7)
+    return today, today + timedelta(days=1)
+
+
+def coach_group_ids(conn: sqlite3.Connection, coach_id: int) -> List[int]:
+    """Grupe dodijeljene treneru (coach_groups) i grupe iz njegovih termina u rasporedu."""
+    return [r[0] for r in conn.execute("""
+        SELECT group_id FROM coach_groups WHERE coach_id=?
+        UNION
+        SELECT group_id FROM timetable_slots WHERE coach_id=? AND active=1
+    """, (coach_id, coach_id)) if r[0] is not None]
+
+
+def sessions_window(conn: sqlite3.Connection, date_from: date, date_to: date,
+                    coach_id: Optional[int] = None, group_ids: Optional[List[int]] = None,
+                    limit: int = PICKER_LIMIT) -> Tuple[List[tuple], bool]:
+    """
+    Sesije u rasponu [date_from, date_to), najnovije prve.
+    Vraća (redovi, skraćeno) gdje su redovi (id, start_ts, end_ts, grupa, trener, mjesto, group_id),
+    a `skraćeno` je True ako je bilo više od `limit` sesija.
+    """
+    q = """SELECT s.id, s.start_ts, s.end_ts, g.name, c.full_name, s.location, s.group_id
+           FROM sessions s LEFT JOIN groups g ON g.id=s.group_id
+           LEFT JOIN coaches c ON c.id=s.coach_id
+           WHERE s.start_ts >= ? AND s.start_ts < ?"""
+    params: list = [str(date_from), str(date_to)]
+    if coach_id is not None and group_ids:
+        q += f" AND (s.coach_id=? OR s.group_id IN ({','.join('?' * len(group_ids))}))"
+        params += [coach_id] + list(group_ids)
+    elif coach_id is not None:
+        q += " AND s.coach_id=?"
+        params.append(coach_id)
+    elif group_ids:
+        q += f" AND s.group_id IN ({','.join('?' * len(group_ids))})"
+        params += list(group_ids)
+    elif group_ids is not None:   # prazan popis grupa = nijedna sesija (ne bez filtra)
+        return [], False
+    q += " ORDER BY s.start_ts DESC LIMIT ?"
+    params.append(limit + 1)
+    rows = conn.execute(q, params).fetchall()
+    return rows[:limit], len(rows) > limit
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Održavanje mape uploads/: izvještaj o zauzeću po kategoriji i brisanje
+datoteka na koje više ne pokazuje nijedan redak (obrisani članovi,
+natjecanja, treneri, zamijenjeni izvornici slika).
+
+Reference se skupljaju jednim UNION upitom nad svim stupcima iz
+blobstore.BLOB_REFS u skup, a mapa se prolazi jednom; siročad je razlika
+skupova. Brišu se samo datoteke starije od razdoblja odgode (upload čiji
+redak još nije spremljen ne smije nestati), u serijama s commitom.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from hk_podravka import blobstore
+
+GRACE_DAYS = 7
+BATCH_SIZE = 200
+GC_EVERY_HOURS = 24
+# Mape koje se ne čiste (logo vodi hk_podravka/assets.py)
+SKIP_DIRS = {"logo"}
+
+
+class FileInfo(NamedTuple):
+    path: str        # apsolutna, normalizirana
+    size: int
+    mtime: float
+    category: str
+
+
+class StorageReport(NamedTuple):
+    categories: Dict[str, Dict[str, int]]   # kategorija -> files, bytes, orphan_files, orphan_bytes
+    orphans: List[FileInfo]
+    missing: int                            # reference na datoteke kojih nema na disku
+
+
+def _norm(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _live_refs(conn: sqlite3.Connection) -> Tuple[Set[str], List[str]]:
+    """
+    (reference, izvori bez korisnika). Varijanta slike je živa dok neki
+    redak pokazuje na njezin izvornik ili na bilo koju varijantu iste slike.
+    """
+    direct_sql = " UNION ".join(f"SELECT {c} AS path FROM {t} WHERE COALESCE({c},'')<>''"
+                                for t, c in blobstore.BLOB_REFS if t != "image_variants")
+    direct = {_norm(r[0]) for r in conn.execute(direct_sql)}
+    sources: Dict[str, str] = {}
+    groups: Dict[str, List[str]] = {}
+    for sha, path, src in conn.execute("""SELECT v.source_sha256, v.path, b.path FROM image_variants v
+                                          LEFT JOIN blobs b ON b.sha256=v.source_sha256"""):
+        groups.setdefault(sha, []).append(_norm(path))
+        if src:
+            sources[sha] = _norm(src)
+    # izvornik ostaje samo ako na njega netko izravno pokazuje (KEEP_IMAGE_ORIGINALS)
+    refs, dead = set(direct), []
+    for sha, paths in groups.items():
+        if sources.get(sha) in direct or any(p in direct for p in paths):
+            refs.update(paths)
+        else:
+            dead.append(sha)
+    return refs, dead
+
+
+def referenced_paths(conn: sqlite3.Connection) -> Set[str]:
+    """Sve putanje na koje (izravno ili preko varijanti slike) pokazuje neki redak."""
+    return _live_refs(conn)[0]
+
+
+def _walk(root: str):
+    stack = [root]
+    while stack:
+        d = stack.pop()
+        try:
+            it = os.scandir(d)
+        except FileNotFoundError:
+            continue
+        with it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    if not (d == root and e.name in SKIP_DIRS):
+                        stack.append(e.path)
+                elif e.is_file(follow_symlinks=False):
+                    st = e.stat()
+                    yield e.path, st.st_size, st.st_mtime
+
+
+def _category(rel: str, blob_kinds: Dict[str, str]) -> str:
+    parts = rel.replace(os.sep, "/").split("/")
+    if parts[0] == blobstore.BLOB_SUBDIR:
+        if len(parts) > 1 and parts[1] == "tmp":
+            return "blobs/tmp"
+        return blob_kinds.get(rel.replace(os.sep, "/"), "blobs")
+    return "/".join(parts[:2]) if len(parts) > 2 else parts[0] if len(parts) > 1 else "."
+
+
+def scan(conn: sqlite3.Connection, upload_dir: str) -> StorageReport:
+    """Jedan prolaz kroz uploads/ i jedan upit za reference."""
+    refs = referenced_paths(conn)
+    root = os.path.abspath(upload_dir)
+    blob_kinds = {}
+    for path, kind in conn.execute("SELECT path, kind FROM blobs"):
+        rel = os.path.relpath(os.path.abspath(path), root).replace(os.sep, "/")
+        blob_kinds[rel] = kind or "blobs"
+
+    cats: Dict[str, Dict[str, int]] = {}
+    orphans: List[FileInfo] = []
+    seen: Set[str] = set()
+    for path, size, mtime in _walk(root):
+        npath = _norm(path)
+        seen.add(npath)
+        cat = _category(os.path.relpath(path, root), blob_kinds)
+        c = cats.setdefault(cat, {"files": 0, "bytes": 0, "orphan_files": 0, "orphan_bytes": 0})
+        c["files"] += 1
+        c["bytes"] += size
+        if npath not in refs:
+            c["orphan_files"] += 1
+            c["orphan_bytes"] += size
+            orphans.append(FileInfo(npath, size, mtime, cat))
+    missing = sum(1 for p in refs if p not in seen and p.startswith(_norm(root) + os.sep))
+    return StorageReport(cats, orphans, missing)
+
+
+def purge(conn: sqlite3.Connection, upload_dir: str, grace_days: int = GRACE_DAYS,
+          batch_size: int = BATCH_SIZE, report: Optional[StorageReport] = None) -> Tuple[int, int]:
+    """
+    Obriši siročad stariju od `grace_days` dana; vraća (datoteka, bajtova).
+    Svaka serija ponovno provjerava reference prije brisanja.
+    """
+    _, dead = _live_refs(conn)
+    conn.executemany("DELETE FROM image_variants WHERE source_sha256=?", [(sha,) for sha in dead])
+    conn.commit()
+    report = report or scan(conn, upload_dir)
+    cutoff = time.time() - grace_days * 86400
+    victims = [f for f in report.orphans if f.mtime < cutoff]
+    blob_rows = {_norm(p): p for (p,) in conn.execute("SELECT path FROM blobs")}
+    files = nbytes = 0
+    for i in range(0, len(victims), batch_size):
+        batch = victims[i:i + batch_size]
+        # provjera i brisanje u istoj transakciji pisanja: nova referenca ne može se upisati između
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        try:
+            still = referenced_paths(conn)
+            still |= {_norm(p) for (p,) in conn.execute("SELECT path FROM blobs WHERE refcount > 0")}
+            for f in batch:
+                if f.path in still:
+                    continue
+                try:
+                    if os.stat(f.path).st_mtime >= cutoff:   # upravo ponovno uploadano (blobstore.store)
+                        continue
+                    os.remove(f.path)
+                except FileNotFoundError:
+                    pass
+                files += 1
+                nbytes += f.size
+                if f.path in blob_rows:
+                    conn.execute("DELETE FROM blobs WHERE path=?", (blob_rows[f.path],))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    _remove_empty_dirs(os.path.join(upload_dir, blobstore.BLOB_SUBDIR))
+    return files, nbytes
+
+
+def drop_missing_blobs(conn: sqlite3.Connection) -> int:
+    """Ukloni retke iz `blobs` bez datoteke i bez referenci."""
+    gone = [(p,) for (p,) in conn.execute("SELECT path FROM blobs WHERE refcount<=0") if not os.path.exists(p)]
+    conn.executemany("DELETE FROM blobs WHERE path=?", gone)
+    return len(gone)
+
+
+def _remove_empty_dirs(root: str) -> None:
+    for d, _, _ in os.walk(root, topdown=False):
+        if d != root and os.path.basename(d) != "tmp" and not os.listdir(d):
+            try:
+                os.rmdir(d)
+            except OSError:
+                pass
+
+
+# ==========================
+# Periodično čišćenje
+# ==========================
+_STATE_KEY = "storage_gc_last"
+_checked_at = 0.0
+_check_lock = threading.Lock()
+
+
+def run_if_due(db_path: str, upload_dir: str, every_hours: int = GC_EVERY_HOURS,
+               grace_days: int = GRACE_DAYS) -> Optional[threading.Thread]:
+    """
+    Pokreni čišćenje u pozadinskoj dretvi ako je od zadnjeg prošlo više od
+    `every_hours` sati. Baza se provjerava najviše jednom u 10 minuta po procesu.
+    """
+    global _checked_at
+    with _check_lock:
+        if time.monotonic() - _checked_at < 600:
+            return None
+        _checked_at = time.monotonic()
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        row = conn.execute("SELECT value FROM analytics_state WHERE key=?", (_STATE_KEY,)).fetchone()
+        now = datetime.now()
+        if row and now - datetime.fromisoformat(row[0]) < timedelta(hours=every_hours):
+            return None
+        conn.execute("INSERT OR REPLACE INTO analytics_state(key, value) VALUES (?,?)", (_STATE_KEY, now.isoformat()))
+        conn.commit()
+    finally:
+        conn.close()
+
+    def job():
+        c = sqlite3.connect(db_path, timeout=30)
+        try:
+            purge(c, upload_dir, grace_days)
+            drop_missing_blobs(c)
+            c.commit()
+        finally:
+            c.close()
+
+    t = threading.Thread(target=job, name="hk-storage-gc", daemon=True)
+    t.start()
+    return t
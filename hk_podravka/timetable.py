@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Raspored treninga: tjedni termini po grupi, treneru i mjestu te
+generiranje sesija za cijelu sezonu jednim batch insertom.
+
+Generirane sesije nose slot_id pa se buduće sesije mogu ponovno
+izgraditi kad se raspored promijeni (sesije s upisanim prisustvom ostaju).
+"""
+
+import sqlite3
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DANI = ["Ponedjeljak", "Utorak", "Srijeda", "Četvrtak", "Petak", "Subota", "Nedjelja"]
+
+
+def _easter(year: int) -> date:
+    """Uskrs (gregorijanski kalendar, anonimni algoritam)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def croatian_public_holidays(year: int) -> List[Tuple[date, str]]:
+    """Državni praznici i blagdani u RH za zadanu godinu."""
+    easter = _easter(year)
+    return sorted([
+        (date(year, 1, 1), "Nova godina"),
+        (date(year, 1, 6), "Sveta tri kralja"),
+        (easter, "Uskrs"),
+        (easter + timedelta(days=1), "Uskrsni ponedjeljak"),
+        (date(year, 5, 1), "Praznik rada"),
+        (date(year, 5, 30), "Dan državnosti"),
+        (easter + timedelta(days=60), "Tijelovo"),
+        (date(year, 6, 22), "Dan antifašističke borbe"),
+        (date(year, 8, 5), "Dan pobjede i domovinske zahvalnosti"),
+        (date(year, 8, 15), "Velika Gospa"),
+        (date(year, 11, 1), "Svi sveti"),
+        (date(year, 11, 18), "Dan sjećanja na žrtve Domovinskog rata"),
+        (date(year, 12, 25), "Božić"),
+        (date(year, 12, 26), "Sveti Stjepan"),
+    ])
+
+
+def add_public_holidays(conn: sqlite3.Connection, date_from: date, date_to: date) -> int:
+    """Upiši državne praznike iz raspona kao iznimke za sve grupe (bez duplikata)."""
+    have = {r[0] for r in conn.execute("SELECT date_from FROM timetable_exceptions WHERE group_id IS NULL")}
+    rows = []
+    for year in range(date_from.year, date_to.year + 1):
+        for d, name in croatian_public_holidays(year):
+            if date_from <= d <= date_to and str(d) not in have:
+                rows.append((str(d), str(d), name))
+    conn.executemany("INSERT INTO timetable_exceptions (date_from,date_to,group_id,note) VALUES (?,?,NULL,?)", rows)
+    return len(rows)
+
+
+def _excluded_days(conn: sqlite3.Connection, date_from: date, date_to: date) -> Dict[Optional[int], Set[date]]:
+    """Dani bez treninga: ključ None vrijedi za sve grupe, inače za group_id."""
+    out: Dict[Optional[int], Set[date]] = {}
+    for d0, d1, gid in conn.execute("""SELECT date_from, COALESCE(NULLIF(date_to,''), date_from), group_id
+                                       FROM timetable_exceptions
+                                       WHERE date_from <= ? AND COALESCE(NULLIF(date_to,''), date_from) >= ?""",
+                                    (str(date_to), str(date_from))):
+        a, b = date.fromisoformat(d0[:10]), date.fromisoformat(d1[:10])
+        days = out.setdefault(gid, set())
+        while a <= b:
+            days.add(a)
+            a += timedelta(days=1)
+    return out
+
+
+def _slot_rows(slot: tuple, date_from: date, date_to: date,
+               excluded: Dict[Optional[int], Set[date]]) -> Iterable[tuple]:
+    sid, gid, cid, weekday, t0, t1, loc, vfrom, vto = slot
+    start = max(date_from, date.fromisoformat(vfrom)) if vfrom else date_from
+    end = min(date_to, date.fromisoformat(vto)) if vto else date_to
+    skip = excluded.get(None, set()) | excluded.get(gid, set())
+    h0, m0 = map(int, t0.split(":"))
+    h1, m1 = map(int, t1.split(":"))
+    minutes = max(0, (h1 * 60 + m1) - (h0 * 60 + m0))
+    d = start + timedelta(days=(weekday - start.weekday()) % 7)
+    while d <= end:
+        if d not in skip:
+            yield (cid, gid, f"{d} {t0}", f"{d} {t1}", loc, "", sid, minutes)
+        d += timedelta(days=7)
+
+
+def generate_sessions(conn: sqlite3.Connection, date_from: date, date_to: date,
+                      slot_ids: Optional[List[int]] = None) -> int:
+    """
+    Materijaliziraj sesije za aktivne termine u rasponu [date_from, date_to].
+    Postojeće (slot_id, start_ts) se preskaču. Vraća broj novih sesija; commit radi pozivatelj.
+    """
+    q = """SELECT id, group_id, coach_id, weekday, start_time, end_time, location, valid_from, valid_to
+           FROM timetable_slots WHERE active=1"""
+    params: List = []
+    if slot_ids is not None:
+        if not slot_ids:
+            return 0
+        q += f" AND id IN ({','.join('?' * len(slot_ids))})"
+        params.extend(slot_ids)
+    slots = conn.execute(q, params).fetchall()
+    excluded = _excluded_days(conn, date_from, date_to)
+    have = set(conn.execute("""SELECT slot_id, start_ts FROM sessions
+                               WHERE slot_id IS NOT NULL AND start_ts >= ? AND start_ts < ?""",
+                            (str(date_from), str(date_to + timedelta(days=1)))).fetchall())
+    rows = [r for s in slots for r in _slot_rows(s, date_from, date_to, excluded) if (r[6], r[2]) not in have]
+    conn.executemany("""INSERT OR IGNORE INTO sessions
+                        (coach_id,group_id,start_ts,end_ts,location,remark,slot_id,duration_min)
+                        VALUES (?,?,?,?,?,?,?,?)""", rows)
+    return len(rows)
+
+
+def regenerate_future(conn: sqlite3.Connection, from_day: Optional[date] = None,
+                      until: Optional[date] = None, slot_ids: Optional[List[int]] = None) -> Tuple[int, int]:
+    """
+    Nakon promjene rasporeda: obriši buduće generirane sesije bez upisanog
+    prisustva do `until` (zadano: zadnja generirana sesija, uključivo) i ponovno
+    ih izgradi za isti raspon. Vraća (obrisano, kreirano).
+    """
+    from_day = from_day or date.today()
+    if until is None:
+        last = conn.execute("SELECT MAX(start_ts) FROM sessions WHERE slot_id IS NOT NULL").fetchone()[0]
+        until = date.fromisoformat(last[:10]) if last else from_day
+    # samo raspon koji se ponovno gradi; sesije iza `until` ostaju
+    q = """DELETE FROM sessions
+           WHERE slot_id IS NOT NULL AND start_ts >= ? AND start_ts < ?
+             AND NOT EXISTS (SELECT 1 FROM attendance a WHERE a.session_id = sessions.id)"""
+    params: List = [str(from_day), str(until + timedelta(days=1))]
+    if slot_ids is not None:
+        if not slot_ids:
+            return 0, 0
+        q += f" AND slot_id IN ({','.join('?' * len(slot_ids))})"
+        params.extend(slot_ids)
+    deleted = conn.execute(q, params).rowcount
+    created = generate_sessions(conn, from_day, until, slot_ids)
+    return deleted, created
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+Trenažno opterećenje po sportašu: redovni treninzi (attendance) i pripreme
+reprezentacije (camp_attendance) zbrojeni po tjednu, mjesecu i sezoni u
+tablici training_load.
+
+Tablica se osvježava inkrementalno: nakon novih upisa ponovno se računaju
+samo mjeseci (i tjedni koji ih dodiruju) kojih se upisi tiču, a sezonski
+redak je zbroj mjeseci; brisanja i promjene priprema vode na potpunu
+obnovu. Ako se brojači u data_versions nisu pomaknuli, osvježavanje ne
+čita ulazne tablice. Treninzi i sati priprema raspoređuju se jednako po
+danima priprema pa tjedni i mjesečni zbrojevi odgovaraju stvarnom razdoblju.
+
+Sezone preseljene u arhivu (hk_podravka/archive.py) računaju se pri
+arhiviranju (recompute_season) i dalje se ne diraju: tjedan pripada sezoni
+svog ponedjeljka, pa se tjedan na prijelazu iz arhivirane sezone ne
+računa ponovno iz glavne baze.
+"""
+
+import hashlib
+import sqlite3
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from hk_podravka import archive, versions
+from hk_podravka.seasons import season_bounds, season_label
+
+PERIOD_KINDS = ("tjedan", "mjesec", "sezona")
+_VERSION_TABLES = ("attendance", "camp_attendance", "camps", "sessions")
+
+# Uzrasne kategorije prema godini rođenja (dob u završnoj godini sezone)
+AGE_CATEGORIES = [(10, "U11"), (12, "U13"), (14, "U15"), (16, "U17"), (19, "U20"), (22, "U23")]
+
+
+def age_category(birth_year: Optional[int], season: str) -> str:
+    if not birth_year:
+        return "NEPOZNATO"
+    age = int(season.split("/")[1]) - int(birth_year)
+    for max_age, label in AGE_CATEGORIES:
+        if age <= max_age:
+            return label
+    return "SENIORI"
+
+
+def _monday(d: date) -> date:
+    return d - timedelta(days=d.weekday())
+
+
+def _state(conn: sqlite3.Connection) -> Dict[str, str]:
+    return dict(conn.execute("SELECT key, value FROM analytics_state WHERE key LIKE 'load_%'").fetchall())
+
+
+def _fingerprint(conn: sqlite3.Connection) -> Dict[str, str]:
+    a = conn.execute("SELECT COUNT(*), COALESCE(MAX(id),0) FROM attendance").fetchone()
+    c = conn.execute("SELECT COUNT(*), COALESCE(MAX(id),0) FROM camp_attendance").fetchone()
+    camps = "|".join(f"{r[0]}:{r[1]}:{r[2]}" for r in
+                     conn.execute("SELECT id, start_date, end_date FROM camps ORDER BY id"))
+    return {"load_att_count": str(a[0]), "load_att_max": str(a[1]),
+            "load_camp_count": str(c[0]), "load_camp_max": str(c[1]),
+            "load_camps_sig": hashlib.sha1(camps.encode()).hexdigest()}
+
+
+def _versions_sig(conn: sqlite3.Connection) -> str:
+    """Verzije ulaznih tablica iz data_versions ('' ako tablica ne postoji)."""
+    try:
+        v = versions.read(conn, _VERSION_TABLES)
+    except sqlite3.OperationalError:
+        return ""
+    return ",".join(str(v.get(t, 0)) for t in _VERSION_TABLES)
+
+
+def _all_seasons(conn: sqlite3.Connection) -> Set[str]:
+    out: Set[str] = set()
+    lo, hi = conn.execute("SELECT MIN(start_ts), MAX(start_ts) FROM sessions").fetchone()
+    for d0, d1 in [(lo, hi)] + conn.execute("SELECT MIN(start_date), MAX(end_date) FROM camps").fetchall():
+        if d0 and d1:
+            s = season_label(date.fromisoformat(d0[:10]))
+            while True:
+                out.add(s)
+                if s == season_label(date.fromisoformat(d1[:10])):
+                    break
+                y = int(s.split("/")[1])
+                s = f"{y}/{y + 1}"
+    return out
+
+
+def _camp_days(conn: sqlite3.Connection, d0: date, d1: date) -> Iterable[Tuple[int, date, float, float]]:
+    """(member_id, dan, treninga, sati) – udio priprema po danu za dane u [d0, d1)."""
+    for mid, start, end, trainings, hours in conn.execute("""
+            SELECT ca.member_id, c.start_date, COALESCE(NULLIF(c.end_date,''), c.start_date),
+                   COALESCE(ca.trainings,0), COALESCE(ca.hours,0)
+            FROM camp_attendance ca JOIN camps c ON c.id=ca.camp_id
+            WHERE c.start_date < ? AND COALESCE(NULLIF(c.end_date,''), c.start_date) >= ?
+              AND ca.member_id IS NOT NULL""", (str(d1), str(d0))):
+        a, b = date.fromisoformat(start[:10]), date.fromisoformat(end[:10])
+        if b < a:
+            b = a
+        n = (b - a).days + 1
+        d = max(a, d0)
+        while d <= b and d < d1:
+            yield mid, d, trainings / n, hours / n
+            d += timedelta(days=1)
+
+
+def _month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def _next_month(d: date) -> date:
+    return (d.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _recompute_months(conn: sqlite3.Connection, m0: date, m1: date, src: archive.Sources = archive.HOT,
+                      frozen: Set[str] = frozenset()) -> None:
+    """
+    Ponovno izračunaj mjesece [m0, m1) i sve tjedne koji ih dodiruju (osim
+    tjedna koji počinje u arhiviranoj sezoni iz `frozen`).
+    """
+    w0 = _monday(m0)
+    if w0 < m0 and season_label(w0) in frozen:
+        w0 += timedelta(days=7)
+    w_end = _monday(m1 - timedelta(days=1)) + timedelta(days=7)
+    lo = min(w0, m0)   # dani mjeseca prije preskočenog tjedna ulaze u mjesec, ne u tjedan
+    k0, k1 = m0.strftime("%Y-%m"), (m1 - timedelta(days=1)).strftime("%Y-%m")
+    conn.execute("DELETE FROM training_load WHERE period_kind='tjedan' AND period >= ? AND period < ?",
+                 (str(w0), str(w_end)))
+    conn.execute("DELETE FROM training_load WHERE period_kind='mjesec' AND period >= ? AND period <= ?", (k0, k1))
+
+    # Ključevi razdoblja računaju se jednom po sesiji (privremena tablica), ne po dolasku
+    conn.execute("DROP TABLE IF EXISTS temp._load_sessions")
+    conn.execute(f"""
+        CREATE TEMP TABLE _load_sessions AS
+        SELECT id, duration_min,
+               date(substr(start_ts,1,10), 'weekday 0', '-6 days') AS w,
+               CASE WHEN start_ts >= ? AND start_ts < ? THEN substr(start_ts,1,7) END AS m
+        FROM {src.sessions} WHERE start_ts >= ? AND start_ts < ?
+    """, (str(m0), str(m1), str(lo), str(w_end)))
+    minutes = "SUM(COALESCE(NULLIF(a.minutes,0), s.duration_min, 0))"
+    conn.execute(f"""
+        INSERT INTO training_load (member_id, period_kind, period, sessions, session_minutes, camp_trainings, camp_hours)
+        SELECT a.member_id, 'tjedan', s.w, COUNT(*), {minutes}, 0, 0
+        FROM temp._load_sessions s JOIN {src.attendance} a ON a.session_id=s.id
+        WHERE s.w >= ? AND a.present=1 AND a.member_id IS NOT NULL
+        GROUP BY a.member_id, s.w
+    """, (str(w0),))
+    conn.execute(f"""
+        INSERT INTO training_load (member_id, period_kind, period, sessions, session_minutes, camp_trainings, camp_hours)
+        SELECT a.member_id, 'mjesec', s.m, COUNT(*), {minutes}, 0, 0
+        FROM temp._load_sessions s JOIN {src.attendance} a ON a.session_id=s.id
+        WHERE s.m IS NOT NULL AND a.present=1 AND a.member_id IS NOT NULL
+        GROUP BY a.member_id, s.m
+    """)
+    conn.execute("DROP TABLE temp._load_sessions")
+
+    # Pripreme: raspodjela po danima pa zbroj po razdobljima
+    acc: Dict[Tuple[int, str, str], List[float]] = defaultdict(lambda: [0.0, 0.0])
+    for mid, d, tr, hr in _camp_days(conn, lo, w_end):
+        keys = [("tjedan", str(_monday(d)))] if _monday(d) >= w0 else []
+        if m0 <= d < m1:
+            keys.append(("mjesec", d.strftime("%Y-%m")))
+        for kind, p in keys:
+            v = acc[(mid, kind, p)]
+            v[0] += tr
+            v[1] += hr
+    conn.executemany("""
+        INSERT INTO training_load (member_id, period_kind, period, sessions, session_minutes, camp_trainings, camp_hours)
+        VALUES (?,?,?,0,0,?,?)
+        ON CONFLICT(member_id, period_kind, period) DO UPDATE SET
+            camp_trainings=excluded.camp_trainings, camp_hours=excluded.camp_hours
+    """, [(mid, kind, p, round(v[0], 2), round(v[1], 2)) for (mid, kind, p), v in acc.items()])
+
+
+def _resum_season(conn: sqlite3.Connection, season: str) -> None:
+    """Sezonski redak = zbroj mjesečnih redaka sezone."""
+    s0, s1 = season_bounds(season)
+    conn.execute("DELETE FROM training_load WHERE period_kind='sezona' AND period=?", (season,))
+    conn.execute("""
+        INSERT INTO training_load (member_id, period_kind, period, sessions, session_minutes, camp_trainings, camp_hours)
+        SELECT member_id, 'sezona', ?, SUM(sessions), SUM(session_minutes),
+               ROUND(SUM(camp_trainings), 2), ROUND(SUM(camp_hours), 2)
+        FROM training_load
+        WHERE period_kind='mjesec' AND period >= ? AND period <= ?
+        GROUP BY member_id
+    """, (season, s0.strftime("%Y-%m"), s1.strftime("%Y-%m")))
+
+
+def recompute_season(conn: sqlite3.Connection, season: str, src: archive.Sources = archive.HOT) -> None:
+    """Cijela sezona iz zadanih izvora (archive.history pri arhiviranju). Commit radi pozivatelj."""
+    s0, s1 = season_bounds(season)
+    _recompute_months(conn, s0, s1 + timedelta(days=1), src)
+    _resum_season(conn, season)
+
+
+def _clear(conn: sqlite3.Connection, frozen: Set[str]) -> None:
+    """Obriši training_load osim redaka arhiviranih sezona (tjedan po sezoni ponedjeljka)."""
+    if not frozen:
+        conn.execute("DELETE FROM training_load")
+        return
+    keep, params = [], []
+    for season in sorted(frozen):
+        s0, s1 = season_bounds(season)
+        keep += ["(period_kind='sezona' AND period=?)",
+                 "(period_kind='mjesec' AND period >= ? AND period <= ?)",
+                 "(period_kind='tjedan' AND period >= ? AND period <= ?)"]
+        params += [season, s0.strftime("%Y-%m"), s1.strftime("%Y-%m"), str(s0), str(s1)]
+    conn.execute(f"DELETE FROM training_load WHERE NOT ({' OR '.join(keep)})", params)
+
+
+def refresh_training_load(conn: sqlite3.Connection, full: bool = False) -> List[str]:
+    """
+    Osvježi training_load i vrati popis ponovno izračunatih sezona
+    (prazan ako se ništa nije promijenilo). Commit radi pozivatelj.
+    """
+    old = _state(conn)
+    sig = _versions_sig(conn)
+    if not full and sig and old.get("load_versions") == sig:
+        return []   # brojači verzija nepromijenjeni – bez COUNT(*) nad prisustvom
+    new = _fingerprint(conn)
+    new["load_versions"] = sig
+    if not full and old == new:
+        return []
+
+    appended_only = (
+        old and old.get("load_camps_sig") == new["load_camps_sig"]
+        and int(new["load_att_count"]) - int(old["load_att_count"])
+            == conn.execute("SELECT COUNT(*) FROM attendance WHERE id > ?", (int(old["load_att_max"]),)).fetchone()[0]
+        and int(new["load_camp_count"]) - int(old["load_camp_count"])
+            == conn.execute("SELECT COUNT(*) FROM camp_attendance WHERE id > ?", (int(old["load_camp_max"]),)).fetchone()[0]
+    )
+    frozen = set(archive.archived_seasons(conn))
+    if full or not appended_only:
+        _clear(conn, frozen)
+        seasons = _all_seasons(conn) - frozen
+        for season in sorted(seasons):
+            s0, s1 = season_bounds(season)
+            _recompute_months(conn, s0, s1 + timedelta(days=1), frozen=frozen)
+            _resum_season(conn, season)
+    else:
+        months = {date.fromisoformat(r[0] + "-01") for r in conn.execute("""
+            SELECT DISTINCT substr(s.start_ts,1,7) FROM attendance a JOIN sessions s ON s.id=a.session_id
+            WHERE a.id > ? AND s.start_ts IS NOT NULL""", (int(old["load_att_max"]),))}
+        for d0, d1 in conn.execute("""SELECT DISTINCT c.start_date, COALESCE(NULLIF(c.end_date,''), c.start_date)
+                                      FROM camp_attendance ca JOIN camps c ON c.id=ca.camp_id
+                                      WHERE ca.id > ? AND c.start_date IS NOT NULL""", (int(old["load_camp_max"]),)):
+            m = _month_start(date.fromisoformat(d0[:10]))
+            while m <= date.fromisoformat(d1[:10]):
+                months.add(m)
+                m = _next_month(m)
+        months = {m for m in months if season_label(m) not in frozen}
+        for m in sorted(months):
+            _recompute_months(conn, m, _next_month(m), frozen=frozen)
+        seasons = {season_label(m) for m in months}
+        for season in seasons:
+            _resum_season(conn, season)
+
+    conn.executemany("INSERT INTO analytics_state(key,value) VALUES (?,?) "
+                     "ON CONFLICT(key) DO UPDATE SET value=excluded.value", list(new.items()))
+    return sorted(seasons)
+
+
+def load_report(conn: sqlite3.Connection, kind: str, period_from: str, period_to: str) -> pd.DataFrame:
+    """Opterećenje po sportašu za razdoblja vrste `kind` između oznaka period_from i period_to (uključivo)."""
+    return pd.read_sql_query("""
+        SELECT t.period AS razdoblje, m.full_name AS sportaš, g.name AS grupa,
+               t.sessions AS treninga, ROUND(t.session_minutes / 60.0, 1) AS sati_treninga,
+               t.camp_trainings AS treninga_pripreme, t.camp_hours AS sati_pripreme,
+               ROUND(t.session_minutes / 60.0 + t.camp_hours, 1) AS ukupno_sati
+        FROM training_load t JOIN members m ON m.id=t.member_id
+        LEFT JOIN groups g ON g.id=m.group_id
+        WHERE t.period_kind=? AND t.period >= ? AND t.period <= ?
+        ORDER BY t.period, sportaš
+    """, conn, params=(kind, period_from, period_to))
+
+
+def category_report(conn: sqlite3.Connection, season: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Godišnji izvještaj za savez: (po sportašu s uzrasnom kategorijom, zbroj po kategoriji)
+    iz sezonskog retka training_load.
+    """
+    df = pd.read_sql_query("""
+        SELECT m.full_name AS sportaš, m.gender AS spol, substr(m.dob,1,4) AS godište, g.name AS grupa,
+               t.sessions AS treninga, ROUND(t.session_minutes / 60.0, 1) AS sati_treninga,
+               t.camp_trainings AS treninga_pripreme, t.camp_hours AS sati_pripreme,
+               ROUND(t.session_minutes / 60.0 + t.camp_hours, 1) AS ukupno_sati
+        FROM training_load t JOIN members m ON m.id=t.member_id
+        LEFT JOIN groups g ON g.id=m.group_id
+        WHERE t.period_kind='sezona' AND t.period=?
+        ORDER BY sportaš
+    """, conn, params=(season,))
+    df.insert(0, "kategorija", [age_category(int(y) if str(y).isdigit() else None, season) for y in df["godište"]])
+    totals = (df.groupby(["kategorija", "spol"], dropna=False)
+                .agg(sportaša=("sportaš", "count"), treninga=("treninga", "sum"),
+                     sati_treninga=("sati_treninga", "sum"), treninga_pripreme=("treninga_pripreme", "sum"),
+                     sati_pripreme=("sati_pripreme", "sum"), ukupno_sati=("ukupno_sati", "sum"))
+                .reset_index())
+    return df.sort_values(["kategorija", "sportaš"]), totals
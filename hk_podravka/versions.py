@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Brojači verzija po tablici (`data_versions`), koje okidači povećavaju pri
+svakom INSERT/UPDATE/DELETE. Spremljeni u bazi, pa vrijede za sve sesije
+i procese; služe kao ključ za cache upita u aplikaciji.
+
+VersionWatcher drži jednu vezu po procesu i brojače čita iz baze samo kad
+se promijeni PRAGMA data_version (netko je u međuvremenu napravio commit).
+"""
+
+import sqlite3
+import threading
+from typing import Dict, Iterable, Tuple
+
+from hk_podravka import db
+
+# Tablice čiji sadržaj aplikacija čita i prikazuje (izvedene tablice poput
+# training_load, dropout_scores ili blobs nisu ovdje)
+TRACKED_TABLES = [
+    "club_info", "board_members", "club_docs",
+    "groups", "members",
+    "coaches", "coach_docs", "coach_groups",
+    "competitions", "competition_results", "competition_photos",
+    "sessions", "attendance", "timetable_slots", "timetable_exceptions",
+    "camps", "camp_attendance",
+    "image_variants",
+]
+
+
+def trigger_sql(table: str) -> list:
+    """Okidači koji povećavaju data_versions.version za tablicu."""
+    bump = f"UPDATE data_versions SET version = version + 1 WHERE table_name = '{table}';"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_version_{table}_{op.lower()} AFTER {op} ON {table} BEGIN {bump} END"
+        for op in ("INSERT", "UPDATE", "DELETE")
+    ]
+
+
+def read(conn: sqlite3.Connection, tables: Iterable[str] = ()) -> Dict[str, int]:
+    """Trenutne verzije (sve ili samo zadanih tablica)."""
+    tables = list(tables)
+    if tables:
+        q = f"SELECT table_name, version FROM data_versions WHERE table_name IN ({','.join('?' * len(tables))})"
+        return dict(conn.execute(q, tables))
+    return dict(conn.execute("SELECT table_name, version FROM data_versions"))
+
+
+class VersionWatcher:
+    """Verzije tablica uz jedan `PRAGMA data_version` po pozivu dok se baza ne promijeni."""
+
+    def __init__(self, db_path: str):
+        # samo za čitanje: pogrešna putanja (npr. HK_PODRAVKA_DB za API) daje grešku, a ne novu praznu bazu
+        self._conn = sqlite3.connect(db.ro_uri(db_path), uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._data_version = None
+        self._versions: Dict[str, int] = {}
+
+    def get(self, tables: Iterable[str]) -> Tuple[int, ...]:
+        with self._lock:
+            dv = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if dv != self._data_version:
+                self._versions = read(self._conn)
+                self._data_version = dv
+            return tuple(self._versions.get(t, 0) for t in tables)
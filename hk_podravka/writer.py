@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Jedan pisac po procesu: upisi iz svih Streamlit sesija (treneri s mobitela
+istodobno upisuju prisustvo i rezultate) idu kroz red u jednu pozadinsku
+dretvu s vlastitom vezom, umjesto da se veze sesija otimaju za SQLiteovu
+jedinu bravu pisanja ("database is locked").
+
+Dretva uzme naredbu iz reda i sve što je u međuvremenu stiglo (najviše
+MAX_BATCH) pa ih izvrši u jednoj kratkoj transakciji (BEGIN IMMEDIATE …
+COMMIT). Svaka naredba ima svoj SAVEPOINT: greška (npr. UNIQUE) vraća se
+samo njenom pozivatelju, ostale iz iste transakcije se spremaju. Ako je
+baza zauzeta izvana (CLI, održavanje, drugi proces), transakcija se
+poništi i ponovi s eksponencijalnom pauzom (BACKOFF) do RETRY_SECONDS.
+
+Naredba je funkcija fn(conn, *args) koja samo piše u bazu (pri ponavljanju
+se izvodi ponovno) i ne radi commit. Pozivatelj čeka rezultat (run,
+execute, executemany) ili dobije Future (submit).
+
+    w = Writer("hk_podravka.db").start()
+    w.executemany("INSERT INTO attendance (session_id,member_id,present,minutes) VALUES (?,?,?,?)", rows)
+    python bench/write_load.py        # 20 istodobnih sesija: 0 zaključavanja, ograničena latencija
+"""
+
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+from hk_podravka import db, metrics
+
+MAX_BATCH = 50            # naredbi po transakciji (kratke transakcije, čitatelji ne čekaju checkpoint)
+QUEUE_SIZE = 1000         # pun red = pozivatelj čeka (povratni pritisak)
+BUSY_TIMEOUT = 0.05       # s; SQLiteov busy handler prije vlastitog ponavljanja
+BACKOFF = (0.005, 0.5)    # s; prva i najdulja pauza između pokušaja (× 0.5–1 slučajno)
+RETRY_SECONDS = 30        # nakon toga naredbe dobiju zadnju grešku
+WAIT_SECONDS = 60         # koliko run()/execute() čekaju rezultat
+
+
+class _Command(NamedTuple):
+    fn: Callable[..., Any]
+    args: Tuple
+    future: Future
+    queued: float
+
+
+def is_locked(e: sqlite3.OperationalError) -> bool:
+    msg = str(e).lower()
+    return "locked" in msg or "busy" in msg
+
+
+def _execute(conn: sqlite3.Connection, sql: str, params: Sequence) -> int:
+    return conn.execute(sql, params).lastrowid
+
+
+def _executemany(conn: sqlite3.Connection, sql: str, rows: List[Sequence]) -> int:
+    return conn.executemany(sql, rows).rowcount
+
+
+class Writer:
+    """Red naredbi i dretva koja ih upisuje (start() jednom po procesu, npr. st.cache_resource)."""
+
+    def __init__(self, db_path: str, max_batch: int = MAX_BATCH):
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Optional[_Command]]" = queue.Queue(QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def start(self) -> "Writer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="hk-db-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Upiše sve što je već u redu pa završi dretvu."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, fn: Callable[..., Any], *args) -> Future:
+        if self._thread is None:
+            raise RuntimeError("pisac nije pokrenut (Writer.start)")
+        fut: Future = Future()
+        self._queue.put(_Command(fn, args, fut, time.monotonic()))
+        return fut
+
+    def run(self, fn: Callable[..., Any], *args, timeout: float = WAIT_SECONDS) -> Any:
+        return self.submit(fn, *args).result(timeout)
+
+    def execute(self, sql: str, params: Sequence = (), timeout: float = WAIT_SECONDS) -> int:
+        """Jedna naredba; vraća lastrowid."""
+        return self.run(_execute, sql, tuple(params), timeout=timeout)
+
+    def executemany(self, sql: str, rows, timeout: float = WAIT_SECONDS) -> int:
+        """Više redaka u istoj transakciji; vraća broj upisanih."""
+        return self.run(_executemany, sql, [tuple(r) for r in rows], timeout=timeout)
+
+    # ==========================
+    # Dretva pisca
+    # ==========================
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = db.connect(self.db_path, timeout=BUSY_TIMEOUT)
+            self._conn.isolation_level = None   # BEGIN/SAVEPOINT/COMMIT izričito
+        return self._conn
+
+    def _loop(self) -> None:
+        running = True
+        while running:
+            cmd = self._queue.get()
+            if cmd is None:
+                break
+            batch = [cmd]
+            while len(batch) < self.max_batch:
+                try:
+                    cmd = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if cmd is None:
+                    running = False
+                    break
+                batch.append(cmd)
+            batch = [c for c in batch if c.future.set_running_or_notify_cancel()]
+            if batch:
+                self._run(batch)
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _run(self, batch: List[_Command]) -> None:
+        t0 = time.monotonic()
+        delay = BACKOFF[0]
+        while True:
+            try:
+                conn = self._connect()
+                results = self._transaction(conn, batch)
+                break
+            except sqlite3.Error as e:
+                if self._conn is not None and self._conn.in_transaction:
+                    self._conn.rollback()
+                retry = isinstance(e, sqlite3.OperationalError) and is_locked(e)
+                if not retry or time.monotonic() - t0 >= RETRY_SECONDS:
+                    if not retry and self._conn is not None:   # veza možda neupotrebljiva: nova za sljedeće
+                        self._conn.close()
+                        self._conn = None
+                    results = [(False, e)] * len(batch)
+                    break
+                metrics.WRITE_BUSY_RETRIES.inc()
+                time.sleep(delay * random.uniform(0.5, 1.0))
+                delay = min(delay * 2, BACKOFF[1])
+        metrics.WRITE_BATCH.observe(len(batch))
+        now = time.monotonic()
+        for cmd, (ok, value) in zip(batch, results):
+            metrics.WRITE_SECONDS.observe(now - cmd.queued, ("ok" if ok else "error",))
+            if ok:
+                cmd.future.set_result(value)
+            else:
+                cmd.future.set_exception(value)
+
+    @staticmethod
+    def _transaction(conn: sqlite3.Connection, batch: List[_Command]) -> List[Tuple[bool, Any]]:
+        """Sve naredbe u jednoj transakciji; zauzeta baza diže iznimku (cijela se ponavlja)."""
+        conn.execute("BEGIN IMMEDIATE")
+        out: List[Tuple[bool, Any]] = []
+        for cmd in batch:
+            conn.execute("SAVEPOINT cmd")
+            try:
+                value = cmd.fn(conn, *cmd.args)
+                if not conn.in_transaction:
+                    raise RuntimeError("naredba pisca ne smije raditi commit/rollback")
+            except sqlite3.OperationalError as e:
+                if is_locked(e):
+                    raise
+                conn.execute("ROLLBACK TO cmd")
+                conn.execute("RELEASE cmd")
+                out.append((False, e))
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK TO cmd")
+                    conn.execute("RELEASE cmd")
+                else:   # naredba je sama završila transakciju; ostale nastavljaju u novoj
+                    conn.execute("BEGIN IMMEDIATE")
+                out.append((False, e))
+            else:
+                conn.execute("RELEASE cmd")
+                out.append((True, value))
+        conn.execute("COMMIT")
+        return out
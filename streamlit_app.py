@@ -18,19 +18,19 @@ import io
 import base64
 import sqlite3
 from datetime import datetime, date, timedelta
-from typing import Optional, List, Tuple
+from typing import Callable, Dict, Optional, List, Tuple
 
 import pandas as pd
 import streamlit as st
 
-# Za ISO3 kodove
-try:
-    import pycountry
-except Exception:
-    pycountry = None
+from hk_podravka import (analytics, archive, assets, attendance_stats, backup, blobstore, countries, db, diagnostics, gallery,
+                         images, imports, maintenance, metrics, profiling, querylog, reports, storage, timetable, training_load, versions,
+                         writer)
+from hk_podravka import sessions as session_picker
+from hk_podravka.seasons import current_season, season_bounds, season_label
 
-# Za grafove u statistici
-import matplotlib.pyplot as plt
+# Teške ovisnosti (pycountry, matplotlib) uvoze se tek kad zatrebaju – vidi
+# hk_podravka/countries.py (samo pri izgradnji indeksa) i new_figure(). Proračun vremena uvoza: bench/import_budget.py
 
 # ==========================
 # KONSTANTE KLUBA I STIL
@@ -47,255 +47,139 @@ KLUB_OIB    = "60911784858"
 KLUB_WEB    = "https://hk-podravka.com"
 KLUB_IBAN   = "HR6923860021100518154"
 
-DB_PATH     = "hk_podravka.db"
-UPLOAD_DIR  = "uploads"
+DB_PATH     = db.DB_PATH
+UPLOAD_DIR  = db.UPLOAD_DIR
+CACHE_DIR   = ".cache"
+COUNTRY_INDEX = os.path.join(CACHE_DIR, "countries.json")
+PROFILE_LOG = os.path.join(CACHE_DIR, "profile.jsonl")   # jedan JSON redak po izvođenju, rotira se
+PROFILE_DIR = os.path.join(CACHE_DIR, "profiles")        # .prof datoteke (cProfile na zahtjev)
+BACKUP_DIR = os.environ.get("HK_PODRAVKA_BACKUPS", backup.BACKUP_DIR)      # isto kao python -m hk_podravka backup
+ARCHIVE_DIR = os.environ.get("HK_PODRAVKA_ARCHIVE", archive.ARCHIVE_DIR)    # arhivirane sezone (python -m hk_podravka archive)
+METRICS_PORT = int(os.environ.get("HK_PODRAVKA_METRICS_PORT", metrics.PORT))   # 0 = bez /metrics
+KEEP_IMAGE_ORIGINALS = False   # False: nakon obrade ostaje samo web verzija fotografije
+LOGO_PATH   = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logo.jpg")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 # ==========================
 # POMOĆNE FUNKCIJE
 # ==========================
 def get_conn():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+    # svaki upit se mjeri (hk_podravka/querylog.py) – vidi ⚙️ Dijagnostika u sidebaru
+    return db.connect(DB_PATH, check_same_thread=False, factory=querylog.InstrumentedConnection)
 
-def init_db():
+# ==========================
+# CACHE UPITA (ključ: verzije tablica iz data_versions)
+# ==========================
+@st.cache_resource
+def metrics_server():
+    """Prometheus /metrics na 127.0.0.1:METRICS_PORT (jednom po procesu; preskače se ako je port zauzet)."""
+    metrics.register_db_gauges(DB_PATH)
+    if not METRICS_PORT:
+        return None
+    try:
+        return metrics.serve(METRICS_PORT)
+    except OSError:
+        return None
+
+
+@st.cache_resource
+def maintenance_scheduler() -> maintenance.Scheduler:
+    """ANALYZE/optimize, incremental_vacuum i WAL checkpoint jednom dnevno u mirno vrijeme (pozadinska dretva)."""
+    return maintenance.Scheduler(DB_PATH).start()
+
+
+@st.cache_resource
+def db_writer() -> writer.Writer:
+    """Jedna dretva pisca za sve sesije: upisi prisustva i rezultata idu kroz red (bez "database is locked")."""
+    return writer.Writer(DB_PATH).start()
+
+
+@st.cache_resource
+def derived_refreshed() -> Dict[str, tuple]:
+    """Verzije ulaznih tablica pri zadnjem osvježavanju izvedenih podataka (po procesu, vidi refresh_derived)."""
+    return {}
+
+
+@st.cache_resource
+def version_watcher() -> versions.VersionWatcher:
+    return versions.VersionWatcher(DB_PATH)
+
+
+def table_versions(*tables: str) -> Tuple[int, ...]:
+    return version_watcher().get(tables)
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _cached_df(sql: str, params: tuple, tables: tuple, versions_key: tuple) -> pd.DataFrame:
+    metrics.CACHE_MISSES.inc(("df",))
     conn = get_conn()
-    cur = conn.cursor()
+    try:
+        return pd.read_sql_query(sql, conn, params=params)
+    finally:
+        conn.close()
 
-    # Osnovni podaci o klubu
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS club_info (
-            id INTEGER PRIMARY KEY CHECK (id = 1),
-            name TEXT, street TEXT, city_zip TEXT,
-            email TEXT, address TEXT, oib TEXT, web TEXT, iban TEXT,
-            president TEXT, secretary TEXT,
-            instagram TEXT, facebook TEXT, tiktok TEXT,
-            created_at TEXT, updated_at TEXT
-        )
-    """)
-
-    # Članovi tijela (predsjedništvo & nadzorni)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS board_members (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            kind TEXT CHECK(kind IN ('board','supervisory')),
-            full_name TEXT, phone TEXT, email TEXT
-        )
-    """)
-
-    # Dokumenti kluba
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS club_docs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            kind TEXT,             -- npr. 'statut', 'pravilnik', 'ostalo'
-            filename TEXT,
-            path TEXT,
-            uploaded_at TEXT
-        )
-    """)
 
-    # Grupe
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS groups (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE
-        )
-    """)
-
-    # Članovi
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS members (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            full_name TEXT,
-            first_name TEXT,
-            last_name TEXT,
-            dob TEXT,
-            gender TEXT CHECK (gender IN ('M','Ž','')),
-            oib TEXT,
-            street TEXT,
-            city TEXT,
-            postal_code TEXT,
-            residence TEXT,
-            athlete_email TEXT,
-            parent_email TEXT,
-            athlete_phone TEXT,
-            parent_phone TEXT,
-            id_card_number TEXT, id_card_issuer TEXT, id_card_valid_until TEXT,
-            passport_number TEXT, passport_issuer TEXT, passport_valid_until TEXT,
-            active_competitor INTEGER DEFAULT 0,
-            veteran INTEGER DEFAULT 0,
-            other_flag INTEGER DEFAULT 0,
-            membership_fee_eur REAL DEFAULT 0,
-            group_id INTEGER,
-            photo_path TEXT,
-            consent_path TEXT,       -- privola
-            application_path TEXT,   -- pristupnica ili dodatni dokument
-            medical_path TEXT,
-            medical_valid_until TEXT,
-            FOREIGN KEY(group_id) REFERENCES groups(id) ON DELETE SET NULL
-        )
-    """)
-    # Backward compatible ALTERs
-    def ensure_column(table: str, col: str, ddl: str):
-        have = cur.execute(f"PRAGMA table_info({table})").fetchall()
-        names = [r[1] for r in have]
-        if col not in names:
-            cur.execute(f"ALTER TABLE {table} ADD COLUMN {col} {ddl}")
-
-    ensure_column("members","first_name","TEXT")
-    ensure_column("members","last_name","TEXT")
-    ensure_column("members","street","TEXT")
-    ensure_column("members","city","TEXT")
-    ensure_column("members","postal_code","TEXT")
-    ensure_column("members","athlete_phone","TEXT")
-    ensure_column("members","parent_phone","TEXT")
-    ensure_column("members","parent_name","TEXT")
-
-    # Treneri
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS coaches (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            full_name TEXT,
-            first_name TEXT,
-            last_name TEXT,
-            dob TEXT,
-            oib TEXT,
-            email TEXT,
-            iban TEXT,
-            photo_path TEXT
-        )
-    """)
-    ensure_column("coaches","first_name","TEXT")
-    ensure_column("coaches","last_name","TEXT")
-
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS coach_docs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            coach_id INTEGER,
-            kind TEXT, filename TEXT, path TEXT, uploaded_at TEXT,
-            FOREIGN KEY(coach_id) REFERENCES coaches(id) ON DELETE CASCADE
-        )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS coach_groups (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            coach_id INTEGER,
-            group_id INTEGER,
-            assigned_at TEXT,
-            FOREIGN KEY(coach_id) REFERENCES coaches(id) ON DELETE CASCADE,
-            FOREIGN KEY(group_id) REFERENCES groups(id) ON DELETE CASCADE
-        )
-    """)
-
-    # Natjecanja
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS competitions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            kind TEXT,          -- kategorija natjecanja
-            custom_kind TEXT,   -- ili podvrsta repre.
-            name TEXT,          -- ime natjecanja
-            date_from TEXT,
-            date_to TEXT,
-            place TEXT,
-            style TEXT,         -- GR, FS, WW, BW, MODIFICIRANO
-            age_group TEXT,     -- POČETNICI, U11, U13, U15, U17, U20, U23, SENIORI
-            country TEXT,       -- puna država
-            country_code TEXT,  -- ISO3
-            team_rank TEXT,
-            club_competitors INTEGER,     -- broj nastupajućih iz kluba
-            total_competitors INTEGER,    -- ukupan broj natjecatelja
-            total_clubs INTEGER,
-            total_countries INTEGER,
-            coaches_text TEXT,
-            notes TEXT,         -- zapažanja trenera (za objave)
-            bulletin_link TEXT,
-            results_link TEXT,
-            gallery_link TEXT,
-            bulletin_file TEXT,
-            results_file TEXT
-        )
-    """)
-    ensure_column("competitions","bulletin_file","TEXT")
-    ensure_column("competitions","results_file","TEXT")
-
-    # Rezultati natjecanja po sportašu
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS competition_results (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            competition_id INTEGER,
-            member_id INTEGER,
-            weight_category TEXT,
-            style TEXT,
-            bouts_total INTEGER,
-            wins INTEGER,
-            losses INTEGER,
-            placement INTEGER,
-            opponent_list TEXT,    -- JSON: [{name,club,win/lose}...]
-            notes TEXT,
-            FOREIGN KEY(competition_id) REFERENCES competitions(id) ON DELETE CASCADE,
-            FOREIGN KEY(member_id) REFERENCES members(id) ON DELETE SET NULL
-        )
-    """)
-
-    # Slike s natjecanja (više datoteka)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS competition_photos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            competition_id INTEGER,
-            filename TEXT, path TEXT, uploaded_at TEXT,
-            FOREIGN KEY(competition_id) REFERENCES competitions(id) ON DELETE CASCADE
-        )
-    """)
-
-    # Prisustvo: treneri (sesije) i članovi (dolazak)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS sessions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            coach_id INTEGER,
-            group_id INTEGER,
-            start_ts TEXT,
-            end_ts TEXT,
-            location TEXT,
-            remark TEXT,
-            FOREIGN KEY(coach_id) REFERENCES coaches(id) ON DELETE SET NULL,
-            FOREIGN KEY(group_id) REFERENCES groups(id) ON DELETE SET NULL
-        )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS attendance (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id INTEGER,
-            member_id INTEGER,
-            present INTEGER DEFAULT 1,
-            minutes INTEGER DEFAULT 0,
-            FOREIGN KEY(session_id) REFERENCES sessions(id) ON DELETE CASCADE,
-            FOREIGN KEY(member_id) REFERENCES members(id) ON DELETE CASCADE
-        )
-    """)
+@st.cache_data(show_spinner=False, max_entries=256)
+def _cached_rows(sql: str, params: tuple, tables: tuple, versions_key: tuple) -> List[tuple]:
+    metrics.CACHE_MISSES.inc(("rows",))
+    conn = get_conn()
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
 
-    # Pripreme reprezentacije
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS camps (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT,
-            place TEXT,
-            coach TEXT,
-            start_date TEXT,
-            end_date TEXT
-        )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS camp_attendance (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            camp_id INTEGER,
-            member_id INTEGER,
-            trainings INTEGER DEFAULT 0,
-            hours REAL DEFAULT 0.0,
-            FOREIGN KEY(camp_id) REFERENCES camps(id) ON DELETE CASCADE,
-            FOREIGN KEY(member_id) REFERENCES members(id) ON DELETE CASCADE
-        )
-    """)
+
+def cached_df(sql: str, params=(), tables=()) -> pd.DataFrame:
+    """DataFrame iz cachea dok se nijedna od `tables` ne promijeni (u bilo kojoj sesiji/procesu)."""
+    tables = tuple(tables)
+    metrics.CACHE_LOOKUPS.inc(("df",))
+    return _cached_df(sql, tuple(params), tables, table_versions(*tables))
+
+
+def cached_rows(sql: str, params=(), tables=()) -> List[tuple]:
+    """Kao cached_df, ali vraća retke (liste za odabir)."""
+    tables = tuple(tables)
+    metrics.CACHE_LOOKUPS.inc(("rows",))
+    return _cached_rows(sql, tuple(params), tables, table_versions(*tables))
+
+
+def refresh_derived(fn: Callable, tables: Tuple[str, ...], *args, key: tuple = ()) -> None:
+    """
+    Izvedene podatke (training_load, dropout_scores, country_code) osvježava
+    dretva pisca, i to samo kad su se `tables` (ili `key`) promijenile od
+    zadnjeg osvježavanja u procesu – ponovno izvođenje stranice ne piše.
+    """
+    done = derived_refreshed()
+    if done.get(fn.__qualname__) == table_versions(*tables) + key:
+        return
+    db_writer().run(fn, *args)
+    done[fn.__qualname__] = table_versions(*tables) + key   # nakon upisa (backfill mijenja competitions)
+
+
+def groups_list() -> List[tuple]:
+    return cached_rows("SELECT id, name FROM groups ORDER BY name", tables=("groups",))
+
+
+def coaches_list() -> List[tuple]:
+    return cached_rows("SELECT id, full_name FROM coaches ORDER BY full_name", tables=("coaches",))
+
+
+def members_list(group_id: Optional[int] = None) -> List[tuple]:
+    if group_id is None:
+        return cached_rows("SELECT id, full_name FROM members ORDER BY full_name", tables=("members",))
+    return cached_rows("SELECT id, full_name FROM members WHERE group_id=? ORDER BY full_name",
+                       (group_id,), tables=("members",))
+
+
+def competitions_list() -> List[tuple]:
+    return cached_rows("SELECT id, name, date_from FROM competitions ORDER BY date_from DESC",
+                       tables=("competitions",))
+
+
+def init_db():
+    conn = get_conn()
+    db.init_schema(conn)
+    cur = conn.cursor()
 
     # Zadani zapis o klubu
     cur.execute("SELECT COUNT(*) FROM club_info WHERE id=1")
@@ -308,6 +192,7 @@ def init_db():
               KLUB_EMAIL, KLUB_ADRESA, KLUB_OIB, KLUB_WEB, KLUB_IBAN,
               "", "", "", "", "", datetime.now().isoformat(), datetime.now().isoformat()))
     conn.commit()
+    maintenance.enable_wal(conn)
     conn.close()
 
 
@@ -362,18 +247,27 @@ def page_header(title: str, subtitle: str = ""):
                 f"<div>{subtitle}</div></div>", unsafe_allow_html=True)
 
 
-def save_upload(file, subdir: str) -> str:
-    """Spremi upload u uploads/subdir i vrati relativnu putanju."""
+def save_upload(file, subdir: str, conn=None) -> str:
+    """Spremi upload u spremište (uploads/blobs) i vrati relativnu putanju."""
     if not file:
         return ""
-    sd = os.path.join(UPLOAD_DIR, subdir)
-    os.makedirs(sd, exist_ok=True)
-    path = os.path.join(sd, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.name}")
-    with open(path, "wb") as f:
-        f.write(file.getbuffer())
-    return path
+    if conn is not None:
+        return blobstore.store(conn, file, UPLOAD_DIR, kind=subdir)
+    own = get_conn()
+    try:
+        path = blobstore.store(own, file, UPLOAD_DIR, kind=subdir)
+        own.commit()
+        return path
+    finally:
+        own.close()
+
+
+def process_images(conn, paths) -> None:
+    """Pošalji nove fotografije na obradu u pozadini (nakon commita)."""
+    images.enqueue(DB_PATH, UPLOAD_DIR, images.image_shas(conn, paths), KEEP_IMAGE_ORIGINALS)
 
 
+@profiling.timed("excel")
 def excel_bytes_from_df(df: pd.DataFrame, sheet_name: str = "Sheet1") -> bytes:
     output = io.BytesIO()
     with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
@@ -412,16 +306,31 @@ def comp_results_template_df() -> pd.DataFrame:
     }])
 
 
-def iso3(country_name: str) -> str:
-    if not country_name:
-        return ""
-    if pycountry is None:
-        return ""
-    try:
-        c = pycountry.countries.lookup(country_name)
-        return getattr(c, "alpha_3", "") or ""
-    except Exception:
-        return ""
+def new_figure():
+    """
+    Matplotlib figura s vlastitim Agg platnom – bez pyplot globalnog stanja.
+    matplotlib se uvozi tek pri prvom grafu.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    return fig
+
+
+@profiling.timed("graf")
+def show_figure(fig) -> None:
+    """Prikaži figuru kao PNG (st.pyplot bi uvezao pyplot)."""
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight", dpi=110)
+    st.image(buf.getvalue())
+
+
+def show_logo(kind: str, target=None, **kwargs) -> None:
+    """Klupski logo s lokalnog diska (vidi hk_podravka/assets.py)."""
+    data = assets.logo_bytes(kind, UPLOAD_DIR, LOGO_PATH, CACHE_DIR)
+    if data:
+        (target or st).image(data, width=assets.LOGO_SIZES[kind] // 2, **kwargs)
 
 
 def mailto_link(address: str, subject: str = "", body: str = "") -> str:
@@ -444,6 +353,7 @@ def whatsapp_link(phone_or_text: str) -> str:
 # ==========================
 # ODJELJAK: KLUB
 # ==========================
+@profiling.timed()
 def section_club():
     conn = get_conn()
     df = pd.read_sql_query("SELECT * FROM club_info WHERE id=1", conn)
@@ -455,10 +365,11 @@ def section_club():
     with st.container():
         c1, c2 = st.columns(2)
         with c1:
-            st.image("https://hk-podravka.com/wp-content/uploads/2021/08/cropped-HK-Podravka-logo.png",
-                     caption=KLUB_NAZIV, use_column_width=True)
+            logo_slot = st.empty()
             logo_upload = st.file_uploader("Učitaj vlastiti logo (opcionalno)", type=["png","jpg","jpeg"])
-            logo_path = save_upload(logo_upload, "logo") if logo_upload else ""
+            if logo_upload:
+                assets.save_logo(logo_upload, UPLOAD_DIR)
+            show_logo("header", logo_slot, caption=KLUB_NAZIV)
 
         with c2:
             st.markdown("**Društvene mreže**")
@@ -482,9 +393,9 @@ def section_club():
         secretary = st.text_input("Tajnik kluba", df.loc[0, "secretary"] if "secretary" in df.columns else "")
 
         st.markdown("**Članovi predsjedništva**")
-        board_df = st.experimental_data_editor(pd.DataFrame(columns=["ime_prezime","telefon","email"]), num_rows=1)
+        board_df = st.data_editor(pd.DataFrame(columns=["ime_prezime","telefon","email"]), num_rows="dynamic", key="board_editor")
         st.markdown("**Nadzorni odbor**")
-        superv_df = st.experimental_data_editor(pd.DataFrame(columns=["ime_prezime","telefon","email"]), num_rows=1)
+        superv_df = st.data_editor(pd.DataFrame(columns=["ime_prezime","telefon","email"]), num_rows="dynamic", key="superv_editor")
 
         st.subheader("Dokumenti kluba")
         d1, d2, d3 = st.columns(3)
@@ -515,7 +426,7 @@ def section_club():
         # Dokumenti
         for label, f in [("statut", statut), ("pravilnik", pravilnik), ("ostalo", doc_ostalo)]:
             if f:
-                p = save_upload(f, "club_docs")
+                p = save_upload(f, "club_docs", conn)
                 conn.execute("INSERT INTO club_docs(kind,filename,path,uploaded_at) VALUES (?,?,?,?)",
                              (label, f.name, p, now))
         conn.commit()
@@ -524,6 +435,23 @@ def section_club():
     # Pregled dokumenata
     doc_df = pd.read_sql_query("SELECT id, kind AS vrsta, filename AS datoteka, uploaded_at AS datum FROM club_docs ORDER BY id DESC", conn)
     st.dataframe(doc_df, use_container_width=True)
+
+    with st.expander("🗄️ Pohrana datoteka (uploads)"):
+        st.caption(f"Datoteke bez ijednog zapisa u bazi (obrisani članovi, natjecanja, zamijenjene slike). "
+                   f"Automatsko čišćenje jednom u {storage.GC_EVERY_HOURS} h.")
+        grace = st.number_input("Briši samo starije od (dana)", min_value=0, value=storage.GRACE_DAYS, step=1)
+        s1, s2 = st.columns(2)
+        if s1.button("Analiziraj zauzeće"):
+            rep = storage.scan(conn, UPLOAD_DIR)
+            rows = [{"kategorija": k, "datoteka": v["files"], "MB": round(v["bytes"] / 1e6, 1),
+                     "bez zapisa": v["orphan_files"], "MB bez zapisa": round(v["orphan_bytes"] / 1e6, 1)}
+                    for k, v in sorted(rep.categories.items())]
+            st.dataframe(pd.DataFrame(rows), use_container_width=True)
+            if rep.missing:
+                st.warning(f"Zapisa čija datoteka nedostaje: {rep.missing}")
+        if s2.button("Obriši datoteke bez zapisa"):
+            n, b = storage.purge(conn, UPLOAD_DIR, int(grace))
+            st.success(f"Obrisano {n} datoteka ({b / 1e6:.1f} MB).")
     conn.close()
 
 
@@ -531,59 +459,130 @@ def section_club():
 # ODJELJAK: ČLANOVI
 # ==========================
 
+@st.cache_data(show_spinner=False)
+def template_bytes(kind: str) -> bytes:
+    """Excel predlošci su stalni – izrađuju se jednom po procesu."""
+    if kind == "clanovi":
+        return excel_bytes_from_df(members_template_df(), "ClanoviPredlozak")
+    return excel_bytes_from_df(comp_results_template_df(), "RezultatiPredlozak")
+
+
+# Podaci odjeljka Članovi: cache po verzijama tablica (vidi cached_df) i
+# današnjem datumu (starost, dani do isteka liječničke).
+def group_names() -> List[str]:
+    return [name for _, name in groups_list()]
+
+
+@profiling.timed("tablica članova")
+def members_table() -> pd.DataFrame:
+    """Popis članova s formatiranim datumima i starošću (godine, dani)."""
+    return _members_table(table_versions("members", "groups"), date.today())
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _members_table(versions_key: tuple, today: date) -> pd.DataFrame:
+    conn = get_conn()
+    try:
+        return reports.members_frame(conn, today)
+    finally:
+        conn.close()
+
+
+def members_excel() -> bytes:
+    return _members_excel(table_versions("members", "groups"), date.today())
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _members_excel(versions_key: tuple, today: date) -> bytes:
+    return excel_bytes_from_df(_members_table(versions_key, today).drop(columns="_med_days"), "Clanovi")
+
+
+def member_results(member_id: int) -> Tuple[pd.DataFrame, Tuple[str, ...]]:
+    """Rezultati člana i iz arhiviranih sezona; drugi element su arhive koje nisu dostupne."""
+    metrics.CACHE_LOOKUPS.inc(("df",))
+    return _member_results(member_id, table_versions("competition_results", "competitions"))
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _member_results(member_id: int, versions_key: tuple) -> Tuple[pd.DataFrame, Tuple[str, ...]]:
+    metrics.CACHE_MISSES.inc(("df",))
+    conn = get_conn()
+    try:
+        with archive.history(conn) as src:
+            rdf = pd.read_sql_query(f"""
+                SELECT c.name AS natjecanje, c.date_from AS datum, cr.weight_category AS kategorija,
+                       cr.style AS stil, cr.bouts_total AS borbi, cr.wins AS pobjede, cr.losses AS porazi, cr.placement AS plasman
+                FROM {src.competition_results} cr
+                JOIN competitions c ON c.id=cr.competition_id
+                WHERE cr.member_id=? ORDER BY c.date_from DESC
+            """, conn, params=(member_id,))
+    finally:
+        conn.close()
+    if not rdf.empty:
+        rdf["datum"] = pd.to_datetime(rdf["datum"]).dt.strftime("%d.%m.%Y.")
+    return rdf, src.skipped
+
+
+def members_changed(message: str = "") -> None:
+    """Nakon upisa ponovno iscrtaj cijeli odjeljak (cache prati verzije tablica)."""
+    if message:
+        st.session_state["members_flash"] = message
+    st.rerun()
+
+
+@profiling.timed()
 def section_members():
     page_header("Članovi", "Unos, uvoz/izvoz, uređivanje, dokumenti i liječničke potvrde")
+    flash = st.session_state.pop("members_flash", "")
+    if flash:
+        st.success(flash)
 
     # Predlošci
     st.download_button("Skini predložak članova (Excel)",
-                       data=excel_bytes_from_df(members_template_df(), "ClanoviPredlozak"),
+                       data=template_bytes("clanovi"),
                        file_name="clanovi_predlozak.xlsx")
 
     st.download_button("Skini predložak rezultata (Excel)",
-                       data=excel_bytes_from_df(comp_results_template_df(), "RezultatiPredlozak"),
+                       data=template_bytes("rezultati"),
                        file_name="rezultati_predlozak.xlsx")
 
-    conn = get_conn()
+    # Svaki dio je fragment: interakcija unutar njega ponovno izvodi samo taj dio.
+    members_import_fragment()
+    st.markdown("---")
+    st.subheader("Upis novog člana")
+    member_form_fragment()
+    st.markdown("---")
+    st.subheader("Popis članova")
+    members_list_fragment()
+    st.markdown("---")
+    st.subheader("Uredi / obriši člana, kontakt i rezultati")
+    member_edit_fragment()
 
+
+@st.fragment
+def members_import_fragment():
     # Upload članova iz Excela
     upl = st.file_uploader("Učitaj članove iz Excel tablice (po predlošku)", type=["xlsx"])
-    if upl:
+    if upl and st.session_state.get("members_imported") != upl.file_id:
+        conn = get_conn()
         try:
-            df = pd.read_excel(upl).fillna("")
-            for _, r in df.iterrows():
-                gid = None
-                if r.get("grupa",""):
-                    g = conn.execute("SELECT id FROM groups WHERE name=?", (r["grupa"],)).fetchone()
-                    if g: gid = g[0]
-                full_name = r.get("ime_prezime","") or (r.get("ime","")+" "+r.get("prezime","")).strip()
-                conn.execute("""INSERT INTO members
-                    (full_name,first_name,last_name,dob,gender,oib,street,city,postal_code,residence,
-                     athlete_email,parent_email,athlete_phone,parent_phone,parent_name,
-                     id_card_number,id_card_issuer,id_card_valid_until,
-                     passport_number,passport_issuer,passport_valid_until,
-                     active_competitor,veteran,other_flag,membership_fee_eur,group_id)
-                    VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)""",
-                    (full_name, r.get("ime",""), r.get("prezime",""), r.get("datum_rođenja",""), r.get("spol(M/Ž)",""),
-                     r.get("oib",""), r.get("ulica",""), r.get("grad",""), r.get("poštanski_broj",""),
-                     f"{r.get('ulica','')}, {r.get('grad','')} {r.get('poštanski_broj','')}",
-                     r.get("email_sportaša",""), r.get("email_roditelja",""),
-                     r.get("telefon_sportaša",""), r.get("telefon_roditelja",""), r.get("roditelj_ime_prezime",""),
-                     r.get("osobna_broj",""), r.get("osobna_izdavatelj",""), r.get("osobna_vrijedi_do",""),
-                     r.get("putovnica_broj",""), r.get("putovnica_izdavatelj",""), r.get("putovnica_vrijedi_do",""),
-                     int(r.get("aktivni_natjecatelj(0/1)",0) or 0),
-                     int(r.get("veteran(0/1)",0) or 0),
-                     int(r.get("ostalo(0/1)",0) or 0),
-                     float(r.get("članarina_EUR", 0) or 0), gid))
-            conn.commit()
-            st.success("Članovi su uvezeni.")
+            # jedna transakcija: neispravna datoteka ne ostavlja pola uvoza
+            imports.import_members(conn, imports.read_rows(upl), batch_size=None)
         except Exception as e:
             st.error(f"Greška pri uvozu: {e}")
+            return
+        finally:
+            conn.close()
+        # isti file ostaje u uploaderu – ne uvozi ga ponovno na sljedećem izvođenju
+        st.session_state["members_imported"] = upl.file_id
+        members_changed("Članovi su uvezeni.")
 
-    st.markdown("---")
-    st.subheader("Upis novog člana")
+
+@st.fragment
+def member_form_fragment():
     with st.form("new_member"):
         # Grupa – istaknuta na početku
-        groups = [r[0] for r in conn.execute("SELECT name FROM groups ORDER BY name").fetchall()]
+        groups = group_names()
         group_name = st.selectbox("Grupa (odaberi)", [""] + groups)
 
         c1, c2 = st.columns(2)
@@ -658,14 +657,15 @@ def section_members():
         submit_member = st.form_submit_button("Spremi člana")
 
     if submit_member:
+        conn = get_conn()
         gid = None
         if group_name:
             r = conn.execute("SELECT id FROM groups WHERE name=?", (group_name,)).fetchone()
             if r: gid = r[0]
-        photo_p = save_upload(photo, "members/photos")
-        consent_p = save_upload(consent, "members/consent")
-        application_p = save_upload(application, "members/application")
-        medical_p = save_upload(medical, "members/medical")
+        photo_p = save_upload(photo, "members/photos", conn)
+        consent_p = save_upload(consent, "members/consent", conn)
+        application_p = save_upload(application, "members/application", conn)
+        medical_p = save_upload(medical, "members/medical", conn)
 
         conn.execute("""INSERT INTO members
             (full_name,first_name,last_name,dob,gender,oib,street,city,postal_code,residence,
@@ -683,187 +683,137 @@ def section_members():
              int(active_competitor), int(veteran), int(other_flag), float(fee),
              gid, photo_p, consent_p, application_p, medical_p, str(medical_valid) if medical_valid else ""))
         conn.commit()
-        st.success("Član je spremljen.")
+        process_images(conn, [photo_p])
+        conn.close()
+        members_changed("Član je spremljen.")
 
-    # Popis članova – format datuma dd.mm.yyyy, dob (godine,dani), R.br. od 1
-    st.markdown("---")
-    st.subheader("Popis članova")
-
-    def fmt_date(s):
-        if not s: return ""
-        try:
-            d = pd.to_datetime(s).date()
-            return d.strftime("%d.%m.%Y.")
-        except Exception:
-            return str(s)
-
-    mdf = pd.read_sql_query("""
-        SELECT m.id, m.full_name AS ime_prezime, m.first_name AS ime, m.last_name AS prezime,
-               m.gender AS spol, m.oib, m.street AS ulica, m.city AS grad, m.postal_code AS poštanski_broj,
-               m.athlete_email, m.parent_email, m.athlete_phone, m.parent_phone, m.parent_name,
-               m.active_competitor AS aktivni, m.veteran,
-               m.membership_fee_eur AS članarina, m.medical_valid_until AS liječnička_do, m.dob,
-               g.name AS grupa
-        FROM members m LEFT JOIN groups g ON m.group_id=g.id
-        ORDER BY m.full_name
-    """, conn)
 
-    if not mdf.empty:
-        # izračun starosti kao tekst
-        ages = []
-        for _, r in mdf.iterrows():
-            if r["dob"]:
-                try:
-                    dd = pd.to_datetime(r["dob"]).date()
-                    delta = date.today() - dd
-                    years = delta.days // 365
-                    days_rem = delta.days - years * 365
-                    ages.append(f"{years} godina, {days_rem} dana")
-                except Exception:
-                    ages.append("")
-            else:
-                ages.append("")
-        mdf.insert(0, "R.br.", range(1, len(mdf) + 1))
-        mdf["dob"] = mdf["dob"].apply(fmt_date)
-        mdf["liječnička_do"] = mdf["liječnička_do"].apply(fmt_date)
-        mdf.insert(3, "starost", ages)
-
-    st.dataframe(mdf, use_container_width=True)
+@st.fragment
+def members_list_fragment():
+    # Popis članova – format datuma dd.mm.yyyy, dob (godine,dani), R.br. od 1
+    mdf = members_table()
+    st.dataframe(mdf.drop(columns="_med_days", errors="ignore"), use_container_width=True)
 
     # Export članova
     st.download_button("Skini sve članove (Excel)",
-                       data=excel_bytes_from_df(mdf, "Clanovi"),
+                       data=members_excel() if not mdf.empty else excel_bytes_from_df(mdf, "Clanovi"),
                        file_name="clanovi.xlsx")
 
     # Upozorenja o liječničkoj potvrdi
     if not mdf.empty:
-        today = date.today()
-        warn = []
-        for _, row in mdf.iterrows():
-            if row["liječnička_do"]:
-                try:
-                    exp = datetime.strptime(row["liječnička_do"], "%d.%m.%Y.").date()
-                except Exception:
-                    try:
-                        exp = pd.to_datetime(row["liječnička_do"]).date()
-                    except Exception:
-                        continue
-                days = (exp - today).days
-                if days <= 14:
-                    warn.append((row["ime_prezime"], days))
-        if warn:
+        warn = mdf[mdf["_med_days"] <= 14]
+        if not warn.empty:
             st.markdown("<div class='hk-danger'><b>Upozorenje:</b> Slijedećim članovima istječe liječnička u roku 14 dana:</div>", unsafe_allow_html=True)
-            for nm, d in warn:
-                st.write(f"- {nm}: {d} dana")
+            for nm, d in zip(warn["ime_prezime"], warn["_med_days"]):
+                st.write(f"- {nm}: {int(d)} dana")
 
-    # Uređivanje/brisanje + kontakti i rezultati ostaju kao u prethodnoj verziji
-    st.markdown("---")
-    st.subheader("Uredi / obriši člana, kontakt i rezultati")
-    ids = [r[0] for r in conn.execute("SELECT id FROM members ORDER BY full_name").fetchall()]
-    if ids:
-        sel_id = st.selectbox("Odaberi ID člana", ids)
-        row = conn.execute("SELECT * FROM members WHERE id=?", (int(sel_id),)).fetchone()
-        cols = [c[1] for c in conn.execute("PRAGMA table_info(members)")]
-        data = dict(zip(cols, row))
-
-        with st.form("edit_member"):
-            # Grupa
-            groups = [r[0] for r in conn.execute("SELECT name FROM groups ORDER BY name").fetchall()]
-            current_group = conn.execute("SELECT name FROM groups WHERE id=?", (data.get("group_id"),)).fetchone()
-            gsel = st.selectbox("Grupa", [""] + groups, index=([""]+groups).index(current_group[0]) if current_group else 0)
-
-            e1, e2 = st.columns(2)
-            data["first_name"] = e1.text_input("Ime", data.get("first_name",""))
-            data["last_name"]  = e1.text_input("Prezime", data.get("last_name",""))
-            data["gender"]     = e1.selectbox("Spol", ["","M","Ž"], index=["","M","Ž"].index(data.get("gender","") or ""))
-            data["oib"]        = e1.text_input("OIB", data.get("oib",""))
-            data["street"]     = e1.text_input("Ulica i broj", data.get("street",""))
-            data["city"]       = e1.text_input("Grad", data.get("city",""))
-            data["postal_code"]= e1.text_input("Poštanski broj", data.get("postal_code",""))
-
-            data["parent_name"]  = e2.text_input("Ime i prezime roditelja/skrbnika", data.get("parent_name",""))
-            data["athlete_email"] = e2.text_input("E-mail sportaša", data.get("athlete_email",""))
-            data["parent_email"]  = e2.text_input("E-mail roditelja", data.get("parent_email",""))
-            data["athlete_phone"] = e2.text_input("Telefon sportaša", data.get("athlete_phone",""))
-            data["parent_phone"]  = e2.text_input("Telefon roditelja", data.get("parent_phone",""))
-            data["membership_fee_eur"] = e2.number_input("Članarina (EUR)", min_value=0.0, step=5.0, value=float(data.get("membership_fee_eur") or 0))
-
-            ch1, ch2, ch3 = st.columns(3)
-            data["active_competitor"] = int(ch1.checkbox("Aktivni", bool(data.get("active_competitor"))))
-            data["veteran"]           = int(ch2.checkbox("Veteran", bool(data.get("veteran"))))
-            data["other_flag"]        = int(ch3.checkbox("Ostalo", bool(data.get("other_flag"))))
-
-            # Liječnička datum s countdown prikazom
-            med1, med2 = st.columns([2,1])
-            med_valid = med1.date_input("Liječnička vrijedi do",
-                                        value=pd.to_datetime(data.get("medical_valid_until")).date() if data.get("medical_valid_until") else None)
-            if med_valid:
-                days_left = (med_valid - date.today()).days
-                style = "color:#333;"
-                if days_left <= 14:
-                    style = "color:#b00020; font-weight:600;"
-                med2.markdown(f"<div style='{style}'>Preostalo: {days_left} dana</div>", unsafe_allow_html=True)
-
-            if st.form_submit_button("Spremi izmjene"):
-                full_name = f"{data['first_name']} {data['last_name']}".strip() or data.get("full_name","")
-                data["full_name"] = full_name
-                gid = None
-                if gsel:
-                    r = conn.execute("SELECT id FROM groups WHERE name=?", (gsel,)).fetchone()
-                    gid = r[0] if r else None
-                conn.execute("""UPDATE members SET
-                    full_name=?, first_name=?, last_name=?, gender=?, oib=?, street=?, city=?, postal_code=?,
-                    parent_name=?, athlete_email=?, parent_email=?, athlete_phone=?, parent_phone=?,
-                    membership_fee_eur=?, active_competitor=?, veteran=?, other_flag=?, medical_valid_until=?, group_id=?
-                    WHERE id=?""",
-                    (data["full_name"], data["first_name"], data["last_name"], data["gender"], data["oib"],
-                     data["street"], data["city"], data["postal_code"],
-                     data["parent_name"], data["athlete_email"], data["parent_email"], data["athlete_phone"], data["parent_phone"],
-                     float(data["membership_fee_eur"]), int(data["active_competitor"]), int(data["veteran"]), int(data["other_flag"]),
-                     str(med_valid) if med_valid else "", gid, int(sel_id)))
-                conn.commit()
-                st.success("Izmjene spremljene.")
-
-        # Kontakti + rezultati kao prije
-        subject = "Obavijest HK Podravka"
-        email_row = conn.execute("SELECT athlete_email, parent_email, athlete_phone, parent_phone FROM members WHERE id=?", (int(sel_id),)).fetchone()
-        a_email, p_email, a_phone, p_phone = email_row if email_row else ("","","","")
-        st.markdown(
-            f"[📧 Sportaš]({mailto_link(a_email, subject)}) &nbsp; "
-            f"[📧 Roditelj]({mailto_link(p_email, subject)}) &nbsp; "
-            f"[🟢 WhatsApp sportaš]({whatsapp_link(a_phone)}) &nbsp; "
-            f"[🟢 WhatsApp roditelj]({whatsapp_link(p_phone)})",
-            unsafe_allow_html=True
-        )
-
-        # Rezultati člana
-        st.markdown("**Rezultati ovog člana:**")
-        rdf = pd.read_sql_query("""
-            SELECT c.name AS natjecanje, c.date_from AS datum, cr.weight_category AS kategorija,
-                   cr.style AS stil, cr.bouts_total AS borbi, cr.wins AS pobjede, cr.losses AS porazi, cr.placement AS plasman
-            FROM competition_results cr
-            JOIN competitions c ON c.id=cr.competition_id
-            WHERE cr.member_id=? ORDER BY c.date_from DESC
-        """, conn, params=(int(sel_id),))
-        # formatiraj datum
-        if not rdf.empty:
-            rdf["datum"] = pd.to_datetime(rdf["datum"]).dt.strftime("%d.%m.%Y.")
-        st.dataframe(rdf, use_container_width=True)
 
-        colbtn1, colbtn2 = st.columns(2)
-        if colbtn1.button("Obriši ovog člana"):
-            conn.execute("DELETE FROM members WHERE id=?", (int(sel_id),))
-            conn.commit()
-            st.success("Član obrisan.")
-    else:
+@st.fragment
+def member_edit_fragment():
+    # Uređivanje/brisanje + kontakti i rezultati ostaju kao u prethodnoj verziji
+    mdf = members_table()
+    if mdf.empty:
         st.info("Nema članova u bazi.")
+        return
+    names = dict(zip(mdf["id"], mdf["ime_prezime"]))
+    sel_id = st.selectbox("Odaberi ID člana", list(names), format_func=lambda i: f"{i} – {names[i]}")
 
+    conn = get_conn()
+    row = conn.execute("SELECT * FROM members WHERE id=?", (int(sel_id),)).fetchone()
+    cols = [c[1] for c in conn.execute("PRAGMA table_info(members)")]
+    data = dict(zip(cols, row))
+    contact = (data.get("athlete_email"), data.get("parent_email"), data.get("athlete_phone"), data.get("parent_phone"))
+
+    with st.form("edit_member"):
+        # Grupa
+        groups = group_names()
+        current_group = dict(groups_list()).get(data.get("group_id"))
+        gsel = st.selectbox("Grupa", [""] + groups, index=([""]+groups).index(current_group) if current_group else 0)
+
+        e1, e2 = st.columns(2)
+        data["first_name"] = e1.text_input("Ime", data.get("first_name",""))
+        data["last_name"]  = e1.text_input("Prezime", data.get("last_name",""))
+        data["gender"]     = e1.selectbox("Spol", ["","M","Ž"], index=["","M","Ž"].index(data.get("gender","") or ""))
+        data["oib"]        = e1.text_input("OIB", data.get("oib",""))
+        data["street"]     = e1.text_input("Ulica i broj", data.get("street",""))
+        data["city"]       = e1.text_input("Grad", data.get("city",""))
+        data["postal_code"]= e1.text_input("Poštanski broj", data.get("postal_code",""))
+
+        data["parent_name"]  = e2.text_input("Ime i prezime roditelja/skrbnika", data.get("parent_name",""))
+        data["athlete_email"] = e2.text_input("E-mail sportaša", data.get("athlete_email",""))
+        data["parent_email"]  = e2.text_input("E-mail roditelja", data.get("parent_email",""))
+        data["athlete_phone"] = e2.text_input("Telefon sportaša", data.get("athlete_phone",""))
+        data["parent_phone"]  = e2.text_input("Telefon roditelja", data.get("parent_phone",""))
+        data["membership_fee_eur"] = e2.number_input("Članarina (EUR)", min_value=0.0, step=5.0, value=float(data.get("membership_fee_eur") or 0))
+
+        ch1, ch2, ch3 = st.columns(3)
+        data["active_competitor"] = int(ch1.checkbox("Aktivni", bool(data.get("active_competitor"))))
+        data["veteran"]           = int(ch2.checkbox("Veteran", bool(data.get("veteran"))))
+        data["other_flag"]        = int(ch3.checkbox("Ostalo", bool(data.get("other_flag"))))
+
+        # Liječnička datum s countdown prikazom
+        med1, med2 = st.columns([2,1])
+        med_valid = med1.date_input("Liječnička vrijedi do",
+                                    value=pd.to_datetime(data.get("medical_valid_until")).date() if data.get("medical_valid_until") else None)
+        if med_valid:
+            days_left = (med_valid - date.today()).days
+            style = "color:#333;"
+            if days_left <= 14:
+                style = "color:#b00020; font-weight:600;"
+            med2.markdown(f"<div style='{style}'>Preostalo: {days_left} dana</div>", unsafe_allow_html=True)
+
+        if st.form_submit_button("Spremi izmjene"):
+            full_name = f"{data['first_name']} {data['last_name']}".strip() or data.get("full_name","")
+            data["full_name"] = full_name
+            gid = None
+            if gsel:
+                r = conn.execute("SELECT id FROM groups WHERE name=?", (gsel,)).fetchone()
+                gid = r[0] if r else None
+            conn.execute("""UPDATE members SET
+                full_name=?, first_name=?, last_name=?, gender=?, oib=?, street=?, city=?, postal_code=?,
+                parent_name=?, athlete_email=?, parent_email=?, athlete_phone=?, parent_phone=?,
+                membership_fee_eur=?, active_competitor=?, veteran=?, other_flag=?, medical_valid_until=?, group_id=?
+                WHERE id=?""",
+                (data["full_name"], data["first_name"], data["last_name"], data["gender"], data["oib"],
+                 data["street"], data["city"], data["postal_code"],
+                 data["parent_name"], data["athlete_email"], data["parent_email"], data["athlete_phone"], data["parent_phone"],
+                 float(data["membership_fee_eur"]), int(data["active_competitor"]), int(data["veteran"]), int(data["other_flag"]),
+                 str(med_valid) if med_valid else "", gid, int(sel_id)))
+            conn.commit()
+            conn.close()
+            members_changed("Izmjene spremljene.")
+
+    # Kontakti + rezultati kao prije
+    subject = "Obavijest HK Podravka"
+    a_email, p_email, a_phone, p_phone = contact
+    st.markdown(
+        f"[📧 Sportaš]({mailto_link(a_email, subject)}) &nbsp; "
+        f"[📧 Roditelj]({mailto_link(p_email, subject)}) &nbsp; "
+        f"[🟢 WhatsApp sportaš]({whatsapp_link(a_phone)}) &nbsp; "
+        f"[🟢 WhatsApp roditelj]({whatsapp_link(p_phone)})",
+        unsafe_allow_html=True
+    )
+
+    # Rezultati člana
+    st.markdown("**Rezultati ovog člana:**")
+    rdf, skipped = member_results(int(sel_id))
+    if skipped:
+        st.warning(f"Arhive nisu dostupne (rezultati tih sezona nisu prikazani): {', '.join(skipped)}")
+    st.dataframe(rdf, use_container_width=True)
+
+    colbtn1, colbtn2 = st.columns(2)
+    if colbtn1.button("Obriši ovog člana"):
+        conn.execute("DELETE FROM members WHERE id=?", (int(sel_id),))
+        conn.commit()
+        conn.close()
+        members_changed("Član obrisan.")
     conn.close()
 
 
 # ==========================
 # ODJELJAK: TRENERI
 # ==========================
+@profiling.timed()
 def section_coaches():
     page_header("Treneri", "Upis, uređivanje, dokumenti i Excel import/export")
 
@@ -878,13 +828,13 @@ def section_coaches():
         email = c2.text_input("E-mail")
         iban = c2.text_input("IBAN račun")
         # Grupa pri upisu
-        groups = [r[0] for r in conn.execute("SELECT name FROM groups ORDER BY name").fetchall()]
+        groups = group_names()
         group_name = c2.selectbox("Grupa", [""] + groups)
         photo = st.file_uploader("Slika (jpg/png)", type=["jpg","jpeg","png"])
         submit = st.form_submit_button("Spremi trenera")
 
     if submit:
-        photo_p = save_upload(photo, "coaches/photos")
+        photo_p = save_upload(photo, "coaches/photos", conn)
         conn.execute("""INSERT INTO coaches (full_name,first_name,last_name,dob,oib,email,iban,photo_path)
                         VALUES (?,?,?,?,?,?,?,?)""",
                      (full_name, first_name, last_name, str(dob) if dob else "", oib, email, iban, photo_p))
@@ -895,6 +845,7 @@ def section_coaches():
                 conn.execute("INSERT INTO coach_groups (coach_id,group_id,assigned_at) VALUES (?,?,?)",
                              (cid, gid[0], datetime.now().isoformat()))
         conn.commit()
+        process_images(conn, [photo_p])
         st.success("Trener spremljen.")
 
     # Uređivanje/brisanje trenera
@@ -927,8 +878,8 @@ def section_coaches():
 
     # Povezivanje s grupama (dodatno)
     st.subheader("Dodjela trenera u grupe")
-    coaches = conn.execute("SELECT id, full_name FROM coaches").fetchall()
-    groups = conn.execute("SELECT id, name FROM groups").fetchall()
+    coaches = coaches_list()
+    groups = groups_list()
     if coaches and groups:
         cc = st.selectbox("Trener", [f"{c[0]} – {c[1]}" for c in coaches])
         gg = st.selectbox("Grupa", [f"{g[0]} – {g[1]}" for g in groups])
@@ -951,7 +902,7 @@ def section_coaches():
             cid = int(csel.split(" – ")[0])
             for f, k in [(doc1, "ugovor"), (doc2, "ostalo")]:
                 if f:
-                    p = save_upload(f, "coaches/docs")
+                    p = save_upload(f, "coaches/docs", conn)
                     conn.execute("INSERT INTO coach_docs (coach_id,kind,filename,path,uploaded_at) VALUES (?,?,?,?,?)",
                                  (cid, k, f.name, p, datetime.now().isoformat()))
             conn.commit()
@@ -962,6 +913,7 @@ def section_coaches():
 # ==========================
 # ODJELJAK: NATJECANJA I REZULTATI
 # ==========================
+@profiling.timed()
 def section_competitions():
     page_header("Natjecanja i rezultati", "Unos natjecanja, datoteka, rezultata i pretraga")
 
@@ -976,6 +928,7 @@ def section_competitions():
     AGES = ["POČETNICI","U11","U13","U15","U17","U20","U23","SENIORI"]
 
     conn = get_conn()
+    refresh_derived(countries.backfill_codes, ("competitions",), COUNTRY_INDEX)
 
     with st.form("comp_form"):
         kind = st.selectbox("Vrsta natjecanja", KINDS)
@@ -986,8 +939,9 @@ def section_competitions():
         date_from = c1.date_input("Datum od", value=date.today())
         date_to = c2.date_input("Datum do (ako 1 dan, ostavi isti)", value=date.today())
         place = st.text_input("Mjesto")
-        country = st.text_input("Država (puni naziv)")
-        auto_iso = iso3(country)
+        cc1, cc2 = st.columns(2)
+        country_sel = cc1.selectbox("Država", [""] + countries.options(COUNTRY_INDEX))
+        country_txt = cc2.text_input("…ili upiši (ako nije na popisu)")
         style = st.selectbox("Hrvački stil", STYLES)
         age_group = st.selectbox("Uzrast", AGES)
         c3, c4, c5 = st.columns(3)
@@ -1015,8 +969,13 @@ def section_competitions():
         submit = st.form_submit_button("Spremi natjecanje")
 
     if submit:
-        bull_p = save_upload(bulletin_file, "competitions/docs") if bulletin_file else ""
-        res_p = save_upload(results_file, "competitions/docs") if results_file else ""
+        country = country_txt.strip() or country_sel
+        found = countries.resolve(country, COUNTRY_INDEX)
+        if found:
+            country = found.name_hr
+        auto_iso = found.iso3 if found else ""
+        bull_p = save_upload(bulletin_file, "competitions/docs", conn) if bulletin_file else ""
+        res_p = save_upload(results_file, "competitions/docs", conn) if results_file else ""
         conn.execute("""INSERT INTO competitions
             (kind,custom_kind,name,date_from,date_to,place,style,age_group,country,country_code,
              team_rank,club_competitors,total_competitors,total_clubs,total_countries,
@@ -1027,18 +986,21 @@ def section_competitions():
              team_rank, int(club_competitors), int(total_competitors), int(total_clubs), int(total_countries),
              coach_text, notes, bulletin_link, results_link, gallery_link, bull_p, res_p))
         comp_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        photo_paths = []
         for ph in photos or []:
-            p = save_upload(ph, "competitions/photos")
+            p = save_upload(ph, "competitions/photos", conn)
+            photo_paths.append(p)
             conn.execute("INSERT INTO competition_photos (competition_id,filename,path,uploaded_at) VALUES (?,?,?,?)",
                          (comp_id, ph.name, p, datetime.now().isoformat()))
         conn.commit()
-        st.success("Natjecanje spremljeno.")
+        process_images(conn, photo_paths)
+        st.success("Natjecanje spremljeno." + (f" {len(photo_paths)} slika se obrađuje u pozadini." if photo_paths else ""))
 
     # Dodavanje rezultata po sportašu
     st.markdown("---")
     st.subheader("Rezultati sportaša")
-    comps = conn.execute("SELECT id, name, date_from FROM competitions ORDER BY date_from DESC").fetchall()
-    members = conn.execute("SELECT id, full_name FROM members ORDER BY full_name").fetchall()
+    comps = competitions_list()
+    members = members_list()
     STYLES = ["GR","FS","WW","BW","MODIFICIRANO"]
     if comps and members:
         comp_sel = st.selectbox("Natjecanje", [f"{c[0]} – {c[1]} ({c[2]})" for c in comps])
@@ -1057,16 +1019,14 @@ def section_competitions():
             sres = st.form_submit_button("Spremi rezultate")
         if sres:
             cid = int(comp_sel.split(" – ")[0])
-            for idx, ms in enumerate(mem_sel):
-                mid = int(ms.split(" – ")[0])
-                conn.execute("""INSERT INTO competition_results
-                                (competition_id,member_id,weight_category,style,bouts_total,wins,losses,placement,opponent_list,notes)
-                                VALUES (?,?,?,?,?,?,?,?,?,?)""",
-                             (cid, mid, st.session_state[f"k_{idx}"], st.session_state[f"s_{idx}"],
-                              int(st.session_state[f"bt_{idx}"]), int(st.session_state[f"w_{idx}"]),
-                              int(st.session_state[f"l_{idx}"]), int(st.session_state[f"p_{idx}"]),
-                              st.session_state[f"o_{idx}"], st.session_state[f"n_{idx}"]))
-            conn.commit()
+            rows = [(cid, int(ms.split(" – ")[0]), st.session_state[f"k_{idx}"], st.session_state[f"s_{idx}"],
+                     int(st.session_state[f"bt_{idx}"]), int(st.session_state[f"w_{idx}"]),
+                     int(st.session_state[f"l_{idx}"]), int(st.session_state[f"p_{idx}"]),
+                     st.session_state[f"o_{idx}"], st.session_state[f"n_{idx}"])
+                    for idx, ms in enumerate(mem_sel)]
+            db_writer().executemany("""INSERT INTO competition_results
+                                       (competition_id,member_id,weight_category,style,bouts_total,wins,losses,placement,opponent_list,notes)
+                                       VALUES (?,?,?,?,?,?,?,?,?,?)""", rows)
             st.success("Rezultati spremljeni.")
     else:
         st.info("Za unos rezultata potreban je barem jedan član i jedno natjecanje.")
@@ -1075,47 +1035,18 @@ def section_competitions():
     upl = st.file_uploader("Učitaj rezultate (Excel po predlošku)", type=["xlsx"], key="upl_res")
     if upl:
         try:
-            df = pd.read_excel(upl).fillna("")
-            for _, r in df.iterrows():
-                cid = int(r.get("natjecanje_id","") or 0)
-                # pokušaj naći člana po imenu
-                mrow = conn.execute("SELECT id FROM members WHERE full_name=?", (r.get("clan(ime_prezime)",""),)).fetchone()
-                mid = mrow[0] if mrow else None
-                if cid and mid:
-                    conn.execute("""INSERT INTO competition_results
-                                    (competition_id,member_id,weight_category,style,bouts_total,wins,losses,placement,opponent_list,notes)
-                                    VALUES (?,?,?,?,?,?,?,?,?,?)""",
-                                 (cid, mid, r.get("kategorija",""), r.get("stil",""),
-                                  int(r.get("ukupno_borbi",0) or 0), int(r.get("pobjede",0) or 0),
-                                  int(r.get("porazi",0) or 0), int(r.get("plasman(1-100)",0) or 0),
-                                  str(r.get("protivnici(JSON)","")), r.get("napomena","")))
-            conn.commit()
-            st.success("Rezultati uvezeni.")
+            n, skipped = imports.import_results(conn, imports.read_rows(upl), batch_size=None)
+            st.success(f"Rezultati uvezeni: {n}." + (f" Preskočeno (nepoznat član/natjecanje): {skipped}." if skipped else ""))
         except Exception as e:
             st.error(f"Greška pri uvozu: {e}")
     # Export svih rezultata
-    
-    res_all = pd.read_sql_query("""        SELECT cr.id, c.name AS natjecanje, c.date_from AS datum, m.full_name AS sportaš,
-               cr.weight_category AS kategorija, cr.style AS stil,
-               cr.bouts_total AS borbi, cr.wins AS pobjede, cr.losses AS porazi, cr.placement AS plasman
-        FROM competition_results cr
-        JOIN competitions c ON c.id=cr.competition_id
-        LEFT JOIN members m ON m.id=cr.member_id
-        ORDER BY c.date_from DESC
-    """, conn)
-    # formatiraj datum i redni broj za prikaz i export
-    if not res_all.empty:
-        try:
-            res_all['datum'] = pd.to_datetime(res_all['datum']).dt.strftime('%d.%m.%Y.')
-        except Exception:
-            pass
-        res_all.insert(0, 'R.br.', range(1, len(res_all)+1))
+    with archive.history(conn) as src:
+        res_all = reports.results_frame(conn, src)
+    if src.skipped:
+        st.warning(f"Arhive nisu dostupne (bez njih u izvozu): {', '.join(src.skipped)}")
     st.download_button("Skini sve rezultate (Excel)",
                        data=excel_bytes_from_df(res_all, "Rezultati"),
                        file_name="rezultati.xlsx")
-    "Skini sve rezultate (Excel)",
-                       data=excel_bytes_from_df(res_all, "Rezultati"),
-                       file_name="rezultati.xlsx")
 
     # Pretraga i pregled natjecanja
     st.markdown("---")
@@ -1163,17 +1094,81 @@ def section_competitions():
     cdf.insert(0, 'R.br.', range(1, len(cdf)+1))
     st.dataframe(cdf, use_container_width=True)
 
+    competition_gallery(conn)
     conn.close()
 
 
+def competition_gallery(conn):
+    """Galerija: sličice stranicu po stranicu, puna slika tek na klik."""
+    st.markdown("---")
+    st.subheader("Galerija")
+    seasons = set()
+    for (d,) in cached_rows("SELECT DISTINCT date_from FROM competitions WHERE COALESCE(date_from,'')<>''",
+                            tables=("competitions",)):
+        try:
+            seasons.add(season_label(date.fromisoformat(d[:10])))
+        except ValueError:
+            pass
+    seasons = sorted(seasons | {current_season()}, reverse=True)
+    g1, g2 = st.columns(2)
+    season_sel = g1.selectbox("Sezona", seasons, key="gal_season")
+    bounds = season_bounds(season_sel)
+    comps = gallery.competitions_with_photos(conn, bounds)
+    comp_opts = ["Sva natjecanja u sezoni"] + [f"{c[1] or 'Natjecanje'} ({c[2]}) · {c[3]} slika" for c in comps]
+    comp_idx = g2.selectbox("Natjecanje", range(len(comp_opts)), format_func=lambda i: comp_opts[i], key="gal_comp")
+    comp_id = comps[comp_idx - 1][0] if comp_idx else None
+
+    # promjena filtera vraća na prvu stranicu
+    if st.session_state.get("gal_filter") != (season_sel, comp_id):
+        st.session_state["gal_filter"] = (season_sel, comp_id)
+        st.session_state["gal_pages"] = [None]
+        st.session_state["gal_full"] = None
+    pages = st.session_state["gal_pages"]
+    photos, nxt = gallery.photo_page(conn, comp_id, None if comp_id else bounds, pages[-1])
+
+    full = st.session_state.get("gal_full")
+    if full and os.path.exists(full[0]):
+        st.image(full[0], caption=full[1], output_format="JPEG")
+        if st.button("Zatvori sliku", key="gal_close"):
+            st.session_state["gal_full"] = None
+            st.rerun()
+
+    if not photos:
+        st.info("Nema fotografija za odabrano razdoblje.")
+    cols = st.columns(4)
+    for i, ph in enumerate(photos):
+        with cols[i % 4]:
+            if ph.thumb_path and os.path.exists(ph.thumb_path):
+                st.image(ph.thumb_path, output_format="JPEG")
+            else:
+                st.caption("⏳ sličica nije spremna")
+            if st.button(f"🔍 {ph.filename or ph.id}", key=f"gal_open_{ph.id}"):
+                st.session_state["gal_full"] = (ph.web_path or ph.path, f"{ph.competition or ''} – {ph.filename or ''}")
+                st.rerun()
+
+    n1, n2, n3 = st.columns(3)
+    if len(pages) > 1 and n1.button("← Novije", key="gal_prev"):
+        pages.pop()
+        st.rerun()
+    n2.caption(f"Stranica {len(pages)}")
+    if nxt and n3.button("Starije →", key="gal_next"):
+        pages.append(nxt)
+        st.rerun()
+    if st.button("Izradi sličice koje nedostaju", key="gal_pending"):
+        shas = images.pending(conn)
+        images.enqueue(DB_PATH, UPLOAD_DIR, shas, KEEP_IMAGE_ORIGINALS)
+        st.info(f"U obradi: {len(shas)} slika.")
+
+
 # ==========================
 # ODJELJAK: STATISTIKA
 # ==========================
+@profiling.timed()
 def section_stats():
     page_header("Statistika", "Filtri i grafički/tablični prikaz medalja, pobjeda/poraza i borbi")
 
     conn = get_conn()
-    year_choices = sorted(list(set([d[0][:4] for d in conn.execute("SELECT date_from FROM competitions").fetchall() if d[0]])))
+    year_choices = sorted(list(set([d[0][:4] for d in cached_rows("SELECT date_from FROM competitions", tables=("competitions",)) if d[0]])))
     year = st.selectbox("Godina", ["Sve"] + year_choices)
     member = st.text_input("Sportaš/ica (dio imena)")
     kind = st.text_input("Vrsta natjecanja (dio naziva)")
@@ -1187,7 +1182,7 @@ def section_stats():
                    SUM(CASE WHEN cr.placement=2 THEN 1 ELSE 0 END) AS srebro,
                    SUM(CASE WHEN cr.placement=3 THEN 1 ELSE 0 END) AS bronca
             FROM competitions c
-            LEFT JOIN competition_results cr ON c.id=cr.competition_id
+            LEFT JOIN {results} cr ON c.id=cr.competition_id
             LEFT JOIN members m ON m.id=cr.member_id
             WHERE 1=1
         """
@@ -1199,38 +1194,51 @@ def section_stats():
         if kind.strip():
             q += " AND (c.kind LIKE ?)"; params.append(f"%{kind}%")
         q += " GROUP BY c.kind, c.age_group, c.style ORDER BY broj_natjecanja DESC"
-        sdf = pd.read_sql_query(q, conn, params=params)
+        # rezultati zatvorenih sezona mogu biti u arhivi (hk_podravka/archive.py)
+        rng = (date(int(year), 1, 1), date(int(year) + 1, 1, 1)) if year != "Sve" else (None, None)
+        with archive.history(conn, *rng) as src:
+            sdf = pd.read_sql_query(q.format(results=src.competition_results), conn, params=params)
+        if src.seasons:
+            st.caption(f"Uključene arhivirane sezone: {', '.join(src.seasons)}")
+        if src.skipped:
+            st.warning(f"Arhive nisu dostupne (bez njih u zbroju): {', '.join(src.skipped)}")
         st.dataframe(sdf, use_container_width=True)
 
         # Grafovi
         if not sdf.empty:
             # Medalje
             medals = sdf[["zlato","srebro","bronca"]].sum()
-            fig = plt.figure()
-            plt.bar(["Zlato","Srebro","Bronca"], medals.values)
-            plt.title("Medalje (ukupno)")
-            st.pyplot(fig)
+            fig = new_figure()
+            ax = fig.add_subplot()
+            ax.bar(["Zlato","Srebro","Bronca"], medals.values)
+            ax.set_title("Medalje (ukupno)")
+            show_figure(fig)
 
             # Omjer pobjeda/poraza
             wl = sdf[["pobjede","porazi"]].sum()
-            fig2 = plt.figure()
-            plt.bar(["Pobjede","Porazi"], wl.values)
-            plt.title("Pobjede / Porazi (ukupno)")
-            st.pyplot(fig2)
+            fig2 = new_figure()
+            ax2 = fig2.add_subplot()
+            ax2.bar(["Pobjede","Porazi"], wl.values)
+            ax2.set_title("Pobjede / Porazi (ukupno)")
+            show_figure(fig2)
 
             # Ukupno borbi po vrsti natjecanja (top 10)
             top = sdf.groupby("kind")["ukupno_borbi"].sum().sort_values(ascending=False).head(10)
-            fig3 = plt.figure()
-            plt.bar(list(top.index), list(top.values))
-            plt.title("Ukupno borbi po vrsti (top 10)")
-            plt.xticks(rotation=45, ha="right")
-            st.pyplot(fig3)
+            fig3 = new_figure()
+            ax3 = fig3.add_subplot()
+            ax3.bar(list(top.index), list(top.values))
+            ax3.set_title("Ukupno borbi po vrsti (top 10)")
+            ax3.tick_params(axis="x", labelrotation=45)
+            for lbl in ax3.get_xticklabels():
+                lbl.set_horizontalalignment("right")
+            show_figure(fig3)
     conn.close()
 
 
 # ==========================
 # ODJELJAK: GRUPE
 # ==========================
+@profiling.timed()
 def section_groups():
     page_header("Grupe", "Dodavanje/uređivanje/brisanje i raspored članova + Excel import/export")
 
@@ -1258,16 +1266,16 @@ def section_groups():
             conn.commit(); st.success("Grupa obrisana.")
 
     # Popis grupa i članova
-    groups = conn.execute("SELECT id, name FROM groups ORDER BY name").fetchall()
+    groups = groups_list()
+    mems = members_list()
     for gid, gname in groups:
         st.markdown(f"### {gname}")
-        gdf = pd.read_sql_query("""
+        gdf = cached_df("""
             SELECT m.id, m.full_name AS član, m.active_competitor AS aktivni, m.veteran
             FROM members m WHERE m.group_id=? ORDER BY m.full_name
-        """, conn, params=(gid,))
+        """, (gid,), tables=("members",))
         st.dataframe(gdf, use_container_width=True)
         # Premještanje člana
-        mems = conn.execute("SELECT id, full_name FROM members ORDER BY full_name").fetchall()
         sel = st.selectbox(f"Premjesti člana u '{gname}'", [f"{m[0]} – {m[1]}" for m in mems], key=f"mv_{gid}")
         if st.button("Premjesti", key=f"btnmv_{gid}"):
             mid = int(sel.split(" – ")[0])
@@ -1277,7 +1285,7 @@ def section_groups():
     # Uvoz/izvoz (Excel)
     st.markdown("---")
     st.subheader("Excel import/export")
-    exp = pd.read_sql_query("SELECT id, name FROM groups", conn)
+    exp = cached_df("SELECT id, name FROM groups", tables=("groups",))
     st.download_button("Skini popis grupa (Excel)",
                        data=excel_bytes_from_df(exp, "Grupe"),
                        file_name="grupe.xlsx")
@@ -1300,6 +1308,7 @@ def section_groups():
 # ==========================
 # ODJELJAK: VETERANI
 # ==========================
+@profiling.timed()
 def section_veterans():
     page_header("Veterani", "Popis, uređivanje/brisanje i komunikacija (e-mail/WhatsApp)")
 
@@ -1335,6 +1344,7 @@ def section_veterans():
 # ==========================
 # ODJELJAK: PRISUSTVO
 # ==========================
+@profiling.timed()
 def section_attendance():
     page_header("Prisustvo", "Evidencija prisustva trenera i sportaša, statistika i pripreme reprezentacije")
 
@@ -1343,8 +1353,8 @@ def section_attendance():
     conn = get_conn()
 
     st.subheader("Upis prisustva trenera (sesija)")
-    coaches = conn.execute("SELECT id, full_name FROM coaches ORDER BY full_name").fetchall()
-    groups = conn.execute("SELECT id, name FROM groups ORDER BY name").fetchall()
+    coaches = coaches_list()
+    groups = groups_list()
 
     if coaches and groups:
         csel = st.selectbox("Trener", [f"{c[0]} – {c[1]}" for c in coaches])
@@ -1357,36 +1367,131 @@ def section_attendance():
             loc = st.text_input("Upiši mjesto")
         remark = st.text_input("Napomena")
         if st.button("Spremi sesiju"):
-            conn.execute("""INSERT INTO sessions (coach_id,group_id,start_ts,end_ts,location,remark)
-                            VALUES (?,?,?,?,?,?)""",
-                         (int(csel.split(" – ")[0]), int(gsel.split(" – ")[0]), start_ts, end_ts, loc, remark))
-            conn.commit(); st.success("Sesija spremljena.")
+            db_writer().execute("""INSERT INTO sessions (coach_id,group_id,start_ts,end_ts,location,remark)
+                                   VALUES (?,?,?,?,?,?)""",
+                                (int(csel.split(" – ")[0]), int(gsel.split(" – ")[0]), start_ts, end_ts, loc, remark))
+            st.success("Sesija spremljena.")
     else:
         st.info("Dodajte trenere i grupe.")
 
+    # Raspored: tjedni termini -> sesije za cijelu sezonu odjednom
+    with st.expander("📅 Raspored treninga (tjedni termini)"):
+        s_from, s_to = season_bounds(current_season())
+        if coaches and groups:
+            with st.form("slot_form"):
+                r1, r2, r3 = st.columns(3)
+                sl_group = r1.selectbox("Grupa", [f"{g[0]} – {g[1]}" for g in groups], key="sl_group")
+                sl_coach = r2.selectbox("Trener", [f"{c[0]} – {c[1]}" for c in coaches], key="sl_coach")
+                sl_day = r3.selectbox("Dan", timetable.DANI)
+                r4, r5, r6 = st.columns(3)
+                sl_t0 = r4.time_input("Početak", value=datetime.strptime("18:00", "%H:%M").time())
+                sl_t1 = r5.time_input("Kraj", value=datetime.strptime("19:30", "%H:%M").time())
+                sl_loc = r6.selectbox("Mjesto", LOCATIONS[:-1], key="sl_loc")
+                r7, r8 = st.columns(2)
+                sl_from = r7.date_input("Vrijedi od", value=s_from, key="sl_from")
+                sl_to = r8.date_input("Vrijedi do", value=s_to, key="sl_to")
+                add_slot = st.form_submit_button("Dodaj termin")
+            if add_slot:
+                conn.execute("""INSERT INTO timetable_slots
+                                (group_id,coach_id,weekday,start_time,end_time,location,valid_from,valid_to,active)
+                                VALUES (?,?,?,?,?,?,?,?,1)""",
+                             (int(sl_group.split(" – ")[0]), int(sl_coach.split(" – ")[0]),
+                              timetable.DANI.index(sl_day), sl_t0.strftime("%H:%M"), sl_t1.strftime("%H:%M"),
+                              sl_loc, str(sl_from), str(sl_to)))
+                conn.commit(); st.success("Termin dodan.")
+
+        slots_df = pd.read_sql_query("""
+            SELECT t.id, g.name AS grupa, c.full_name AS trener, t.weekday AS dan,
+                   t.start_time AS od, t.end_time AS do, t.location AS mjesto,
+                   t.valid_from AS vrijedi_od, t.valid_to AS vrijedi_do
+            FROM timetable_slots t LEFT JOIN groups g ON g.id=t.group_id
+            LEFT JOIN coaches c ON c.id=t.coach_id
+            WHERE t.active=1 ORDER BY g.name, t.weekday, t.start_time
+        """, conn)
+        if not slots_df.empty:
+            slots_df["dan"] = slots_df["dan"].apply(lambda i: timetable.DANI[int(i)])
+        st.dataframe(slots_df, use_container_width=True)
+        del_slot = st.number_input("ID termina za brisanje", min_value=0, step=1)
+        if st.button("Obriši termin") and del_slot:
+            conn.execute("UPDATE timetable_slots SET active=0 WHERE id=?", (int(del_slot),))
+            deleted, _ = timetable.regenerate_future(conn, slot_ids=[int(del_slot)])
+            conn.commit(); st.success(f"Termin obrisan, uklonjeno budućih sesija: {deleted}.")
+
+        st.markdown("**Praznici i dani bez treninga**")
+        with st.form("exception_form"):
+            x1, x2, x3 = st.columns(3)
+            ex_from = x1.date_input("Od", value=date.today(), key="ex_from")
+            ex_to = x2.date_input("Do", value=date.today(), key="ex_to")
+            ex_group = x3.selectbox("Grupa", ["Sve grupe"] + [f"{g[0]} – {g[1]}" for g in groups], key="ex_group")
+            ex_note = st.text_input("Napomena (npr. zimski praznici)")
+            add_ex = st.form_submit_button("Dodaj iznimku")
+        if add_ex:
+            conn.execute("INSERT INTO timetable_exceptions (date_from,date_to,group_id,note) VALUES (?,?,?,?)",
+                         (str(ex_from), str(max(ex_from, ex_to)),
+                          None if ex_group == "Sve grupe" else int(ex_group.split(" – ")[0]), ex_note))
+            conn.commit(); st.success("Iznimka dodana.")
+        if st.button("Dodaj državne praznike za sezonu"):
+            n = timetable.add_public_holidays(conn, s_from, s_to)
+            conn.commit(); st.success(f"Dodano praznika: {n}.")
+        ex_df = pd.read_sql_query("""
+            SELECT e.id, e.date_from AS od, e.date_to AS do, COALESCE(g.name, 'Sve grupe') AS grupa, e.note AS napomena
+            FROM timetable_exceptions e LEFT JOIN groups g ON g.id=e.group_id
+            WHERE e.date_to >= ? ORDER BY e.date_from
+        """, conn, params=(str(s_from),))
+        st.dataframe(ex_df, use_container_width=True)
+
+        st.markdown("**Generiranje sesija**")
+        g1, g2 = st.columns(2)
+        gen_from = g1.date_input("Od", value=max(date.today(), s_from), key="gen_from")
+        gen_to = g2.date_input("Do", value=s_to, key="gen_to")
+        b1, b2 = st.columns(2)
+        if b1.button("Generiraj sesije iz rasporeda"):
+            n = timetable.generate_sessions(conn, gen_from, gen_to)
+            conn.commit(); st.success(f"Kreirano sesija: {n}.")
+        if b2.button("Osvježi buduće sesije (nakon promjene rasporeda)"):
+            deleted, created = timetable.regenerate_future(conn, gen_from, gen_to)
+            conn.commit(); st.success(f"Uklonjeno: {deleted}, kreirano: {created}.")
+
     st.subheader("Prisustvo sportaša")
-    sessions = conn.execute("""SELECT s.id, s.start_ts, g.name, c.full_name
-                               FROM sessions s LEFT JOIN groups g ON g.id=s.group_id
-                               LEFT JOIN coaches c ON c.id=s.coach_id ORDER BY s.start_ts DESC""").fetchall()
+    # Odabir sesije po prozoru (danas / tjedan / raspon) – nikad cijela povijest
+    w1, w2 = st.columns(2)
+    win = w1.radio("Sesije", ["Danas", "Ovaj tjedan", "Raspon"], horizontal=True, key="pick_window")
+    pick_coach = w2.selectbox("Trener", ["Svi treneri"] + [f"{c[0]} – {c[1]}" for c in coaches], key="pick_coach")
+    coach_id = None if pick_coach == "Svi treneri" else int(pick_coach.split(" – ")[0])
+    my_groups = coach_id is not None and w2.checkbox("Samo moje grupe", value=True, key="pick_my_groups")
+    if win == "Raspon":
+        r1, r2 = st.columns(2)
+        w_from = r1.date_input("Od", value=date.today() - timedelta(days=30), key="pick_from")
+        w_to = r2.date_input("Do", value=date.today(), key="pick_to") + timedelta(days=1)
+    else:
+        w_from, w_to = session_picker.window_for("danas" if win == "Danas" else "tjedan")
+    group_ids = session_picker.coach_group_ids(conn, coach_id) if my_groups else None
+    # trener bez grupa: "moje" su sesije koje je sam vodio
+    sessions, truncated = session_picker.sessions_window(
+        conn, w_from, w_to, coach_id=None if group_ids else coach_id, group_ids=group_ids or None)
+    if truncated:
+        st.caption(f"Prikazano zadnjih {session_picker.PICKER_LIMIT} sesija – suzi raspon ili odaberi trenera.")
+    if win == "Danas" and coach_id is not None and sessions:
+        # kompaktni pregled današnjih treninga za mobitel
+        st.markdown("\n".join(f"- **{s[1][11:16]}–{(s[2] or '')[11:16]}** {s[3] or ''} · {s[5] or ''}"
+                               for s in reversed(sessions)))
     if sessions:
-        ssel = st.selectbox("Sesija", [f"{s[0]} – {s[1]} – {s[2]} – {s[3]}" for s in sessions])
+        ssel = st.selectbox("Sesija", [f"{s[0]} – {s[1]} – {s[3]} – {s[4]}" for s in sessions])
         sid = int(ssel.split(" – ")[0])
         # predložena grupa članova
-        gid = conn.execute("SELECT group_id FROM sessions WHERE id=?", (sid,)).fetchone()[0]
+        gid = next(s[6] for s in sessions if s[0] == sid)
         if gid:
-            mems = conn.execute("SELECT id, full_name FROM members WHERE group_id=? ORDER BY full_name", (gid,)).fetchall()
+            mems = members_list(gid)
         else:
-            mems = conn.execute("SELECT id, full_name FROM members ORDER BY full_name").fetchall()
+            mems = members_list()
         picks = st.multiselect("Prisustvovali", [f"{m[0]} – {m[1]}" for m in mems])
         minutes = st.number_input("Trajanje treninga (minute po sportašu)", min_value=0, step=15, value=90)
         if st.button("Spremi prisustvo"):
-            for p in picks:
-                mid = int(p.split(" – ")[0])
-                conn.execute("INSERT INTO attendance (session_id,member_id,present,minutes) VALUES (?,?,?,?)",
-                             (sid, mid, 1, int(minutes)))
-            conn.commit(); st.success("Prisustvo spremljeno.")
+            db_writer().executemany("INSERT INTO attendance (session_id,member_id,present,minutes) VALUES (?,?,?,?)",
+                                    [(sid, int(p.split(" – ")[0]), 1, int(minutes)) for p in picks])
+            st.success("Prisustvo spremljeno.")
     else:
-        st.info("Najprije unesite sesiju.")
+        st.info("Nema sesija u odabranom razdoblju.")
 
     # Pripreme reprezentacije
     st.markdown("---")
@@ -1400,39 +1505,120 @@ def section_attendance():
         ed = c2.date_input("Do", value=date.today() + timedelta(days=7))
         submit = st.form_submit_button("Spremi pripreme")
     if submit:
-        conn.execute("INSERT INTO camps (title,place,coach,start_date,end_date) VALUES (?,?,?,?,?)",
-                     (title, place, coach, str(sd), str(ed)))
-        conn.commit(); st.success("Pripreme spremljene.")
+        db_writer().execute("INSERT INTO camps (title,place,coach,start_date,end_date) VALUES (?,?,?,?,?)",
+                            (title, place, coach, str(sd), str(ed)))
+        st.success("Pripreme spremljene.")
 
     camps = conn.execute("SELECT id, title, start_date, end_date FROM camps ORDER BY start_date DESC").fetchall()
     if camps:
         camp_sel = st.selectbox("Odaberi pripreme", [f"{c[0]} – {c[1]} ({c[2]}–{c[3]})" for c in camps])
         camp_id = int(camp_sel.split(" – ")[0])
-        mems2 = conn.execute("SELECT id, full_name FROM members ORDER BY full_name").fetchall()
+        mems2 = members_list()
         picks2 = st.multiselect("Članovi na pripremama", [f"{m[0]} – {m[1]}" for m in mems2])
         tnum = st.number_input("Broj treninga", min_value=0, step=1)
         thrs = st.number_input("Sati", min_value=0.0, step=0.5)
         if st.button("Spremi sudjelovanje"):
-            for p in picks2:
-                mid = int(p.split(" – ")[0])
-                conn.execute("""INSERT INTO camp_attendance (camp_id,member_id,trainings,hours)
-                                VALUES (?,?,?,?)""", (camp_id, mid, int(tnum), float(thrs)))
-            conn.commit(); st.success("Sudjelovanje spremljeno.")
+            db_writer().executemany("""INSERT INTO camp_attendance (camp_id,member_id,trainings,hours)
+                                       VALUES (?,?,?,?)""",
+                                    [(camp_id, int(p.split(" – ")[0]), int(tnum), float(thrs)) for p in picks2])
+            st.success("Sudjelovanje spremljeno.")
+
+    # Statistika: tjedan / mjesec / godina
+    st.markdown("---")
+    st.subheader("Statistika prisustva")
+    p1, p2 = st.columns(2)
+    kind = p1.radio("Razdoblje", ["tjedan", "mjesec", "godina"], index=1, horizontal=True)
+    anchor = p2.date_input("Datum unutar razdoblja", value=date.today(), key="stats_anchor")
+    d0, d1 = attendance_stats.period_range(kind, anchor)
+    # zatvorene sezone mogu biti u arhivi (hk_podravka/archive.py) – pripajaju se samo za taj raspon
+    with archive.history(conn, d0, d1) as src:
+        tot = attendance_stats.summary(conn, d0, d1, src)
+        st.caption(f"{d0.strftime('%d.%m.%Y.')} – {(d1 - timedelta(days=1)).strftime('%d.%m.%Y.')}"
+                   + (f" · iz arhive: {', '.join(src.seasons)}" if src.seasons else ""))
+        if src.skipped:
+            st.warning(f"Arhive nisu dostupne (bez njih u zbroju): {', '.join(src.skipped)}")
+        st.write(f"- Broj treninga: **{tot['sessions']}**")
+        st.write(f"- Ukupno minuta (treneri): **{tot['coach_minutes']}**")
+        st.write(f"- Prisustava (sportaši): **{tot['attendances']}**")
+        st.write(f"- Ukupno minuta (sportaši): **{tot['athlete_minutes']}**")
+
+        # Rollup po manjim razdobljima unutar odabranog (godina -> mjeseci, mjesec -> tjedni)
+        sub = {"godina": "mjesec", "mjesec": "tjedan", "tjedan": "tjedan"}[kind]
+        tab_m, tab_g, tab_c = st.tabs(["Sportaši", "Grupe", "Treneri"])
+        with tab_m, profiling.phase("prisustvo: sportaši"):
+            mst = attendance_stats.member_rollup(conn, d0, d1, sub, src)
+            st.dataframe(mst, use_container_width=True)
+            st.download_button("Skini statistiku sportaša (Excel)", data=excel_bytes_from_df(mst, "Sportasi"),
+                               file_name=f"prisustvo_sportasi_{d0}.xlsx")
+        with tab_g, profiling.phase("prisustvo: grupe"):
+            gst = attendance_stats.group_rollup(conn, d0, d1, sub, src)
+            st.dataframe(gst, use_container_width=True)
+            st.download_button("Skini statistiku grupa (Excel)", data=excel_bytes_from_df(gst, "Grupe"),
+                               file_name=f"prisustvo_grupe_{d0}.xlsx")
+        with tab_c, profiling.phase("prisustvo: treneri"):
+            cst = attendance_stats.coach_rollup(conn, d0, d1, sub, src)
+            st.dataframe(cst, use_container_width=True)
+            st.download_button("Skini statistiku trenera (Excel)", data=excel_bytes_from_df(cst, "Treneri"),
+                               file_name=f"prisustvo_treneri_{d0}.xlsx")
+
+    # Trenažno opterećenje: redovni treninzi + pripreme
+    st.markdown("---")
+    with st.expander("🏋️ Trenažno opterećenje (treninzi + pripreme)"), profiling.phase("trenažno opterećenje"):
+        refresh_derived(training_load.refresh_training_load, ("sessions", "attendance", "camps", "camp_attendance"))
+        seasons = [r[0] for r in conn.execute(
+            "SELECT DISTINCT period FROM training_load WHERE period_kind='sezona' ORDER BY period DESC").fetchall()]
+        if seasons:
+            l1, l2 = st.columns(2)
+            load_season = l1.selectbox("Sezona", seasons, key="load_season")
+            load_kind = l2.radio("Razdoblje", list(training_load.PERIOD_KINDS), index=1, horizontal=True, key="load_kind")
+            ls0, ls1 = season_bounds(load_season)
+            bounds = {"tjedan": (str(ls0 - timedelta(days=ls0.weekday())), str(ls1)),
+                      "mjesec": (ls0.strftime("%Y-%m"), ls1.strftime("%Y-%m")),
+                      "sezona": (load_season, load_season)}[load_kind]
+            ldf = training_load.load_report(conn, load_kind, *bounds)
+            st.dataframe(ldf, use_container_width=True)
+            st.download_button("Skini opterećenje (Excel)", data=excel_bytes_from_df(ldf, "Opterecenje"),
+                               file_name=f"opterecenje_{load_kind}_{load_season.replace('/', '-')}.xlsx")
+
+            st.markdown("**Izvještaj po uzrasnim kategorijama (za savez)**")
+            cat_df, cat_tot = training_load.category_report(conn, load_season)
+            st.dataframe(cat_tot, use_container_width=True)
+            k1, k2 = st.columns(2)
+            k1.download_button("Skini zbroj po kategorijama (Excel)", data=excel_bytes_from_df(cat_tot, "Kategorije"),
+                               file_name=f"kategorije_{load_season.replace('/', '-')}.xlsx")
+            k2.download_button("Skini sportaše po kategorijama (Excel)", data=excel_bytes_from_df(cat_df, "Sportasi"),
+                               file_name=f"kategorije_sportasi_{load_season.replace('/', '-')}.xlsx")
+        else:
+            st.info("Još nema upisanih treninga ni priprema.")
 
-    # Statistika za mjesec
+    # Analiza: matrica sportaš × tjedan i rizik odustajanja
     st.markdown("---")
-    st.subheader("Statistika prisustva (mjesec)")
-    months = sorted(list(set([s[0][:7] for s in conn.execute("SELECT start_ts FROM sessions").fetchall() if s[0]])))
-    month = st.selectbox("Mjesec (YYYY-MM)", months if months else [])
-    if month:
-        s_count = conn.execute("SELECT COUNT(*), COALESCE(SUM((julianday(end_ts)-julianday(start_ts))*24*60),0) FROM sessions WHERE start_ts LIKE ?",
-                               (f"{month}%",)).fetchone()
-        st.write(f"- Broj treninga: **{int(s_count[0])}**")
-        st.write(f"- Ukupno minuta (treneri): **{int(s_count[1])}**")
-        a_count = conn.execute("SELECT COUNT(*), COALESCE(SUM(minutes),0) FROM attendance a JOIN sessions s ON s.id=a.session_id WHERE s.start_ts LIKE ?",
-                               (f"{month}%",)).fetchone()
-        st.write(f"- Prisustava (sportaši): **{int(a_count[0])}**")
-        st.write(f"- Ukupno minuta (sportaši): **{int(a_count[1])}**")
+    with st.expander("📊 Analiza prisustva (toplinska karta i rizik odustajanja)"), profiling.phase("analiza prisustva"):
+        an_group = st.selectbox("Grupa", [f"{g[0]} – {g[1]}" for g in groups], key="an_group") if groups else None
+        weeks = st.slider("Broj tjedana", min_value=8, max_value=260, value=26, step=1)
+        if an_group:
+            an_gid = int(an_group.split(" – ")[0])
+            end = analytics.week_start(analytics.week_index(date.today()) + 1)
+            with archive.history(conn, end - timedelta(weeks=weeks), end) as src:
+                mat = analytics.attendance_matrix(conn, end - timedelta(weeks=weeks), end, [an_gid], src)
+            names = dict(members_list(an_gid))
+            if len(mat.member_ids):
+                show_figure(analytics.heatmap_figure(mat, [names.get(int(i), "") for i in mat.member_ids]))
+            else:
+                st.info("Grupa nema članova.")
+
+        refresh_derived(analytics.refresh_dropout_scores, ("sessions", "attendance"),
+                        key=(analytics.week_index(date.today()),))
+        q = """SELECT m.full_name AS sportaš, g.name AS grupa, d.score AS rizik,
+                      ROUND(100*d.recent_rate,0) AS "zadnja_4_tj_%", ROUND(100*d.baseline_rate,0) AS "ranije_%",
+                      d.missed_weeks AS propušteno_tjedana, d.computed_at AS izračunato
+               FROM dropout_scores d JOIN members m ON m.id=d.member_id LEFT JOIN groups g ON g.id=d.group_id
+               WHERE d.score IS NOT NULL"""
+        params: List = []
+        if an_group:
+            q += " AND d.group_id=?"; params.append(int(an_group.split(" – ")[0]))
+        rdf = pd.read_sql_query(q + " ORDER BY d.score DESC", conn, params=params)
+        st.dataframe(rdf, use_container_width=True)
 
     conn.close()
 
@@ -1440,13 +1626,184 @@ def section_attendance():
 # ==========================
 # NAVIGACIJA I APLIKACIJA
 # ==========================
+def profile_panel():
+    """Zadnja izvođenja i raspodjela vremena po fazama; mjerenje memorije i cProfile na zahtjev."""
+    runs = profiling.runs()
+    memory = st.checkbox("Mjeri vršnu memoriju (tracemalloc, sporije)", key="diag_memory")
+    profiling.set_memory_tracking(memory)
+    if runs:
+        last = runs[0]
+        st.markdown(f"**Zadnje izvođenje – {last.section or '?'}: {last.ms:.0f} ms**")
+        st.dataframe(pd.DataFrame([{
+            "faza": "· " * ph["depth"] + ph["name"], "ms": ph.get("ms"), "SQL ms": ph.get("sql_ms"),
+            "upita": ph.get("queries"), "vrh KB": ph.get("peak_kb"),
+        } for ph in last.phases]), use_container_width=True, hide_index=True)
+        st.dataframe(pd.DataFrame([{
+            "vrijeme": r.at[11:], "odjeljak": r.section, "ms": round(r.ms), "SQL ms": round(r.sql_ms),
+            "upita": r.queries, "vrh KB": r.peak_kb,
+        } for r in runs[:10]]), use_container_width=True, hide_index=True)
+        st.caption(f"Povijest izvođenja: {PROFILE_LOG}")
+    if st.button("cProfile sljedećeg izvođenja", key="diag_profile"):
+        profiling.request_profile()
+        st.rerun()
+    prof = profiling.last_profile()
+    if prof:
+        st.caption(f"cProfile: {prof.section} ({prof.at})")
+        st.code(prof.profile_text)
+        if prof.profile_path and os.path.exists(prof.profile_path):
+            with open(prof.profile_path, "rb") as f:
+                st.download_button("Skini .prof", data=f.read(), file_name=os.path.basename(prof.profile_path),
+                                   key="diag_prof_dl")
+
+
+def _mb(n: int) -> str:
+    return f"{n / 1048576:.1f} MB"
+
+
+@st.fragment
+def database_panel():
+    """Stanje baze: veličine, verzija sheme, broj redaka, indeksi, quick_check, inicijalizacija."""
+    if st.button("Inicijaliziraj/kreiraj bazu", key="diag_init"):
+        init_db()
+        st.success("Baza je spremna (tablice, indeksi, okidači).")
+    if not st.checkbox("Prikaži stanje baze", key="diag_db"):
+        return
+    conn = get_conn()
+    try:
+        if st.button("Održavanje sada (optimize, vacuum, checkpoint)", key="diag_maintain"):
+            with st.spinner("Održavanje baze…"):
+                maintenance.run(conn, DB_PATH)
+        if st.button("Sigurnosna kopija sada (baza + uploadi)", key="diag_backup"):
+            with st.spinner("Izrada sigurnosne kopije…"):
+                made = backup.create(DB_PATH, UPLOAD_DIR, BACKUP_DIR, archive_dir=ARCHIVE_DIR)
+            st.success(f"Kopija {made.name} u {BACKUP_DIR}: baza {made.meta['db_seconds']:.1f} s, "
+                       f"novih datoteka uploada {made.meta['uploads']['new_files']}.")
+        info = diagnostics.db_info(conn)
+        sizes = diagnostics.file_sizes(conn, DB_PATH)
+        files, blob_bytes, variant_bytes = diagnostics.upload_store(conn)
+        st.caption(f"SQLite {info.sqlite_version} · shema v{info.user_version} (kod v{db.SCHEMA_VERSION}, "
+                   f"promjena sheme {info.schema_version}) · journal {info.journal_mode} · "
+                   f"auto_vacuum {info.auto_vacuum} · ANALYZE {'da' if info.analyzed else 'ne'}")
+        last = backup.latest(BACKUP_DIR)
+        verified = (last.meta.get("verified") or {}) if last else {}
+        st.caption("Zadnja sigurnosna kopija: " + (f"{last.created:%d.%m.%Y. %H:%M}" + (
+            "" if not verified else f" · provjera {'ispravna' if verified['ok'] else 'NEUSPJEŠNA'}") if last else "nema"))
+        archived = archive.archived(conn)
+        if archived:
+            st.caption("Arhivirane sezone (python -m hk_podravka archive): " + ", ".join(
+                f"{a.season} ({a.sessions} treninga, {a.attendance} prisustava)" for a in archived))
+        st.dataframe(pd.DataFrame([
+            {"stavka": "baza", "veličina": _mb(sizes.db_bytes)},
+            {"stavka": "WAL", "veličina": _mb(sizes.wal_bytes)},
+            {"stavka": f"slobodne stranice ({sizes.freelist_pages})", "veličina": _mb(sizes.freelist_bytes)},
+            {"stavka": f"uploadi ({files} datoteka)", "veličina": _mb(blob_bytes)},
+            {"stavka": "varijante slika", "veličina": _mb(variant_bytes)},
+        ]), use_container_width=True, hide_index=True)
+
+        exact = st.checkbox("Točan broj redaka (COUNT(*))", key="diag_exact")
+        counts = diagnostics.table_counts(conn, exact=exact)
+        st.dataframe(pd.DataFrame(counts, columns=["tablica", "redaka", "izvor"]),
+                     use_container_width=True, hide_index=True)
+
+        if st.button("Korištenje indeksa u zabilježenim upitima", key="diag_index"):
+            usage = diagnostics.index_usage(conn, [(q.sql, q.params) for q in querylog.top_queries(500)])
+            st.caption(f"Provjereno upita: {usage.checked}")
+            st.dataframe(pd.DataFrame(sorted(usage.used.items(), key=lambda kv: -kv[1]), columns=["indeks", "upita"]),
+                         use_container_width=True, hide_index=True)
+            if usage.unused:
+                st.markdown("Nekorišteni indeksi: " + ", ".join(f"`{i}`" for i in usage.unused))
+            if usage.scans:
+                st.markdown("**Puni prolaz kroz tablicu**")
+                st.dataframe(pd.DataFrame([{"tablica": t, "upit": q[:120]} for t, q in usage.scans]),
+                             use_container_width=True, hide_index=True)
+
+        log = maintenance.history(conn, 5)
+        if log:
+            st.dataframe(pd.DataFrame([{
+                "vrijeme": r[0].replace("T", " "), "korak": r[1], "ms": r[2],
+                "baza": f"{_mb(r[3])} → {_mb(r[4])}", "WAL": f"{_mb(r[5])} → {_mb(r[6])}",
+                "slobodno": f"{r[7]} → {r[8]}", "detalj": r[9],
+            } for r in log]), use_container_width=True, hide_index=True)
+    finally:
+        conn.close()
+
+    check = diagnostics.quick_check(DB_PATH)
+    c1, c2 = st.columns(2)
+    if c1.button("PRAGMA quick_check", key="diag_qc", disabled=check.running):
+        check.start()
+    c2.button("Osvježi", key="diag_qc_refresh")
+    if check.running:
+        st.info(f"quick_check u tijeku (od {check.started:%H:%M:%S})…")
+    elif check.finished:
+        took = (check.finished - check.started).total_seconds()
+        if check.ok:
+            st.success(f"quick_check: ok ({check.finished:%d.%m.%Y. %H:%M}, {took:.1f} s)")
+        else:
+            st.error(f"quick_check ({check.finished:%d.%m.%Y. %H:%M}): {check.error or '; '.join(check.result[:20])}")
+
+
+def section_diagnostics():
+    """Sidebar: stanje baze, profil izvođenja (faze, memorija, cProfile) i SQL upiti (najskuplji, spori, EXPLAIN)."""
+    with st.sidebar.expander("⚙️ Dijagnostika"):
+        database_panel()
+        profile_panel()
+        st.markdown("**SQL upiti**")
+        runs = querylog.reruns()
+        only = st.checkbox("Samo trenutni odjeljak", value=False, key="diag_only_section")
+        top = querylog.top_queries(15, section=runs[0].section if (only and runs) else None)
+        if not top:
+            st.caption("Još nema zabilježenih upita.")
+            return
+        st.dataframe(pd.DataFrame([{
+            "odjeljak": q.section, "poziva": q.calls, "ukupno ms": round(q.total_ms, 1),
+            "prosjek ms": round(q.avg_ms, 1), "max ms": round(q.max_ms, 1), "redaka": q.rows,
+            "upit": q.sql[:120],
+        } for q in top]), use_container_width=True, hide_index=True)
+
+        slow = querylog.slow_queries()
+        if slow:
+            st.markdown(f"**Spori upiti (≥ {querylog.SLOW_MS} ms)**")
+            st.dataframe(pd.DataFrame([{
+                "vrijeme": datetime.fromtimestamp(q.at).strftime("%H:%M:%S"), "odjeljak": q.section,
+                "ms": round(q.ms), "redaka": q.rows, "upit": q.sql[:120],
+            } for q in slow[:20]]), use_container_width=True, hide_index=True)
+
+        pick = st.selectbox("Upit", range(len(top)), key="diag_pick",
+                            format_func=lambda i: f"{top[i].total_ms:.0f} ms · {top[i].sql[:60]}")
+        c1, c2 = st.columns(2)
+        if c1.button("EXPLAIN QUERY PLAN", key="diag_explain"):
+            q = top[pick]
+            st.code(q.sql, language="sql")
+            conn = get_conn()
+            try:
+                st.code("\n".join(querylog.explain(conn, q.sql, q.params)) or "(prazan plan)")
+            except sqlite3.Error as e:
+                st.warning(f"Plan nije dostupan: {e}")
+            finally:
+                conn.close()
+        if c2.button("Poništi mjerenja", key="diag_reset"):
+            querylog.reset()
+            st.rerun()
+
+
 def main():
     st.set_page_config(page_title="HK Podravka – Admin", page_icon="🤼", layout="wide")
-    css_style()
-    init_db()
-
-    with st.sidebar:
-        st.image("https://hk-podravka.com/wp-content/uploads/2021/08/cropped-HK-Podravka-logo.png", width=120)
+    with querylog.rerun(), profiling.rerun(PROFILE_LOG, PROFILE_DIR):
+        _main()
+    with querylog.scope("⚙️ Dijagnostika"):
+        section_diagnostics()
+
+
+def _main():
+    with profiling.phase("priprema"):
+        css_style()
+        init_db()
+        storage.run_if_due(DB_PATH, UPLOAD_DIR)
+        metrics_server()
+        maintenance_scheduler()
+
+    with st.sidebar, profiling.phase("sidebar"):
+        show_logo("sidebar")
         st.markdown(f"### {KLUB_NAZIV}")
         st.markdown(f"**E-mail:** {KLUB_EMAIL}")
         st.markdown(f"**Adresa:** {KLUB_ADRESA}")
@@ -1459,6 +1816,8 @@ def main():
             "Statistika", "Grupe", "Veterani", "Prisustvo"
         ])
 
+    querylog.set_section(section)
+    profiling.set_section(section)
     if section == "Klub":
         section_club()
     elif section == "Članovi":